@@ -79,9 +79,16 @@ async function handleScan(table, params, headers) {
   };
 }
 
+/**
+ * Whether a review field has content after trimming whitespace
+ */
+function hasReviewContent(value) {
+  return Boolean(value) && String(value).trim() !== '';
+}
+
 /**
  * Handle chat log review updates
- * Updates: rev_comment, rev_feedback, issue_tags
+ * Updates: rev_comment, rev_feedback, issue_tags (and rev_date on the first review)
  */
 async function handleUpdateChatLog(params, headers) {
   const { log_id, timestamp, rev_comment, rev_feedback, issue_tags } = params;
@@ -106,6 +113,14 @@ async function handleUpdateChatLog(params, headers) {
     expressionAttributeValues[':rev_feedback'] = rev_feedback;
   }
 
+  // Time of the first review, for the review turnaround percentiles; blank
+  // values do not make an item reviewed (see is_reviewed in get-review-metrics)
+  if (hasReviewContent(rev_comment) || hasReviewContent(rev_feedback)) {
+    updateExpression.push('#rev_date = if_not_exists(#rev_date, :rev_date)');
+    expressionAttributeNames['#rev_date'] = 'rev_date';
+    expressionAttributeValues[':rev_date'] = new Date().toISOString();
+  }
+
   if (issue_tags !== undefined) {
     updateExpression.push('#issue_tags = :issue_tags');
     expressionAttributeNames['#issue_tags'] = 'issue_tags';
@@ -136,7 +151,7 @@ async function handleUpdateChatLog(params, headers) {
 
 /**
  * Handle feedback log review updates
- * Updates: rev_comment, rev_feedback
+ * Updates: rev_comment, rev_feedback (and rev_date on the first review)
  */
 async function handleUpdateFeedbackLog(params, headers) {
   const { id, datetime, rev_comment, rev_feedback } = params;
@@ -161,6 +176,14 @@ async function handleUpdateFeedbackLog(params, headers) {
     expressionAttributeValues[':rev_feedback'] = rev_feedback;
   }
 
+  // Time of the first review, for the review turnaround percentiles; blank
+  // values do not make an item reviewed (see is_reviewed in get-review-metrics)
+  if (hasReviewContent(rev_comment) || hasReviewContent(rev_feedback)) {
+    updateExpression.push('#rev_date = if_not_exists(#rev_date, :rev_date)');
+    expressionAttributeNames['#rev_date'] = 'rev_date';
+    expressionAttributeValues[':rev_date'] = new Date().toISOString();
+  }
+
   if (updateExpression.length === 0) {
     throw new Error('No fields to update');
   }
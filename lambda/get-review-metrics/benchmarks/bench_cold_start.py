@@ -0,0 +1,109 @@
+"""
+Import time and init duration of the GetReviewMetrics module.
+
+Each run starts a fresh interpreter (as a Lambda cold start does), imports
+index and then creates the DynamoDB client, timing both. The slowest imports
+come from python -X importtime. No AWS access is needed: creating the client
+does not call DynamoDB.
+
+Deployed functions report the same phases through EMF (InitTime,
+ClientInitTime, ColdStart); this script measures them before deploying.
+
+Usage:
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --output benchmarks/results/cold_start.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MEASURE = """
+import json, time
+started = time.perf_counter()
+import index
+imported = time.perf_counter()
+index.dynamodb.client
+created = time.perf_counter()
+print(json.dumps({
+    'importMs': (imported - started) * 1000,
+    'clientInitMs': (created - imported) * 1000,
+    'processCpuMs': time.process_time() * 1000,
+}))
+"""
+
+
+def run_once():
+    """
+    Measure one fresh interpreter.
+
+    Returns:
+        Tuple of (timings dict, {module: cumulative import microseconds})
+    """
+    env = dict(os.environ)
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', MEASURE],
+        cwd=LAMBDA_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    # Lines look like "import time:       123 |       4567 |   boto3"; the
+    # module name is indented two spaces per nesting level below index
+    imports = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('   ') or name.startswith('     '):
+            continue
+        imports[name.strip()] = int(cumulative)
+    return timings, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports of index to list')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'runs': args.runs,
+    }
+    for name in ('importMs', 'clientInitMs', 'processCpuMs'):
+        values = [timings[name] for timings, _ in runs]
+        report[name] = {'median': round(statistics.median(values), 1), 'min': round(min(values), 1)}
+
+    imports = runs[-1][1]
+    slowest = sorted(imports.items(), key=lambda entry: entry[1], reverse=True)[:args.top]
+    report['slowestImportsMs'] = {name: round(micros / 1000, 1) for name, micros in slowest}
+
+    print(f"{'import index':>24} {report['importMs']['median']:>8.1f} ms (median of {args.runs})")
+    print(f"{'create client':>24} {report['clientInitMs']['median']:>8.1f} ms")
+    print(f"{'process CPU at init':>24} {report['processCpuMs']['median']:>8.1f} ms")
+    print('Slowest imports of index:')
+    for name, millis in report['slowestImportsMs'].items():
+        print(f'{name:>24} {millis:>8.1f} ms')
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+            file.write('\n')
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
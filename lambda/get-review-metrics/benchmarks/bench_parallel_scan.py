@@ -0,0 +1,82 @@
+"""
+Benchmark for the parallel segmented scan in scan_table_with_pagination.
+
+Runs the scan against an in-memory FakeTable that sleeps for a fixed time
+per Scan page, which is where a real scan spends most of its wall-clock
+time. Each segment count is checked to return exactly the same items as the
+serial scan before its timing is reported.
+
+Usage:
+    python benchmarks/bench_parallel_scan.py --items 20000 --page-latency 0.005
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from fake_dynamodb import FakeTable
+from index import calculate_metrics, scan_table_with_pagination
+
+
+def build_items(count: int) -> list:
+    """Generate chat-log items with a mix of reviewed and pending entries."""
+    items = []
+    for i in range(count):
+        item = {'log_id': f'log-{i:08d}', 'rev_comment': '', 'rev_feedback': ''}
+        if i % 3 == 0:
+            item['rev_comment'] = f'Reviewed entry {i}'
+        elif i % 7 == 0:
+            item['rev_feedback'] = '   '
+        items.append(item)
+    return items
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000, help='Number of items in the fake table')
+    parser.add_argument('--page-size', type=int, default=100, help='Items returned per Scan page')
+    parser.add_argument('--page-latency', type=float, default=0.005, help='Seconds per Scan call')
+    parser.add_argument('--segments', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    table = FakeTable(
+        build_items(args.items),
+        key_name='log_id',
+        page_size=args.page_size,
+        page_latency=args.page_latency
+    )
+    projection = 'log_id, rev_comment, rev_feedback'
+
+    baseline_items = scan_table_with_pagination(table, projection)
+    baseline_ids = sorted(item['log_id'] for item in baseline_items)
+    baseline_metrics = calculate_metrics(baseline_items)
+
+    print(f'{args.items} items, {args.page_size} items/page, {args.page_latency * 1000:.1f} ms/page')
+    print(f'{"segments":>8} {"seconds":>9} {"speedup":>8}')
+
+    serial_seconds = None
+    for segments in args.segments:
+        start = time.perf_counter()
+        items = scan_table_with_pagination(table, projection, segments)
+        elapsed = time.perf_counter() - start
+
+        if sorted(item['log_id'] for item in items) != baseline_ids:
+            print(f'segments={segments}: scanned items differ from the serial scan', file=sys.stderr)
+            return 1
+        if calculate_metrics(items) != baseline_metrics:
+            print(f'segments={segments}: metrics differ from the serial scan', file=sys.stderr)
+            return 1
+
+        if serial_seconds is None:
+            serial_seconds = elapsed
+        print(f'{segments:>8} {elapsed:>9.3f} {serial_seconds / elapsed:>7.2f}x')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
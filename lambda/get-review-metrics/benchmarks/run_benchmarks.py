@@ -0,0 +1,303 @@
+"""
+Benchmark suite for the GetReviewMetrics hot paths with regression checks.
+
+Cases:
+    calibration          Fixed pure-Python workload measuring machine speed
+    is_reviewed          Classifying pre-built items one by one
+    calculate_metrics    Classifying 5000-item pages
+    deserialize_classify Deserializing wire-format pages, then calculate_metrics
+                         (what ClientTable.scan costs per item)
+    raw_classify         calculate_raw_metrics on the same wire-format pages
+                         (the ClientTable.scan_raw path)
+    is_reviewed_large    is_reviewed per item on pages with 4 KB review fields
+    count_reviewed_large count_reviewed on the same pages
+    handler_scan_<size>  lambda_handler end to end in scan mode over a
+                         SyntheticTable of <size> chat logs
+
+Every case reports items per second and "relative" throughput, its items
+per second divided by the calibration rate. Each repetition times the
+calibration loop right before the case, and a case counts by the median of
+those paired ratios after one untimed warm-up run, so a run slowed by a busy
+neighbour does not move it. Inputs are generated from INPUT_SEED, so every
+run times the same items. Baselines store the relative throughput, which
+moves far less between machines than raw timings. A case fails when its
+relative throughput drops more than its tolerance below the baseline.
+
+Results are written as JSON (--output). --update-baseline stores the run as
+the new baseline; do that on the machine that runs the check (e.g. CI).
+
+Usage:
+    python benchmarks/run_benchmarks.py                      # 10k and 1M, check baseline
+    python benchmarks/run_benchmarks.py --sizes 10k 1m 10m   # full suite
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, '..'))
+sys.path.insert(0, BENCHMARK_DIR)
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import index
+import instrumentation
+from synthetic import SyntheticTable, generate_items, large_comment_items
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baselines.json')
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, 'results', 'latest.json')
+
+# Allowed drop in relative throughput before a case fails
+DEFAULT_TOLERANCE = 0.20
+
+# Seed of every generated input; recorded with the results and the baseline
+INPUT_SEED = 0
+
+MICRO_ITEMS = 200_000
+PAGE_ITEMS = 5000
+LARGE_COMMENT_ITEMS = 20_000
+
+
+def parse_size(text: str) -> int:
+    """Parse an item count such as 10000, 10k or 1m."""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def best_of(function: Callable[[], Any], repeat: int) -> float:
+    """Fastest of repeat runs in seconds, with the garbage collector paused."""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(timings)
+
+
+def summarise_runs(items: int, runs: List[tuple[float, float]]) -> Dict[str, Any]:
+    """
+    Reduce the repetitions of one case.
+
+    Args:
+        items: Items processed per run
+        runs: (calibration seconds, case seconds) of every repetition
+
+    Returns:
+        Dict with the median seconds, items per second and calibration rate,
+        and the median of the per-repetition relative throughputs
+    """
+    calibration = statistics.median(run[0] for run in runs)
+    seconds = statistics.median(run[1] for run in runs)
+    relative = statistics.median((items / case) / (MICRO_ITEMS / calibration) for calibration, case in runs)
+    return {
+        'items': items,
+        'seconds': round(seconds, 6),
+        'itemsPerSecond': round(items / seconds, 1),
+        'calibration': round(MICRO_ITEMS / calibration, 1),
+        'relative': round(relative, 6),
+    }
+
+
+def calibration_workload(count: int = MICRO_ITEMS) -> int:
+    """Dict lookups and string checks similar in kind to the classifier."""
+    values = ['', ' ', 'text', None] * (count // 4)
+    total = 0
+    for value in values:
+        record = {'value': value}
+        if record.get('value') and not record['value'].isspace():
+            total += 1
+    return total
+
+
+def run_cases(sizes: List[int], repeat: int, segments: int) -> Dict[str, Dict[str, Any]]:
+    """Run every case and return name -> {items, seconds, itemsPerSecond, calibration}."""
+    cases: Dict[str, Dict[str, Any]] = {}
+
+    def measure(name: str, items: int, function: Callable[[], Any], repeats: int = repeat) -> None:
+        # Shared runners change speed within a run, so every repetition is
+        # paired with a calibration run right before it
+        if repeats > 1:
+            function()
+        runs = [(best_of(calibration_workload, 1), best_of(function, 1)) for _ in range(repeats)]
+        cases[name] = result = summarise_runs(items, runs)
+        print(f'{name:>24} {items:>10} items {result["seconds"]:>9.3f} s '
+              f'{result["itemsPerSecond"]:>14,.0f} items/s {result["relative"]:>9.4f} relative')
+
+    measure('calibration', MICRO_ITEMS, calibration_workload)
+
+    items = list(generate_items(MICRO_ITEMS, seed=INPUT_SEED))
+    is_reviewed = index.is_reviewed
+    measure('is_reviewed', len(items), lambda: [is_reviewed(item) for item in items])
+
+    pages = [items[start:start + PAGE_ITEMS] for start in range(0, len(items), PAGE_ITEMS)]
+    calculate_metrics = index.calculate_metrics
+    measure('calculate_metrics', len(items), lambda: [calculate_metrics(page) for page in pages])
+
+    serialize, deserialize = TypeSerializer().serialize, TypeDeserializer().deserialize
+    wire_pages = [[{field: serialize(value) for field, value in item.items()} for item in page] for page in pages]
+
+    def deserialize_classify():
+        for page in wire_pages:
+            calculate_metrics([{field: deserialize(value) for field, value in item.items()} for item in page])
+
+    calculate_raw_metrics = index.calculate_raw_metrics
+    measure('deserialize_classify', len(items), deserialize_classify)
+    measure('raw_classify', len(items), lambda: [calculate_raw_metrics(page) for page in wire_pages])
+    print(f'{"raw speedup":>24} {cases["deserialize_classify"]["seconds"] / cases["raw_classify"]["seconds"]:.1f}x per item')
+    del items, pages, wire_pages
+
+    large_items = large_comment_items(LARGE_COMMENT_ITEMS, seed=INPUT_SEED)
+    large_pages = [large_items[start:start + 250] for start in range(0, len(large_items), 250)]
+    count_reviewed = index.count_reviewed
+    measure('is_reviewed_large', len(large_items), lambda: [sum(map(is_reviewed, page)) for page in large_pages])
+    measure('count_reviewed_large', len(large_items), lambda: [count_reviewed(page) for page in large_pages])
+    print(f'{"batched speedup":>24} '
+          f'{cases["is_reviewed_large"]["seconds"] / cases["count_reviewed_large"]["seconds"]:.1f}x on 4 KB fields')
+    del large_items, large_pages
+
+    for size in sizes:
+        measure(f'handler_scan_{size}', size, lambda: run_handler(size, segments), 1 if size >= 5_000_000 else repeat)
+    return cases
+
+
+def run_handler(size: int, segments: int, verify: bool = False) -> Dict[str, Any]:
+    """Invoke lambda_handler in scan mode over synthetic tables."""
+    tables = {
+        'chat': SyntheticTable(size, seed=INPUT_SEED, name='chat'),
+        'feedback': SyntheticTable(max(1, size // 10), seed=INPUT_SEED + 1, name='feedback'),
+    }
+    environment = {
+        'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback', 'SCAN_SEGMENTS': str(segments),
+        'CONTINUATION_TOKEN_SECRET': 'benchmark',
+    }
+
+    class Tables:
+        @staticmethod
+        def Table(name):
+            return tables[name]
+
+    index.clear_metrics_cache()
+    # Page pacing models DynamoDB, not the code under test; lift it
+    with patch.dict(os.environ, environment), patch.object(index, 'dynamodb', Tables()), \
+            patch.object(index, 'SCAN_MAX_PAGE_RATE', 1e9), \
+            patch.object(instrumentation, 'METRICS_SAMPLE_RATE', 0.0):
+        response = index.lambda_handler({'mode': 'scan', 'bypassCache': 'true'}, None)
+    body = json.loads(response['body'])
+    if response['statusCode'] != 200:
+        raise RuntimeError(f'Handler failed: {body}')
+    if verify:
+        expected = index.calculate_metrics(generate_items(size, seed=INPUT_SEED))
+        actual = (body['totalChatLogs'], body['reviewedChatLogs'], body['pendingChatLogs'])
+        if actual != expected:
+            raise RuntimeError(f'Handler counts {actual} differ from {expected}')
+    return body
+
+
+def compare(cases: Dict[str, Dict[str, Any]], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Compare a run against the baseline.
+
+    Returns:
+        One message per case whose relative throughput fell more than its
+        tolerance below the baseline
+    """
+    regressions = []
+    default_tolerance = baseline.get('tolerance', DEFAULT_TOLERANCE)
+    for name, expected in baseline.get('cases', {}).items():
+        if name == 'calibration' or name not in cases:
+            continue
+        tolerance = expected.get('tolerance', default_tolerance)
+        floor = expected['relative'] * (1 - tolerance)
+        actual = cases[name]['relative']
+        if actual < floor:
+            regressions.append(
+                f'{name}: relative throughput {actual:.4f} is below {floor:.4f} '
+                f'(baseline {expected["relative"]:.4f}, tolerance {tolerance:.0%})'
+            )
+    return regressions
+
+
+def load_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_json(path: str, document: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1m'], help='Handler table sizes (e.g. 10k 1m 10m)')
+    parser.add_argument('--repeat', type=int, default=15, help='Runs per case; the median counts')
+    parser.add_argument('--segments', type=int, default=1, help='SCAN_SEGMENTS for the handler cases')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Results file (JSON)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline file (JSON)')
+    parser.add_argument('--update-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--no-check', action='store_true', help='Do not compare against the baseline')
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes]
+    run_handler(min(sizes + [10_000]), args.segments, verify=True)
+
+    cases = run_cases(sizes, args.repeat, args.segments)
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'seed': INPUT_SEED,
+        'cases': cases,
+    }
+    write_json(args.output, results)
+    print(f'Results written to {args.output}')
+
+    baseline = load_json(args.baseline)
+    if args.update_baseline:
+        tolerance = (baseline or {}).get('tolerance', DEFAULT_TOLERANCE)
+        previous = (baseline or {}).get('cases', {})
+        write_json(args.baseline, {
+            'tolerance': tolerance,
+            'recorded': {key: results[key] for key in ('python', 'platform', 'machine', 'timestamp', 'seed')},
+            'cases': {
+                name: dict(
+                    {'relative': result['relative']},
+                    **({'tolerance': previous[name]['tolerance']} if 'tolerance' in previous.get(name, {}) else {})
+                )
+                for name, result in cases.items()
+            },
+        })
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    if args.no_check or baseline is None:
+        return 0
+    regressions = compare(cases, baseline)
+    for message in regressions:
+        print(f'REGRESSION {message}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
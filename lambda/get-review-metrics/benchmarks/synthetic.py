@@ -0,0 +1,187 @@
+"""
+Synthetic review items and a paginated table that generates them on demand.
+
+Each review field (rev_comment, rev_feedback) is independently empty,
+whitespace-only, filled with content or missing, with weights close to the
+production tables: most logs are unreviewed, so missing and empty fields
+dominate. Item i is always the same for a given seed, so runs are
+reproducible and parallel segments see the same items as a serial scan.
+
+SyntheticTable never holds the items in memory; a page is built when it is
+requested. That keeps the 10M-item handler benchmark within a laptop's
+memory, where FakeTable would need the whole table as Python dicts.
+"""
+
+import random
+from typing import Any, Dict, Iterator, List, Optional
+
+from fake_dynamodb import evaluate_condition
+
+
+# Share of each field state per review field
+DEFAULT_FIELD_MIX = {
+    'missing': 0.40,
+    'empty': 0.30,
+    'whitespace': 0.05,
+    'content': 0.25,
+}
+
+_WHITESPACE = (' ', '  ', '\t', '\n', ' \r\n ')
+_CONTENT = (
+    'Looks correct',
+    'Answer is missing the fee schedule',
+    'Escalated to carrier support',
+    'ok',
+    ' Leading space but reviewed',
+    'Réponse correcte',
+)
+
+# Distinct field combinations cycled through by item number
+TEMPLATE_COUNT = 4096
+
+# Approximate stored size of one item, for ConsumedCapacity
+ITEM_BYTES = 96
+
+
+def field_value(state: str, rng: random.Random) -> Optional[str]:
+    """A review field value in the given state (None = attribute missing)."""
+    if state == 'missing':
+        return None
+    if state == 'empty':
+        return ''
+    if state == 'whitespace':
+        return rng.choice(_WHITESPACE)
+    return rng.choice(_CONTENT)
+
+
+def build_templates(seed: int = 0, field_mix: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Draw TEMPLATE_COUNT review field combinations.
+
+    Args:
+        seed: Random seed
+        field_mix: Field state -> weight (default DEFAULT_FIELD_MIX)
+
+    Returns:
+        List of dicts holding only the present review fields
+    """
+    mix = field_mix or DEFAULT_FIELD_MIX
+    states, weights = list(mix), list(mix.values())
+    rng = random.Random(seed)
+    templates = []
+    for _ in range(TEMPLATE_COUNT):
+        template = {}
+        for field in ('rev_comment', 'rev_feedback'):
+            value = field_value(rng.choices(states, weights)[0], rng)
+            if value is not None:
+                template[field] = value
+        templates.append(template)
+    return templates
+
+
+def generate_items(count: int, seed: int = 0,
+                   field_mix: Optional[Dict[str, float]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield the items of a SyntheticTable of count items, in key order."""
+    table = SyntheticTable(count, seed=seed, field_mix=field_mix)
+    return (table.item(i) for i in range(count))
+
+
+def large_comment_items(count: int, comment_bytes: int = 4096, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Items with multi-KB review comments, for the string-handling cost.
+
+    Three quarters carry a comment_bytes comment in rev_comment or
+    rev_feedback, as typed into a text area: some end in a newline, some
+    start with whitespace. The rest hold short whitespace-only or empty
+    fields. Strings are drawn from a small pool, so memory stays low for
+    large counts.
+
+    Args:
+        count: Number of items
+        comment_bytes: Approximate length of each comment
+        seed: Random seed
+
+    Returns:
+        List of items
+    """
+    rng = random.Random(seed)
+    filler = ('Reviewer notes on the answer quality. ' * (comment_bytes // 38 + 1))[:comment_bytes]
+    pool = []
+    for _ in range(64):
+        kind = rng.random()
+        if kind < 0.3:
+            pool.append({'rev_comment': filler})
+        elif kind < 0.5:
+            pool.append({'rev_comment': filler + '\n'})
+        elif kind < 0.6:
+            pool.append({'rev_comment': '  ' + filler})
+        elif kind < 0.75:
+            pool.append({'rev_comment': '', 'rev_feedback': filler + '\n'})
+        else:
+            pool.append({'rev_comment': rng.choice(_WHITESPACE), 'rev_feedback': ''})
+    return [dict(pool[i % len(pool)], log_id=f'log-{i:010d}') for i in range(count)]
+
+
+class SyntheticTable:
+    """
+    Read-only table of generated items, paginated like DynamoDB Scan.
+
+    Supports Segment/TotalSegments, ExclusiveStartKey, Select='COUNT',
+    FilterExpression and ReturnConsumedCapacity. ProjectionExpression is
+    accepted and ignored, as items only carry the projected fields.
+
+    Args:
+        item_count: Number of items in the table
+        page_size: Items read per Scan page (about 1 MB of real items)
+        seed: Random seed of the field mix
+        field_mix: Field state -> weight (default DEFAULT_FIELD_MIX)
+        name: Table name
+    """
+
+    def __init__(self, item_count: int, page_size: int = 5000, seed: int = 0,
+                 field_mix: Optional[Dict[str, float]] = None, name: str = 'synthetic'):
+        self.item_count = item_count
+        self.page_size = page_size
+        self.table_name = name
+        self.table_size_bytes = item_count * ITEM_BYTES
+        self.templates = build_templates(seed, field_mix)
+        self.scan_calls = 0
+
+    def item(self, i: int) -> Dict[str, Any]:
+        """
+        Item i. It uses template (i * 2654435761) mod TEMPLATE_COUNT, a
+        fixed scramble, so neighbouring items differ but runs are identical.
+        """
+        item = {'log_id': f'log-{i:010d}'}
+        item.update(self.templates[(i * 2654435761) % TEMPLATE_COUNT])
+        return item
+
+    def scan(self, **kwargs: Any) -> Dict[str, Any]:
+        self.scan_calls += 1
+        total_segments = kwargs.get('TotalSegments', 1)
+        segment = kwargs.get('Segment', 0)
+        segment_start = self.item_count * segment // total_segments
+        segment_end = self.item_count * (segment + 1) // total_segments
+
+        start_key = kwargs.get('ExclusiveStartKey')
+        start = segment_start if start_key is None else int(start_key['log_id'][4:]) + 1
+        end = min(start + kwargs.get('Limit', self.page_size), segment_end)
+
+        candidates = [self.item(i) for i in range(start, end)]
+        filter_expression = kwargs.get('FilterExpression')
+        if filter_expression is not None:
+            matched = [item for item in candidates if evaluate_condition(filter_expression, item)]
+        else:
+            matched = candidates
+
+        response: Dict[str, Any] = {'Count': len(matched), 'ScannedCount': len(candidates)}
+        if kwargs.get('Select') != 'COUNT':
+            response['Items'] = matched
+        if end < segment_end:
+            response['LastEvaluatedKey'] = {'log_id': candidates[-1]['log_id']}
+        if kwargs.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            response['ConsumedCapacity'] = {
+                'TableName': self.table_name,
+                'CapacityUnits': max(1, -(-len(candidates) * ITEM_BYTES // 4096)) * 0.5,
+            }
+        return response
@@ -0,0 +1,294 @@
+"""
+Lambda function to summarise AI evaluation job metrics server-side.
+
+Scans the UnityAIAssistantEvalJob table and reduces every job's results to
+one summary per metricName (Builtin.Correctness, Builtin.Helpfulness, ...):
+- Average score over the metric's results (average) and over all jobs
+  (jobAverage, a job without the metric counting as 0, as on the dashboard)
+- Average in the current and the previous period and the change between them
+- Score distribution in ten 0.1-wide bins, matching the AI metrics dashboard
+
+The dashboard no longer needs to download every job and loop over
+job.results in the browser; the response only holds the summary.
+
+Scores arrive as Decimal. They are converted once into compact float arrays
+(array('d'), 8 bytes per score) per metric, so a segment's scan holds no
+per-result Python objects, and each metric's summary is one pass over them.
+"""
+
+import json
+import math
+import os
+import time
+from array import array
+from typing import Dict, Any, Iterable, Optional
+
+# dynamodb is GetReviewMetrics' configured, thread-safe client handle
+from index import (
+    choose_segment_count,
+    dynamodb,
+    get_event_param,
+    iter_scan_responses,
+    parse_timestamp,
+    format_timestamp,
+    run_segments,
+)
+
+
+# Upper edges of the dashboard's score distribution bins ('0.0-0.1', ...).
+# A score on an edge falls into the lower bin, as on the dashboard.
+SCORE_BIN_EDGES = tuple(round(0.1 * (index + 1), 1) for index in range(10))
+
+# Length of the current and the previous period for the change
+DEFAULT_PERIOD_DAYS = 7
+
+
+class MetricScores:
+    """
+    Scores of one metric as parallel float arrays.
+
+    Attributes:
+        scores: Score of every result
+        times: Job timestamp (epoch seconds, NaN if unknown) of every result
+    """
+
+    __slots__ = ('scores', 'times')
+
+    def __init__(self):
+        self.scores = array('d')
+        self.times = array('d')
+
+    def extend(self, other: 'MetricScores') -> None:
+        self.scores.extend(other.scores)
+        self.times.extend(other.times)
+
+
+def collect_scores(jobs: Iterable[Dict[str, Any]]) -> tuple[int, Dict[str, MetricScores]]:
+    """
+    Convert evaluation jobs into per-metric float arrays in a single pass.
+
+    Results without a metricName or a numeric result are skipped.
+
+    Args:
+        jobs: Evaluation job items with 'timestamp' and 'results'
+
+    Returns:
+        Tuple of (job count, metricName -> MetricScores)
+    """
+    job_count = 0
+    metrics: Dict[str, MetricScores] = {}
+    for job in jobs:
+        job_count += 1
+        job_time = parse_timestamp(job.get('timestamp'))
+        if job_time is None:
+            job_time = math.nan
+
+        for result in job.get('results') or []:
+            if not isinstance(result, dict):
+                continue
+            name = result.get('metricName')
+            score = result.get('result')
+            if not isinstance(name, str) or score is None or isinstance(score, bool):
+                continue
+            try:
+                score = float(score)
+            except (TypeError, ValueError):
+                continue
+
+            metric = metrics.get(name)
+            if metric is None:
+                metric = metrics[name] = MetricScores()
+            metric.scores.append(score)
+            metric.times.append(job_time)
+
+    return job_count, metrics
+
+
+def summarise_scores(
+    metric: MetricScores,
+    period_end: float,
+    period_seconds: float,
+    job_count: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Reduce one metric's arrays to its summary.
+
+    average and the period averages divide by the number of results of the
+    metric. The AI metrics dashboard divides the score sum by the number of
+    jobs instead, so jobs without the metric lower its value; jobAverage
+    reproduces that figure.
+
+    Args:
+        metric: The metric's scores and job times
+        period_end: End of the current period (epoch seconds)
+        period_seconds: Length of the current and the previous period
+        job_count: Number of jobs scanned, for jobAverage
+
+    Returns:
+        Dict with count, average, jobAverage (None without job_count),
+        currentAverage, previousAverage, change (currentAverage -
+        previousAverage, None if a period has no scores) and distribution
+        (counts per 0.1-wide bin)
+    """
+    current_start = period_end - period_seconds
+    previous_start = current_start - period_seconds
+
+    # One pass over the arrays: sums and counts per period and the bins
+    total = current_total = previous_total = 0.0
+    current_count = previous_count = 0
+    distribution = [0] * len(SCORE_BIN_EDGES)
+    last_bin = len(SCORE_BIN_EDGES) - 1
+    for score, job_time in zip(metric.scores, metric.times):
+        total += score
+        # NaN times (unknown) fail both comparisons and fall into neither period
+        if current_start <= job_time < period_end:
+            current_total += score
+            current_count += 1
+        elif previous_start <= job_time < current_start:
+            previous_total += score
+            previous_count += 1
+        if 0 <= score <= SCORE_BIN_EDGES[-1]:
+            # int(score * 10) is the bin up to rounding next to an edge
+            position = min(int(score * 10), last_bin)
+            if position and score <= SCORE_BIN_EDGES[position - 1]:
+                position -= 1
+            elif score > SCORE_BIN_EDGES[position]:
+                position += 1
+            distribution[position] += 1
+
+    count = len(metric.scores)
+    current_average = current_total / current_count if current_count else None
+    previous_average = previous_total / previous_count if previous_count else None
+    change = None
+    if current_average is not None and previous_average is not None:
+        change = current_average - previous_average
+
+    return {
+        'count': count,
+        'average': total / count if count else None,
+        'jobAverage': total / job_count if job_count else None,
+        'currentAverage': current_average,
+        'previousAverage': previous_average,
+        'change': change,
+        'distribution': distribution,
+    }
+
+
+def aggregate_eval_jobs(table, total_segments: int = 1) -> tuple[int, Dict[str, MetricScores]]:
+    """
+    Scan the evaluation job table into per-metric float arrays.
+
+    Only the timestamp and results are projected. Each parallel segment
+    folds its pages into its own arrays, which are concatenated at the end.
+
+    Args:
+        table: DynamoDB table resource
+        total_segments: Number of parallel scan segments (1 = serial scan)
+
+    Returns:
+        Tuple of (job count, metricName -> MetricScores)
+    """
+    scan_kwargs = {
+        'ProjectionExpression': '#ts, results',
+        'ExpressionAttributeNames': {'#ts': 'timestamp'},
+    }
+
+    def collect_segment(segment, total):
+        job_count = 0
+        metrics: Dict[str, MetricScores] = {}
+        for response in iter_scan_responses(table, scan_kwargs, segment, total):
+            page_jobs, page_metrics = collect_scores(response.get('Items', []))
+            job_count += page_jobs
+            for name, scores in page_metrics.items():
+                metrics.setdefault(name, MetricScores()).extend(scores)
+        return job_count, metrics
+
+    job_count = 0
+    metrics: Dict[str, MetricScores] = {}
+    for segment_jobs, segment_metrics in run_segments(collect_segment, total_segments):
+        job_count += segment_jobs
+        for name, scores in segment_metrics.items():
+            metrics.setdefault(name, MetricScores()).extend(scores)
+    return job_count, metrics
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler for the evaluation job metric summary.
+
+    Environment Variables:
+        EVAL_JOB_TABLE: Name of the UnityAIAssistantEvalJob DynamoDB table
+
+    Event Parameters (top level or queryStringParameters):
+        periodDays: Length of the current and previous period (default 7)
+        end: ISO 8601 end of the current period (default now)
+
+    Returns:
+        API Gateway response with totalJobs, the period and one summary per
+        metricName under "metrics"
+    """
+    try:
+        table_name = os.environ['EVAL_JOB_TABLE']
+
+        try:
+            period_days = float(get_event_param(event, 'periodDays', DEFAULT_PERIOD_DAYS))
+            if not period_days > 0:
+                raise ValueError(f"periodDays must be positive: {period_days}")
+            end = get_event_param(event, 'end')
+            period_end = time.time() if end is None else parse_timestamp(end)
+            if period_end is None:
+                raise ValueError(f"Invalid end: {end}")
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({
+                    'error': 'Invalid request',
+                    'message': str(e)
+                })
+            }
+        period_seconds = period_days * 86400
+
+        start = time.perf_counter()
+        table = dynamodb.Table(table_name)
+        job_count, metrics = aggregate_eval_jobs(table, choose_segment_count(table))
+
+        body = {
+            'totalJobs': job_count,
+            'period': {
+                'days': period_days,
+                'currentStart': format_timestamp(int(period_end - period_seconds)),
+                'end': format_timestamp(int(period_end)),
+            },
+            'metrics': {
+                name: summarise_scores(scores, period_end, period_seconds, job_count)
+                for name, scores in sorted(metrics.items())
+            },
+            'durationMs': round((time.perf_counter() - start) * 1000, 1),
+        }
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps(body)
+        }
+
+    except KeyError as e:
+        error_msg = f"Missing environment variable: {str(e)}"
+        print(error_msg)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'error': 'Configuration error',
+                'message': error_msg
+            })
+        }
+
+    except Exception as e:
+        error_msg = f"Error calculating evaluation metrics: {str(e)}"
+        print(error_msg)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'error': 'Failed to calculate evaluation metrics',
+                'message': str(e)
+            })
+        }
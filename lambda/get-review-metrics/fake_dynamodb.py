@@ -0,0 +1,299 @@
+"""
+In-memory stand-in for a DynamoDB table resource.
+
+Used by the unit tests and the benchmarks in ``benchmarks/`` so the metrics
+scan logic can be exercised without AWS credentials or a running DynamoDB
+Local. Only the parts of the ``Table`` API that GetReviewMetrics uses are
+implemented.
+"""
+
+import bisect
+import hashlib
+import time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import AttributeBase, ConditionBase, Size
+
+
+_MISSING = object()
+
+
+def _type_code(value: Any) -> str:
+    """DynamoDB type descriptor of a deserialised Python value."""
+    if isinstance(value, bool):
+        return 'BOOL'
+    if isinstance(value, str):
+        return 'S'
+    if isinstance(value, (int, float, Decimal)):
+        return 'N'
+    if isinstance(value, (bytes, bytearray)):
+        return 'B'
+    if value is None:
+        return 'NULL'
+    if isinstance(value, list):
+        return 'L'
+    if isinstance(value, dict):
+        return 'M'
+    if isinstance(value, (set, frozenset)):
+        element = next(iter(value), '')
+        return {'S': 'SS', 'N': 'NS', 'B': 'BS'}[_type_code(element)]
+    raise TypeError(f'Unsupported attribute value: {value!r}')
+
+
+def _sort_key(value: Any) -> Any:
+    """Comparison key matching DynamoDB ordering (strings by UTF-8 bytes)."""
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return Decimal(value)
+    return value
+
+
+def _operand(operand: Any, item: Dict[str, Any]) -> Any:
+    """Resolve an attribute reference, size() call or literal against an item."""
+    if isinstance(operand, Size):
+        value = _operand(operand._values[0], item)
+        if value is _MISSING:
+            return _MISSING
+        if isinstance(value, str):
+            return len(value.encode('utf-8'))
+        if isinstance(value, (bytes, bytearray, list, dict, set, frozenset)):
+            return len(value)
+        return _MISSING
+    if isinstance(operand, AttributeBase):
+        return item.get(operand.name, _MISSING)
+    return operand
+
+
+def _compare(left: Any, right: Any, operator: str) -> bool:
+    if left is _MISSING or right is _MISSING:
+        return False
+    if _type_code(left) != _type_code(right):
+        return operator == '<>'
+    left, right = _sort_key(left), _sort_key(right)
+    return {
+        '=': left == right,
+        '<>': left != right,
+        '<': left < right,
+        '<=': left <= right,
+        '>': left > right,
+        '>=': left >= right,
+    }[operator]
+
+
+def evaluate_condition(condition: ConditionBase, item: Dict[str, Any]) -> bool:
+    """
+    Evaluate a boto3 ``Key``/``Attr`` condition against a deserialised item.
+
+    Supports the operators used by GetReviewMetrics: comparisons, between,
+    begins_with, attribute_exists/not_exists, attribute_type, size(), AND,
+    OR and NOT. Type mismatches evaluate to false, as in DynamoDB.
+    """
+    operator = condition.expression_operator
+    values = condition._values
+
+    if operator == 'AND':
+        return evaluate_condition(values[0], item) and evaluate_condition(values[1], item)
+    if operator == 'OR':
+        return evaluate_condition(values[0], item) or evaluate_condition(values[1], item)
+    if operator == 'NOT':
+        return not evaluate_condition(values[0], item)
+    if operator == 'attribute_exists':
+        return _operand(values[0], item) is not _MISSING
+    if operator == 'attribute_not_exists':
+        return _operand(values[0], item) is _MISSING
+    if operator == 'attribute_type':
+        value = _operand(values[0], item)
+        return value is not _MISSING and _type_code(value) == values[1]
+    if operator == 'begins_with':
+        value = _operand(values[0], item)
+        return isinstance(value, str) and value.startswith(values[1])
+    if operator == 'contains':
+        value = _operand(values[0], item)
+        if isinstance(value, str):
+            return isinstance(values[1], str) and values[1] in value
+        return isinstance(value, (list, set, frozenset)) and values[1] in value
+    if operator == 'BETWEEN':
+        value = _operand(values[0], item)
+        return _compare(value, values[1], '>=') and _compare(value, values[2], '<=')
+    if operator == 'IN':
+        value = _operand(values[0], item)
+        return any(_compare(value, candidate, '=') for candidate in values[1])
+    return _compare(_operand(values[0], item), _operand(values[1], item), operator)
+
+
+def _key_hash(value: Any) -> int:
+    """Stable 128-bit hash used to order items and assign scan segments."""
+    return int.from_bytes(hashlib.md5(str(value).encode('utf-8')).digest(), 'big')
+
+
+class FakeTable:
+    """
+    Minimal fake of ``boto3.resource('dynamodb').Table``.
+
+    Items are kept in hash order of their partition key, the same way
+    DynamoDB returns them from a Scan, so a parallel scan segment is a
+    contiguous slice of the serial scan order. Global secondary indexes are
+    kept in hash order of the index partition key and sort key order within
+    a partition, so a Query returns one partition sorted by its sort key.
+
+    Args:
+        items: Items stored in the table
+        key_name: Partition key attribute name
+        page_size: Maximum number of items returned per Scan/Query page
+        page_latency: Seconds to sleep per Scan/Query call, simulating a round trip
+        name: Table name reported by ``table_name``
+        indexes: Global secondary indexes, index name -> (partition key, sort key)
+    """
+
+    def __init__(
+        self,
+        items: List[Dict[str, Any]],
+        key_name: str = 'id',
+        page_size: int = 100,
+        page_latency: float = 0.0,
+        name: str = 'fake-table',
+        indexes: Optional[Dict[str, Tuple[str, Optional[str]]]] = None
+    ):
+        self.key_name = key_name
+        self.page_size = page_size
+        self.page_latency = page_latency
+        self.table_name = name
+        self.indexes = dict(indexes or {})
+        self.scan_calls: List[Dict[str, Any]] = []
+        self.query_calls: List[Dict[str, Any]] = []
+
+        self._items = sorted(items, key=lambda item: _key_hash(item[key_name]))
+        self._views = {None: self._build_view(self._items, key_name, None)}
+        for index_name, (hash_key, range_key) in self.indexes.items():
+            indexed = [
+                item for item in self._items
+                if hash_key in item and (range_key is None or range_key in item)
+            ]
+            self._views[index_name] = self._build_view(indexed, hash_key, range_key)
+
+    def _build_view(self, items: List[Dict[str, Any]], hash_key: str, range_key: Optional[str]) -> Tuple:
+        """Order items like DynamoDB does for a table or index with this key schema."""
+        def order(item):
+            sort_value = _sort_key(item[range_key]) if range_key else b''
+            return _key_hash(item[hash_key]), sort_value, _key_hash(item[self.key_name])
+
+        ordered = sorted(items, key=order)
+        hashes = [_key_hash(item[hash_key]) for item in ordered]
+        positions = {item[self.key_name]: index for index, item in enumerate(ordered)}
+        key_names = [self.key_name] + [name for name in (hash_key, range_key) if name and name != self.key_name]
+        return ordered, hashes, positions, key_names
+
+    @property
+    def item_count(self) -> int:
+        return len(self._items)
+
+    @property
+    def table_size_bytes(self) -> int:
+        return sum(len(str(item)) for item in self._items)
+
+    @staticmethod
+    def _segment_bounds(hashes: List[int], segment: int, total_segments: int) -> Tuple[int, int]:
+        """Return the [start, end) item positions covered by a scan segment."""
+        lower = (segment << 128) // total_segments
+        upper = ((segment + 1) << 128) // total_segments
+        return bisect.bisect_left(hashes, lower), bisect.bisect_left(hashes, upper)
+
+    @staticmethod
+    def _project(item: Dict[str, Any], projection_expression: Optional[str],
+                 attribute_names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        if not projection_expression:
+            return dict(item)
+        attribute_names = attribute_names or {}
+        names = [name.strip() for name in projection_expression.split(',')]
+        names = [attribute_names.get(name, name) for name in names]
+        return {name: item[name] for name in names if name in item}
+
+    def _page(self, kwargs: Dict[str, Any], candidates: List[Dict[str, Any]], key_names: List[str],
+              has_more: bool) -> Dict[str, Any]:
+        """Build a Scan/Query response from the items read for one page."""
+        # Like DynamoDB, Limit and pagination apply before the filter
+        filter_expression = kwargs.get('FilterExpression')
+        if filter_expression is not None:
+            matched = [item for item in candidates if evaluate_condition(filter_expression, item)]
+        else:
+            matched = candidates
+
+        response: Dict[str, Any] = {
+            'Count': len(matched),
+            'ScannedCount': len(candidates),
+        }
+        if kwargs.get('Select') != 'COUNT':
+            response['Items'] = [
+                self._project(item, kwargs.get('ProjectionExpression'), kwargs.get('ExpressionAttributeNames'))
+                for item in matched
+            ]
+        if has_more:
+            response['LastEvaluatedKey'] = {name: candidates[-1][name] for name in key_names}
+        if kwargs.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            # Eventually consistent reads: 0.5 RCU per 4 KB read, rounded up
+            read_bytes = sum(len(str(item)) for item in candidates)
+            response['ConsumedCapacity'] = {
+                'TableName': self.table_name,
+                'CapacityUnits': max(1, -(-read_bytes // 4096)) * 0.5,
+            }
+        # Approximate wire size of the returned items, as boto3 reports it
+        returned_bytes = sum(len(str(item)) for item in response.get('Items', ()))
+        response['ResponseMetadata'] = {'HTTPHeaders': {'content-length': str(returned_bytes)}}
+        return response
+
+    def scan(self, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Return one Scan page.
+
+        Honours IndexName, Segment/TotalSegments, ExclusiveStartKey, Limit,
+        ProjectionExpression, FilterExpression (as a boto3 condition),
+        Select='COUNT' and ReturnConsumedCapacity.
+        """
+        self.scan_calls.append(kwargs)
+        if self.page_latency:
+            time.sleep(self.page_latency)
+
+        items, hashes, positions, key_names = self._views[kwargs.get('IndexName')]
+        total_segments = kwargs.get('TotalSegments', 1)
+        segment = kwargs.get('Segment', 0)
+        start, end = self._segment_bounds(hashes, segment, total_segments)
+
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key is not None:
+            start = positions[start_key[self.key_name]] + 1
+
+        limit = min(kwargs.get('Limit', self.page_size), self.page_size)
+        stop = min(start + limit, end)
+        return self._page(kwargs, items[start:stop], key_names, stop < end)
+
+    def query(self, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Return one Query page.
+
+        Honours IndexName, KeyConditionExpression (as a boto3 condition),
+        ScanIndexForward, ExclusiveStartKey, Limit, ProjectionExpression,
+        FilterExpression, Select='COUNT' and ReturnConsumedCapacity.
+        """
+        self.query_calls.append(kwargs)
+        if self.page_latency:
+            time.sleep(self.page_latency)
+
+        items, _, _, key_names = self._views[kwargs.get('IndexName')]
+        key_condition = kwargs['KeyConditionExpression']
+        matching = [item for item in items if evaluate_condition(key_condition, item)]
+        if not kwargs.get('ScanIndexForward', True):
+            matching.reverse()
+
+        start = 0
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key is not None:
+            start = next(
+                index + 1 for index, item in enumerate(matching)
+                if item[self.key_name] == start_key[self.key_name]
+            )
+
+        limit = min(kwargs.get('Limit', self.page_size), self.page_size)
+        stop = min(start + limit, len(matching))
+        return self._page(kwargs, matching[start:stop], key_names, stop < len(matching))
@@ -10,94 +10,3466 @@ and calculates:
 Requirements: 8.1, 8.2, 8.3, 8.4, 8.5, 8.6
 """
 
+import base64
+import bisect
+import hashlib
+import heapq
+import hmac
 import json
 import boto3
+import instrumentation
+import math
+import operator
 import os
-from typing import Dict, List, Any
+import random
+import sketches
+import threading
+import time
+from array import array
+from boto3.dynamodb.conditions import Attr, ConditionBase, ConditionExpressionBuilder, Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+from itertools import islice
+from statistics import NormalDist
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, TypeVar
 
 
-dynamodb = boto3.resource('dynamodb')
+T = TypeVar('T')
+
+# Attributes that decide whether an item has been reviewed
+REVIEW_FIELDS = ('rev_comment', 'rev_feedback')
+
+# Items calculate_metrics classifies at a time when given a generator
+CLASSIFY_BATCH_SIZE = 1000
+
+# 'scan' streams every item through is_reviewed; 'count' counts server-side;
+# 'counters' reads the counters kept by stream_consumer.py; 'carrier' queries
+# the carrier GSIs for a per-carrier breakdown; 'timeseries' buckets the
+# counts by the GSI sort key (item time); 'tags' aggregates chat log issue tags;
+# 'pending' lists the IDs of pending items
+METRICS_MODES = ('scan', 'count', 'counters', 'carrier', 'timeseries', 'tags', 'pending', 'registry', 'estimate')
+
+# Carrier GSIs defined in the stack: response key -> (index name, partition key, sort key)
+CARRIER_INDEXES = {
+    'chatLogs': ('byCarrierName', 'carrier_name', 'timestamp'),
+    'feedbackLogs': ('byCarrier', 'carrier', 'datetime'),
+}
+
+# Set by the proxy to the time of an item's first review
+REVIEW_DATE_FIELD = 'rev_date'
+
+# Review turnaround percentiles ('registry' mode) and their relative accuracy
+TURNAROUND_QUANTILES = (0.5, 0.9, 0.99)
+TURNAROUND_RELATIVE_ACCURACY = 0.01
+
+# Attributes identifying the users and conversations of each table, for the
+# distinct counts and heavy hitters ('registry' mode); the first one present
+# identifies the item
+IDENTITY_ATTRIBUTES = {
+    'chatLogs': {'Users': ('user_name',), 'Conversations': ('session_id',)},
+    'feedbackLogs': {'Users': ('user_name', 'username'), 'Conversations': ('session_id',)},
+}
+
+# HyperLogLog precision of the distinct counts: 2**p one-byte registers,
+# standard error 1.04 / sqrt(2**p) (0.81% for 14)
+DISTINCT_PRECISION = int(os.environ.get('DISTINCT_PRECISION', '14'))
+
+# Heavy hitters reported by pending volume, and the keys each Space-Saving
+# summary monitors: counts overestimate by at most (items) / capacity
+HEAVY_HITTERS_TOP_K = 20
+HEAVY_HITTERS_CAPACITY = int(os.environ.get('HEAVY_HITTERS_CAPACITY', '1000'))
+
+# Modes that apply each filter parameter; the other modes reject it
+FILTER_PARAMETER_MODES = {
+    'carriers': ('scan', 'carrier', 'timeseries', 'tags', 'pending', 'registry'),
+    'start': ('scan', 'timeseries', 'tags', 'registry'),
+    'end': ('scan', 'timeseries', 'tags', 'registry'),
+    'reviewState': ('scan',),
+}
+
+# Review states a request can filter on ('reviewState')
+REVIEW_STATES = ('all', 'reviewed', 'pending')
+
+# Read planner for filtered requests. Without statistics per carrier it
+# assumes one carrier holds PLANNER_CARRIER_SHARE of a table's items, spread
+# evenly over PLANNER_TIME_SPAN_SECONDS.
+PLANNER_CARRIER_SHARE = float(os.environ.get('PLANNER_CARRIER_SHARE', '0.1'))
+PLANNER_TIME_SPAN_SECONDS = float(os.environ.get('PLANNER_TIME_SPAN_SECONDS', str(90 * 86400)))
+
+# An eventually consistent read costs 0.5 RCU per started 4 KB; IN accepts
+# at most 100 values
+READ_UNIT_BYTES = 4096
+MAX_IN_VALUES = 100
+
+# Estimate mode: the table is split into segments of about
+# ESTIMATE_PAGE_ITEMS items, and the first page of randomly chosen segments
+# is read, ESTIMATE_PARALLEL_SEGMENTS at a time, until the confidence
+# interval of the reviewed ratio is within the target error or
+# ESTIMATE_TIME_BUDGET_SECONDS have passed
+ESTIMATE_TARGET_ERROR = float(os.environ.get('ESTIMATE_TARGET_ERROR', '0.01'))
+ESTIMATE_CONFIDENCE = 0.95
+ESTIMATE_TIME_BUDGET_SECONDS = float(os.environ.get('ESTIMATE_TIME_BUDGET_SECONDS', '0.8'))
+ESTIMATE_PAGE_ITEMS = 1000
+ESTIMATE_PARALLEL_SEGMENTS = 8
+ESTIMATE_MIN_SEGMENTS = 8
+ESTIMATE_MAX_SEGMENTS = 512
+
+# DynamoDB's upper bound for TotalSegments
+MAX_TOTAL_SEGMENTS = 1_000_000
+
+# Key attribute of each table, listed by 'pending' mode
+TABLE_KEYS = {'chatLogs': 'log_id', 'feedbackLogs': 'id'}
+
+# Default and largest number of pending IDs per table in one response page
+PENDING_PAGE_SIZE = 100
+MAX_PENDING_PAGE_SIZE = 1000
+
+# Pending IDs kept in the warm-container cache over all entries (about 50
+# bytes each for UUIDs); least recently used lists are dropped beyond it
+PENDING_CACHE_MAX_IDS = int(os.environ.get('PENDING_CACHE_MAX_IDS', '200000'))
+
+# Time-series bucket widths and the largest number of buckets per request
+TIME_BUCKET_SECONDS = {'hour': 3600, 'day': 86400}
+MAX_TIME_BUCKETS = 2000
+
+# Buckets that ended more than this long ago are closed: their counts are
+# cached and not read again (allows for late-arriving items)
+TIME_BUCKET_SETTLE_SECONDS = int(os.environ.get('TIME_BUCKET_SETTLE_SECONDS', '300'))
+
+# Distinct issue_tags strings whose decoded tag sets are kept
+TAG_DECODE_CACHE_SIZE = 4096
+
+# Open-ended time filters end at the next boundary of this many seconds
+OPEN_RANGE_END_SECONDS = 60
+
+# Parallel scan tuning. SCAN_SEGMENTS pins the segment count; otherwise it is
+# derived from the table size, one segment per SCAN_SEGMENT_TARGET_BYTES.
+MAX_SCAN_SEGMENTS = int(os.environ.get('MAX_SCAN_SEGMENTS', '16'))
+SCAN_SEGMENT_TARGET_BYTES = int(os.environ.get('SCAN_SEGMENT_TARGET_BYTES', str(64 * 1024 * 1024)))
+
+# Adaptive scan rate control (ScanRateController). Every Scan/Query page
+# requests ReturnConsumedCapacity='TOTAL'; a run stops once it has consumed
+# SCAN_RCU_BUDGET read units (0 = no budget). Throttled pages halve the page
+# rate and concurrency and are retried with jittered exponential backoff;
+# successful pages raise them again additively.
+SCAN_RCU_BUDGET = float(os.environ.get('SCAN_RCU_BUDGET', '0'))
+SCAN_MAX_PAGE_RATE = float(os.environ.get('SCAN_MAX_PAGE_RATE', '200'))
+SCAN_MIN_PAGE_RATE = 1.0
+AIMD_RATE_INCREASE = 5.0
+AIMD_DECREASE_FACTOR = 0.5
+MAX_THROTTLE_RETRIES = 8
+THROTTLE_BACKOFF_BASE_SECONDS = 0.05
+THROTTLE_BACKOFF_CAP_SECONDS = 5.0
+THROTTLING_ERROR_CODES = (
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+)
+
+# Scans stop and return a continuation token once less than this much
+# invocation time is left (Lambda timeout is 30 s)
+DEADLINE_MARGIN_MS = int(os.environ.get('DEADLINE_MARGIN_MS', '3000'))
+
+# METRICS_TABLE item holding a persisted continuation token
+CHECKPOINT_KEY = 'checkpoint#review-metrics'
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+# Warm-container result cache: key (table name, projection or index, mode, ...) -> (result, computed_at)
+METRICS_CACHE_TTL_SECONDS = float(os.environ.get('METRICS_CACHE_TTL_SECONDS', '30'))
+METRICS_CACHE_STALE_SECONDS = float(os.environ.get('METRICS_CACHE_STALE_SECONDS', '300'))
+# Keys include caller-supplied carriers and time ranges, so both caches are
+# LRU-bounded; expired results are dropped whenever a result is stored.
+METRICS_CACHE_MAX_ENTRIES = int(os.environ.get('METRICS_CACHE_MAX_ENTRIES', '256'))
+_metrics_cache: 'OrderedDict[tuple, tuple]' = OrderedDict()
+_metrics_cache_refreshing: set = set()
+_metrics_cache_lock = threading.Lock()
+
+# Closed time buckets: (table name, time field, interval, index, carriers) -> {bucket start: counts}.
+# Each key keeps at most MAX_TIME_BUCKETS of its latest buckets.
+BUCKET_CACHE_MAX_ENTRIES = int(os.environ.get('BUCKET_CACHE_MAX_ENTRIES', '64'))
+_bucket_cache: 'OrderedDict[tuple, Dict[int, tuple]]' = OrderedDict()
+
+# DynamoDB client timeouts in seconds
+DYNAMODB_CONNECT_TIMEOUT = float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', '2'))
+DYNAMODB_READ_TIMEOUT = float(os.environ.get('DYNAMODB_READ_TIMEOUT', '10'))
+
+# Connections a warm-up event ({"warmup": true}) opens ahead of real requests
+WARMUP_CONNECTIONS = int(os.environ.get('WARMUP_CONNECTIONS', '4'))
+
+
+class ClientTable:
+    """
+    Table handle on the low-level DynamoDB client.
+    
+    Offers the subset of the boto3 Table resource used here (scan, query,
+    get_item, put_item, delete_item, table_name, table_size_bytes,
+    item_count) with the
+    same native Python values: condition objects are built into expressions,
+    keys and values are serialized and items deserialized. Unlike resources,
+    clients are thread-safe, so one handle can serve every scan segment.
+    
+    scan_raw() skips deserializing the items, which is most of the CPU time
+    of a scan; classify its pages with calculate_raw_metrics.
+    
+    Args:
+        table_name: Name of the DynamoDB table
+        client: boto3 DynamoDB client
+    """
+    
+    def __init__(self, table_name: str, client):
+        self.table_name = table_name
+        self.client = client
+    
+    @property
+    def table_size_bytes(self) -> int:
+        return self.client.describe_table(TableName=self.table_name)['Table']['TableSizeBytes']
+    
+    @property
+    def item_count(self) -> int:
+        return self.client.describe_table(TableName=self.table_name)['Table']['ItemCount']
+    
+    def _request(
+        self,
+        operation: Callable[..., Dict[str, Any]],
+        kwargs: Dict[str, Any],
+        raw_items: bool = False
+    ) -> Dict[str, Any]:
+        params = dict(kwargs, TableName=self.table_name)
+        names = dict(params.pop('ExpressionAttributeNames', None) or {})
+        values = {
+            placeholder: _serializer.serialize(value)
+            for placeholder, value in (params.pop('ExpressionAttributeValues', None) or {}).items()
+        }
+        builder = ConditionExpressionBuilder()
+        for name in ('KeyConditionExpression', 'FilterExpression', 'ConditionExpression'):
+            condition = params.get(name)
+            if isinstance(condition, ConditionBase):
+                built = builder.build_expression(condition, is_key_condition=name == 'KeyConditionExpression')
+                params[name] = built.condition_expression
+                names.update(built.attribute_name_placeholders)
+                values.update({
+                    placeholder: _serializer.serialize(value)
+                    for placeholder, value in built.attribute_value_placeholders.items()
+                })
+        if names:
+            params['ExpressionAttributeNames'] = names
+        if values:
+            params['ExpressionAttributeValues'] = values
+        for name in ('Key', 'Item', 'ExclusiveStartKey'):
+            if name in params:
+                params[name] = {field: _serializer.serialize(value) for field, value in params[name].items()}
+        
+        response = operation(**params)
+        
+        recorder = instrumentation.active()
+        started = time.perf_counter() if recorder is not None else 0.0
+        if 'Items' in response and not raw_items:
+            response['Items'] = [
+                {field: _deserializer.deserialize(value) for field, value in item.items()}
+                for item in response['Items']
+            ]
+        for name in ('Item', 'LastEvaluatedKey', 'Attributes'):
+            if name in response:
+                response[name] = {field: _deserializer.deserialize(value) for field, value in response[name].items()}
+        if recorder is not None:
+            recorder.add_time('DeserializeTime', time.perf_counter() - started)
+        return response
+    
+    def scan(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._request(self.client.scan, kwargs)
+    
+    def scan_raw(self, **kwargs: Any) -> Dict[str, Any]:
+        """Scan, leaving Items as wire-format attribute maps ({'S': ...})."""
+        return self._request(self.client.scan, kwargs, raw_items=True)
+    
+    def query(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._request(self.client.query, kwargs)
+    
+    def get_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._request(self.client.get_item, kwargs)
+    
+    def put_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._request(self.client.put_item, kwargs)
+    
+    def delete_item(self, **kwargs: Any) -> Dict[str, Any]:
+        return self._request(self.client.delete_item, kwargs)
+
+
+class ClientTables:
+    """
+    Stand-in for the boto3 DynamoDB resource: Table() returns a ClientTable.
+    
+    The client is created by client_factory on first use rather than at
+    import, which keeps loading the DynamoDB service model out of the init
+    phase of invocations that never reach DynamoDB.
+    
+    Args:
+        client_factory: Callable returning a boto3 DynamoDB client
+    """
+    
+    def __init__(self, client_factory: Callable[[], Any]):
+        self._client_factory = client_factory
+        self._client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    recorder = instrumentation.active()
+                    started = time.perf_counter()
+                    self._client = self._client_factory()
+                    if recorder is not None:
+                        recorder.add_time('ClientInitTime', time.perf_counter() - started)
+        return self._client
+    
+    def Table(self, table_name: str) -> ClientTable:
+        return ClientTable(table_name, self.client)
+
+
+def create_dynamodb_client():
+    """
+    Create the DynamoDB client shared by every table handle and scan thread.
+    
+    Both tables are scanned at once, each with up to MAX_SCAN_SEGMENTS
+    threads, so the connection pool must fit every worker. botocore retries
+    throttled calls only briefly so that ScanRateController sees throttling
+    and slows the scans down, and the timeouts make a stalled connection fail
+    (and be retried) instead of holding a segment until the deadline.
+    """
+    return boto3.client(
+        'dynamodb',
+        config=Config(
+            max_pool_connections=2 * MAX_SCAN_SEGMENTS,
+            connect_timeout=DYNAMODB_CONNECT_TIMEOUT,
+            read_timeout=DYNAMODB_READ_TIMEOUT,
+            tcp_keepalive=True,
+            retries={'mode': 'standard', 'max_attempts': 3}
+        )
+    )
+
+
+dynamodb = ClientTables(create_dynamodb_client)
+
+
+def warm_up(table_names: Iterable[str], connections: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Handle a warm-up event: create the client and open pooled connections.
+    
+    Issues concurrent DescribeTable calls, which consume no read capacity,
+    so that many HTTPS connections are set up and kept in the pool for the
+    next real invocation of this container.
+    
+    Args:
+        table_names: Tables to describe (cycled over the connections)
+        connections: Number of concurrent calls (default WARMUP_CONNECTIONS,
+            at most the pool size)
+        
+    Returns:
+        Dict with the number of connections warmed and the time taken
+    """
+    started = time.perf_counter()
+    names = list(table_names)
+    count = min(WARMUP_CONNECTIONS if connections is None else connections, 2 * MAX_SCAN_SEGMENTS)
+    client = dynamodb.client
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        list(executor.map(
+            instrumentation.propagate(lambda i: client.describe_table(TableName=names[i % len(names)])),
+            range(count)
+        ))
+    return {
+        'warmup': True,
+        'connections': count,
+        'durationMs': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def get_event_param(event: Optional[Dict[str, Any]], name: str, default: Any = None) -> Any:
+    """
+    Read a request parameter from API Gateway queryStringParameters or,
+    for direct invocations, from the top level of the event.
+    """
+    event = event or {}
+    query_params = event.get('queryStringParameters') or {}
+    if name in query_params:
+        return query_params[name]
+    return event.get(name, default)
 
 
 def is_reviewed(item: Dict[str, Any]) -> bool:
     """
-    Determine if an item has been reviewed.
+    Determine if an item has been reviewed.
+    
+    An item is considered reviewed if either rev_comment OR rev_feedback
+    is not empty (after stripping whitespace).
+    
+    Args:
+        item: DynamoDB item containing rev_comment and rev_feedback fields
+        
+    Returns:
+        True if the item has been reviewed, False otherwise
+        
+    Validates: Requirements 8.2, 8.5
+    """
+    rev_comment = item.get('rev_comment', '')
+    rev_feedback = item.get('rev_feedback', '')
+    
+    # Check if either field has non-empty content after stripping whitespace
+    has_comment = bool(rev_comment and str(rev_comment).strip())
+    has_feedback = bool(rev_feedback and str(rev_feedback).strip())
+    
+    return has_comment or has_feedback
+
+
+def count_reviewed(items: Iterable[Dict[str, Any]]) -> int:
+    """
+    Count the reviewed items of a page; sum(map(is_reviewed, items)) without
+    copying strings.
+    
+    is_reviewed strips each field, which copies it; here a native str is
+    reviewed if it is non-empty and not all whitespace. str.isspace() stops at
+    the first non-whitespace character and uses the same whitespace table
+    as strip(), so the result is identical. Other values (str subclasses,
+    numbers, booleans) fall back to is_reviewed's test.
+    
+    Args:
+        items: Page (or any iterable) of DynamoDB items
+        
+    Returns:
+        Number of reviewed items
+    """
+    reviewed_count = 0
+    for item in items:
+        for field in REVIEW_FIELDS:
+            value = item.get(field)
+            if type(value) is str:
+                if value and not value.isspace():
+                    reviewed_count += 1
+                    break
+            elif value and str(value).strip():
+                reviewed_count += 1
+                break
+    return reviewed_count
+
+
+def count_reviewed_raw(items: Iterable[Dict[str, Dict[str, Any]]]) -> int:
+    """
+    count_reviewed for items in wire format, as returned by ClientTable.scan_raw.
+    
+    String attributes ({'S': ...}) are tested in place; any other type is
+    deserialized and passed to is_reviewed, so both always agree.
+    
+    Args:
+        items: Page of DynamoDB attribute maps, e.g. [{'rev_comment': {'S': 'ok'}}]
+        
+    Returns:
+        Number of reviewed items
+    """
+    reviewed_count = 0
+    for item in items:
+        for field in REVIEW_FIELDS:
+            value = item.get(field)
+            if value is None:
+                continue
+            text = value.get('S')
+            if text is None:
+                if is_reviewed({field: _deserializer.deserialize(value)}):
+                    reviewed_count += 1
+                    break
+            elif text and not text.isspace():
+                reviewed_count += 1
+                break
+    return reviewed_count
+
+
+def is_reviewed_raw(item: Dict[str, Dict[str, Any]]) -> bool:
+    """
+    is_reviewed for an item in wire format, as returned by ClientTable.scan_raw.
+    
+    Args:
+        item: DynamoDB attribute maps, e.g. {'rev_comment': {'S': 'ok'}}
+        
+    Returns:
+        True if the item has been reviewed, False otherwise
+    """
+    return count_reviewed_raw((item,)) == 1
+
+
+def choose_segment_count(table) -> int:
+    """
+    Pick the number of parallel scan segments for a table.
+    
+    The SCAN_SEGMENTS environment variable takes precedence. Otherwise the
+    count grows with the table size reported by DescribeTable, capped at
+    MAX_SCAN_SEGMENTS. Falls back to a serial scan if the size is unknown.
+    
+    Args:
+        table: DynamoDB table resource
+        
+    Returns:
+        Segment count between 1 and MAX_SCAN_SEGMENTS
+    """
+    configured = os.environ.get('SCAN_SEGMENTS')
+    if configured:
+        return max(1, min(int(configured), MAX_SCAN_SEGMENTS))
+    
+    try:
+        size_bytes = table.table_size_bytes
+    except Exception:
+        return 1
+    if not isinstance(size_bytes, (int, Decimal)):
+        return 1
+    
+    return max(1, min(math.ceil(size_bytes / SCAN_SEGMENT_TARGET_BYTES), MAX_SCAN_SEGMENTS))
+
+
+class CapacityBudgetExceeded(Exception):
+    """Raised when a run has used up its SCAN_RCU_BUDGET read capacity."""
+    
+    def __init__(self, consumed_units: float, budget_units: float):
+        super().__init__(f"Read capacity budget of {budget_units:g} RCUs exhausted ({consumed_units:g} consumed)")
+        self.consumed_units = consumed_units
+        self.budget_units = budget_units
+
+
+class ScanRateController:
+    """
+    Adaptive page rate and concurrency limit shared by the scans of one run.
+    
+    Every page request goes through request_page. Pages start no faster than
+    page_rate per second and at most concurrency pages are in flight across
+    all segments and tables. Both follow AIMD: each successful page adds
+    AIMD_RATE_INCREASE pages/s (and one slot per round of pages), each
+    throttled page multiplies both by AIMD_DECREASE_FACTOR. Throttled pages
+    are retried after a full-jitter exponential backoff.
+    
+    Consumed read capacity is summed from ReturnConsumedCapacity='TOTAL'.
+    exhausted() reports when the next page would exceed the budget, so
+    resumable scans can stop in time (see ScanInterrupted).
+    
+    Args:
+        budget_units: Read capacity units the run may consume (0 = unlimited,
+            default SCAN_RCU_BUDGET)
+        max_page_rate: Upper bound (and start value) of the page rate
+            (default SCAN_MAX_PAGE_RATE)
+        max_concurrency: Upper bound (and start value) of pages in flight
+            (default 2 * MAX_SCAN_SEGMENTS)
+    """
+    
+    def __init__(
+        self,
+        budget_units: Optional[float] = None,
+        max_page_rate: Optional[float] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        self.budget_units = SCAN_RCU_BUDGET if budget_units is None else budget_units
+        self.max_page_rate = SCAN_MAX_PAGE_RATE if max_page_rate is None else max_page_rate
+        self.max_concurrency = 2 * MAX_SCAN_SEGMENTS if max_concurrency is None else max_concurrency
+        self.page_rate = self.max_page_rate
+        self.concurrency = self.max_concurrency
+        self.consumed_units = 0.0
+        self.last_page_units = 0.0
+        self.pages = 0
+        self.throttles = 0
+        self._active = 0
+        self._round_pages = 0
+        self._next_start = 0.0
+        self._condition = threading.Condition()
+    
+    def exhausted(self) -> bool:
+        """True if another page of the last page's cost would exceed the budget."""
+        if not self.budget_units:
+            return False
+        with self._condition:
+            return self.consumed_units + self.last_page_units > self.budget_units
+    
+    def backoff_seconds(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt."""
+        ceiling = min(THROTTLE_BACKOFF_CAP_SECONDS, THROTTLE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+        return random.uniform(0, ceiling)
+    
+    def _acquire(self) -> None:
+        """
+        Wait for a concurrency slot and the next page start time.
+        
+        The slot is freed again if the wait for the start time fails, so an
+        interrupted caller never leaves the other segments blocked.
+        """
+        with self._condition:
+            while self._active >= self.concurrency:
+                self._condition.wait()
+            self._active += 1
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + 1.0 / self.page_rate
+        try:
+            if start_at > now:
+                time.sleep(start_at - now)
+        except BaseException:
+            self._release()
+            raise
+    
+    def _release(self, consumed_units: Optional[float] = None, throttled: bool = False) -> None:
+        """Free the slot and adapt the rate to the page's outcome."""
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                self.throttles += 1
+                self.page_rate = max(SCAN_MIN_PAGE_RATE, self.page_rate * AIMD_DECREASE_FACTOR)
+                self.concurrency = max(1, int(self.concurrency * AIMD_DECREASE_FACTOR))
+                self._round_pages = 0
+            elif consumed_units is not None:
+                self.pages += 1
+                self.consumed_units += consumed_units
+                self.last_page_units = consumed_units
+                self.page_rate = min(self.max_page_rate, self.page_rate + AIMD_RATE_INCREASE)
+                self._round_pages += 1
+                if self._round_pages >= self.concurrency:
+                    self._round_pages = 0
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self._condition.notify_all()
+    
+    def request_page(self, operation: Callable[..., Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        """
+        Issue one Scan/Query page with pacing, throttling retries and accounting.
+        
+        Args:
+            operation: table.scan or table.query
+            **kwargs: Request parameters
+            
+        Returns:
+            The page response
+            
+        Raises:
+            CapacityBudgetExceeded: If the budget is used up before the request
+            ClientError: If the request fails for another reason, or is still
+                throttled after MAX_THROTTLE_RETRIES retries
+        """
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            if self.exhausted():
+                raise CapacityBudgetExceeded(self.consumed_units, self.budget_units)
+            self._acquire()
+            try:
+                response = operation(ReturnConsumedCapacity='TOTAL', **kwargs)
+            except ClientError as e:
+                code = e.response.get('Error', {}).get('Code')
+                if code not in THROTTLING_ERROR_CODES or attempt == MAX_THROTTLE_RETRIES:
+                    self._release()
+                    raise
+                self._release(throttled=True)
+                time.sleep(self.backoff_seconds(attempt))
+                continue
+            except BaseException:
+                self._release()
+                raise
+            
+            consumed = response.get('ConsumedCapacity') or {}
+            self._release(float(consumed.get('CapacityUnits', 0)))
+            return response
+    
+    def summary(self) -> Dict[str, Any]:
+        """Consumed capacity and throttling of the run, for the response."""
+        with self._condition:
+            return {
+                'capacityUnits': round(self.consumed_units, 1),
+                'budgetUnits': self.budget_units or None,
+                'pages': self.pages,
+                'throttles': self.throttles,
+            }
+
+
+def _request_page(
+    operation: Callable[..., Dict[str, Any]],
+    controller: Optional[ScanRateController],
+    **kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Issue one page request, through the rate controller if there is one.
+    
+    Sampled invocations record the page's latency, size and capacity.
+    """
+    recorder = instrumentation.active()
+    started = time.perf_counter() if recorder is not None else 0.0
+    if controller is None:
+        response = operation(**kwargs)
+    else:
+        response = controller.request_page(operation, **kwargs)
+    if recorder is not None:
+        recorder.record_page(time.perf_counter() - started, response)
+    return response
+
+
+def iter_scan_responses(
+    table,
+    scan_kwargs: Dict[str, Any],
+    segment: Optional[int] = None,
+    total_segments: Optional[int] = None,
+    exclusive_start_key: Optional[Dict[str, Any]] = None,
+    controller: Optional[ScanRateController] = None,
+    raw: bool = False
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily issue the Scan requests for one segment (or the whole table).
+    
+    Only the current response is held in memory; the next Scan request is
+    not issued until the caller asks for the next response.
+    
+    Args:
+        table: DynamoDB table resource
+        scan_kwargs: Scan parameters other than the segment and start key
+        segment: Segment number for a parallel scan, None for a serial scan
+        total_segments: Total number of segments in the parallel scan
+        exclusive_start_key: LastEvaluatedKey to resume an interrupted scan from
+        controller: Optional rate controller every page request goes through
+        raw: Use table.scan_raw (a ClientTable), leaving items in wire format
+        
+    Yields:
+        Each raw Scan response
+    """
+    scan = table.scan_raw if raw else table.scan
+    scan_kwargs = dict(scan_kwargs)
+    if segment is not None:
+        scan_kwargs['Segment'] = segment
+        scan_kwargs['TotalSegments'] = total_segments
+    
+    # Initial scan
+    if exclusive_start_key is not None:
+        response = _request_page(scan, controller, **scan_kwargs, ExclusiveStartKey=exclusive_start_key)
+    else:
+        response = _request_page(scan, controller, **scan_kwargs)
+    yield response
+    
+    # Handle pagination
+    while 'LastEvaluatedKey' in response:
+        response = _request_page(
+            scan,
+            controller,
+            **scan_kwargs,
+            ExclusiveStartKey=response['LastEvaluatedKey']
+        )
+        yield response
+
+
+def iter_table_pages(
+    table,
+    projection_expression: str,
+    segment: Optional[int] = None,
+    total_segments: Optional[int] = None,
+    filter_expression: Optional[ConditionBase] = None,
+    controller: Optional[ScanRateController] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Lazily scan one segment of a table (or the whole table), page by page.
+    
+    Args:
+        table: DynamoDB table resource
+        projection_expression: Fields to retrieve from the table
+        segment: Segment number for a parallel scan, None for a serial scan
+        total_segments: Total number of segments in the parallel scan
+        filter_expression: Optional server-side filter condition
+        controller: Optional rate controller every page request goes through
+        
+    Yields:
+        The items of each Scan page
+    """
+    scan_kwargs = {'ProjectionExpression': projection_expression}
+    if filter_expression is not None:
+        scan_kwargs['FilterExpression'] = filter_expression
+    
+    for response in iter_scan_responses(table, scan_kwargs, segment, total_segments, controller=controller):
+        yield response.get('Items', [])
+
+
+def iter_table_items(
+    table,
+    projection_expression: str,
+    segment: Optional[int] = None,
+    total_segments: Optional[int] = None,
+    controller: Optional[ScanRateController] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield every item of a table segment (or the whole table).
+    
+    Args:
+        table: DynamoDB table resource
+        projection_expression: Fields to retrieve from the table
+        segment: Segment number for a parallel scan, None for a serial scan
+        total_segments: Total number of segments in the parallel scan
+        controller: Optional rate controller every page request goes through
+        
+    Yields:
+        Each scanned item
+    """
+    for page in iter_table_pages(table, projection_expression, segment, total_segments, controller=controller):
+        yield from page
+
+
+def run_segments(
+    function: Callable[[Optional[int], Optional[int]], T],
+    total_segments: int,
+    segments: Optional[Iterable[int]] = None
+) -> List[T]:
+    """
+    Call function(segment, total_segments) for every scan segment.
+    
+    A single segment runs inline as a serial scan (segment None); otherwise
+    each segment runs on its own thread and results come back in segment order.
+    segments restricts the run to some segment numbers (e.g. when resuming).
+    """
+    if total_segments <= 1:
+        return [function(None, None)] if segments is None or 0 in segments else []
+    
+    segments = list(range(total_segments) if segments is None else segments)
+    if not segments:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+        return list(executor.map(
+            instrumentation.propagate(lambda segment: function(segment, total_segments)),
+            segments
+        ))
+
+
+def scan_table_with_pagination(
+    table,
+    projection_expression: str,
+    total_segments: int = 1,
+    controller: Optional[ScanRateController] = None
+) -> List[Dict[str, Any]]:
+    """
+    Scan a DynamoDB table with automatic pagination handling.
+    
+    With total_segments > 1 the table is split into DynamoDB parallel scan
+    segments (Segment/TotalSegments) which are scanned concurrently on a
+    thread pool. Segments are concatenated in order, so the parallel path
+    returns the same items as the serial one.
+    
+    This materialises the whole table; use aggregate_table_metrics when only
+    the counts are needed.
+    
+    Args:
+        table: DynamoDB table resource
+        projection_expression: Fields to retrieve from the table
+        total_segments: Number of parallel scan segments (1 = serial scan)
+        controller: Optional rate controller for throttling retries,
+            pacing and consumed capacity accounting
+        
+    Returns:
+        List of all items from the table
+    """
+    segment_items = run_segments(
+        lambda segment, total: list(iter_table_items(table, projection_expression, segment, total, controller)),
+        total_segments
+    )
+    return [item for items in segment_items for item in items]
+
+
+@instrumentation.timed('ClassifyTime')
+def calculate_metrics(items: Iterable[Dict[str, Any]]) -> tuple[int, int, int]:
+    """
+    Calculate total, reviewed, and pending counts for a list of items.
+    
+    Items are consumed in a single pass, so a generator can be passed
+    instead of a list to keep memory use independent of the item count; it
+    is classified CLASSIFY_BATCH_SIZE items at a time with count_reviewed.
+    Sampled invocations add the run time to ClassifyTime, so hot paths pass
+    one page at a time rather than a generator that also fetches pages.
+    
+    Args:
+        items: List (or any iterable) of DynamoDB items
+        
+    Returns:
+        Tuple of (total_count, reviewed_count, pending_count)
+        
+    Validates: Requirements 8.2, 8.3, 8.5, 8.6
+    """
+    if isinstance(items, (list, tuple)):
+        batches: Iterable[Any] = (items,)
+    else:
+        iterator = iter(items)
+        batches = iter(lambda: list(islice(iterator, CLASSIFY_BATCH_SIZE)), [])
+    
+    total_count = 0
+    reviewed_count = 0
+    for batch in batches:
+        total_count += len(batch)
+        reviewed_count += count_reviewed(batch)
+    pending_count = total_count - reviewed_count
+    
+    return total_count, reviewed_count, pending_count
+
+
+@instrumentation.timed('ClassifyTime')
+def calculate_raw_metrics(items: Iterable[Dict[str, Dict[str, Any]]]) -> tuple[int, int, int]:
+    """
+    calculate_metrics for wire-format items from ClientTable.scan_raw.
+    
+    Returns:
+        Tuple of (total_count, reviewed_count, pending_count)
+    """
+    items = items if isinstance(items, (list, tuple)) else list(items)
+    reviewed_count = count_reviewed_raw(items)
+    
+    return len(items), reviewed_count, len(items) - reviewed_count
+
+
+def merge_metrics(counts: Iterable[tuple[int, int, int]]) -> tuple[int, int, int]:
+    """
+    Add up (total, reviewed, pending) tuples from pages or scan segments.
+    """
+    total_count = reviewed_count = pending_count = 0
+    for total, reviewed, pending in counts:
+        total_count += total
+        reviewed_count += reviewed
+        pending_count += pending
+    return total_count, reviewed_count, pending_count
+
+
+class ScanInterrupted(Exception):
+    """
+    Raised when a scan stops early because the invocation deadline is near.
+    
+    Attributes:
+        counts: (total, reviewed, pending) for the items scanned so far
+        state: Resume state for aggregate_table_metrics(resume_state=...)
+    """
+    
+    def __init__(self, counts: tuple[int, int, int], state: Dict[str, Any]):
+        super().__init__('Scan interrupted before the deadline')
+        self.counts = counts
+        self.state = state
+
+
+def aggregate_table_metrics(
+    table,
+    projection_expression: str,
+    total_segments: int = 1,
+    should_stop: Optional[Callable[[], bool]] = None,
+    resume_state: Optional[Dict[str, Any]] = None,
+    controller: Optional[ScanRateController] = None
+) -> tuple[int, int, int]:
+    """
+    Stream a table scan into running review counters.
+    
+    Each page is folded into the counters and dropped before the next page
+    is requested, so peak memory is one page per segment regardless of the
+    table size. Parallel segments are folded independently and merged.
+    
+    Before requesting another page each segment calls should_stop(); if it
+    returns True the scan raises ScanInterrupted carrying the counts so far
+    and a resume state with every unfinished segment's LastEvaluatedKey.
+    
+    Args:
+        table: DynamoDB table resource
+        projection_expression: Fields to retrieve from the table
+        total_segments: Number of parallel scan segments (1 = serial scan);
+            ignored when resuming, the state keeps the original count
+        should_stop: Optional callable polled between pages
+        resume_state: State from a previous ScanInterrupted to continue from
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        Tuple of (total_count, reviewed_count, pending_count)
+        
+    Raises:
+        ScanInterrupted: If should_stop() asked the scan to stop early, or
+            the controller's capacity budget ran out
+    """
+    if resume_state is not None:
+        total_segments = resume_state['segments']
+        start_keys = {int(segment): key for segment, key in resume_state['pending'].items()}
+        previous_counts = tuple(resume_state['counts'])
+    else:
+        start_keys = {segment: None for segment in range(max(total_segments, 1))}
+        previous_counts = (0, 0, 0)
+    
+    # ClientTable pages are classified in wire format, skipping deserialization
+    raw = isinstance(table, ClientTable)
+    classify = calculate_raw_metrics if raw else calculate_metrics
+    
+    def fold_segment(segment, total):
+        counts = (0, 0, 0)
+        last_key = start_keys[segment or 0]
+        try:
+            for response in iter_scan_responses(
+                table,
+                {'ProjectionExpression': projection_expression},
+                segment,
+                total,
+                last_key,
+                controller,
+                raw
+            ):
+                counts = merge_metrics([counts, classify(response.get('Items', []))])
+                last_key = response.get('LastEvaluatedKey')
+                if last_key is not None and should_stop is not None and should_stop():
+                    return segment or 0, counts, False, last_key
+        except CapacityBudgetExceeded:
+            # Another segment spent the budget first; resume from the last
+            # page this segment read (None if it has not read one yet)
+            return segment or 0, counts, False, last_key
+        return segment or 0, counts, True, None
+    
+    results = run_segments(fold_segment, total_segments, sorted(start_keys))
+    counts = merge_metrics([previous_counts] + [segment_counts for _, segment_counts, _, _ in results])
+    
+    unfinished = {segment: last_key for segment, _, finished, last_key in results if not finished}
+    if unfinished:
+        raise ScanInterrupted(counts, {
+            'segments': total_segments,
+            'pending': unfinished,
+            'counts': list(counts),
+        })
+    return counts
+
+
+def _certainly_reviewed_condition(field: str) -> ConditionBase:
+    """
+    Server-side test for a field that is_reviewed is certain to accept.
+    
+    DynamoDB cannot strip whitespace, but every character str.strip()
+    removes sorts below '!', so a string starting with printable ASCII
+    ('!' to '~') has content. Strings compare by UTF-8 bytes.
+    """
+    attr = Attr(field)
+    return attr.attribute_type('S') & attr.gte('!') & attr.lt('\x7f')
+
+
+def _possibly_reviewed_condition(field: str) -> ConditionBase:
+    """
+    Server-side test for a field that is not obviously empty.
+    
+    Matches non-empty strings and any non-string, non-NULL value; whether
+    these count as reviewed is decided client-side by is_reviewed.
+    """
+    attr = Attr(field)
+    return (attr.attribute_type('S') & attr.size().gt(0)) | (
+        attr.exists() & ~attr.attribute_type('S') & ~attr.attribute_type('NULL')
+    )
+
+
+def _any_field(condition: Callable[[str], ConditionBase], fields: tuple) -> ConditionBase:
+    """OR a per-field condition across the review fields."""
+    combined = condition(fields[0])
+    for field in fields[1:]:
+        combined = combined | condition(field)
+    return combined
+
+
+def count_review_metrics(
+    table,
+    fields: tuple = REVIEW_FIELDS,
+    total_segments: int = 1,
+    controller: Optional[ScanRateController] = None
+) -> tuple[int, int, int]:
+    """
+    Count review metrics without transferring the review fields.
+    
+    Runs two scans per segment:
+    1. Select='COUNT' with a filter matching items whose review field
+       certainly has content. ScannedCount gives the total and Count the
+       certainly-reviewed items; no items are returned.
+    2. A scan for the remaining items whose review fields are non-empty but
+       may be whitespace-only (or are not strings). Only those items are
+       returned and they are classified client-side with is_reviewed.
+    
+    Both scans read the whole table (filters apply after the read), so this
+    mode consumes about twice the read capacity of one 'scan' mode pass. It
+    trades RCUs for bytes: what shrinks is the data transferred and
+    deserialised, which dominates the Lambda's time on tables with large
+    review fields.
+    
+    Args:
+        table: DynamoDB table resource
+        fields: Review attributes checked by is_reviewed
+        total_segments: Number of parallel scan segments (1 = serial scan)
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        Tuple of (total_count, reviewed_count, pending_count), identical to
+        calculate_metrics over the full table
+    """
+    certain = _any_field(_certainly_reviewed_condition, fields)
+    ambiguous = _any_field(_possibly_reviewed_condition, fields) & ~certain
+    
+    def count_segment(segment, total):
+        total_count = 0
+        reviewed_count = 0
+        for response in iter_scan_responses(
+            table, {'Select': 'COUNT', 'FilterExpression': certain}, segment, total, controller=controller
+        ):
+            total_count += response.get('ScannedCount', 0)
+            reviewed_count += response.get('Count', 0)
+        
+        for page in iter_table_pages(table, ', '.join(fields), segment, total, ambiguous, controller):
+            reviewed_count += sum(1 for item in page if is_reviewed(item))
+        
+        return total_count, reviewed_count, total_count - reviewed_count
+    
+    return merge_metrics(run_segments(count_segment, total_segments))
+
+
+def read_review_counters(table) -> tuple[int, int, int]:
+    """
+    Read a table's counters maintained by the stream consumer.
+    
+    Args:
+        table: DynamoDB table resource whose counters should be read
+        
+    Returns:
+        Tuple of (total_count, reviewed_count, pending_count)
+        
+    Raises:
+        LookupError: If the counters have not been seeded for the table
+    """
+    counters_table = dynamodb.Table(os.environ['METRICS_TABLE'])
+    item = counters_table.get_item(Key={'metric_key': table.table_name}).get('Item')
+    if item is None:
+        raise LookupError(f"No review counters for table {table.table_name}")
+    
+    total_count = int(item.get('total', 0))
+    reviewed_count = int(item.get('reviewed', 0))
+    return total_count, reviewed_count, total_count - reviewed_count
+
+
+def iter_query_responses(
+    table,
+    query_kwargs: Dict[str, Any],
+    controller: Optional[ScanRateController] = None,
+    exclusive_start_key: Optional[Dict[str, Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily issue the Query requests for one key condition, page by page.
+    
+    Args:
+        table: DynamoDB table resource
+        query_kwargs: Query parameters other than the start key
+        controller: Optional rate controller every page request goes through
+        exclusive_start_key: LastEvaluatedKey to resume an interrupted Query from
+        
+    Yields:
+        Each raw Query response
+    """
+    if exclusive_start_key is not None:
+        response = _request_page(table.query, controller, **query_kwargs, ExclusiveStartKey=exclusive_start_key)
+    else:
+        response = _request_page(table.query, controller, **query_kwargs)
+    yield response
+    
+    while 'LastEvaluatedKey' in response:
+        response = _request_page(
+            table.query,
+            controller,
+            **query_kwargs,
+            ExclusiveStartKey=response['LastEvaluatedKey']
+        )
+        yield response
+
+
+def query_carrier_metrics(
+    table,
+    index_name: str,
+    carrier_attribute: str,
+    carrier: Any,
+    controller: Optional[ScanRateController] = None
+) -> tuple[int, int, int]:
+    """
+    Count one carrier's review metrics with a Query on a carrier GSI.
+    
+    Only the review fields are projected; the Query reads just the carrier's
+    partition of the index instead of the whole table.
+    
+    Args:
+        table: DynamoDB table resource
+        index_name: Name of the carrier GSI
+        carrier_attribute: Partition key attribute of the index
+        carrier: Carrier value to query
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        Tuple of (total_count, reviewed_count, pending_count)
+    """
+    query_kwargs = {
+        'IndexName': index_name,
+        'KeyConditionExpression': Key(carrier_attribute).eq(carrier),
+        'ProjectionExpression': ', '.join(REVIEW_FIELDS),
+    }
+    return merge_metrics(
+        calculate_metrics(response.get('Items', []))
+        for response in iter_query_responses(table, query_kwargs, controller)
+    )
+
+
+def discover_carriers(
+    table,
+    index_name: str,
+    carrier_attribute: str,
+    controller: Optional[ScanRateController] = None
+) -> List[Any]:
+    """
+    List the distinct carriers in a carrier GSI.
+    
+    Runs a (parallel) scan of the index projecting only its partition key,
+    so it reads the whole index; pass the carriers explicitly when they are
+    known.
+    
+    Args:
+        table: DynamoDB table resource
+        index_name: Name of the carrier GSI
+        carrier_attribute: Partition key attribute of the index
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        Sorted list of carrier values
+    """
+    def scan_segment(segment, total):
+        carriers = set()
+        scan_kwargs = {'IndexName': index_name, 'ProjectionExpression': carrier_attribute}
+        for response in iter_scan_responses(table, scan_kwargs, segment, total, controller=controller):
+            carriers.update(item[carrier_attribute] for item in response.get('Items', []))
+        return carriers
+    
+    return sorted(set().union(*run_segments(scan_segment, choose_segment_count(table))))
+
+
+def carrier_review_metrics(
+    table,
+    index_name: str,
+    carrier_attribute: str,
+    carriers: Optional[Iterable[Any]] = None,
+    controller: Optional[ScanRateController] = None
+) -> Dict[Any, tuple[int, int, int]]:
+    """
+    Calculate review metrics per carrier with parallel GSI Queries.
+    
+    Items without the carrier attribute are not in the index and are not
+    counted.
+    
+    Args:
+        table: DynamoDB table resource
+        index_name: Name of the carrier GSI
+        carrier_attribute: Partition key attribute of the index
+        carriers: Carriers to query; discovered from the index if None
+        controller: Optional rate controller shared by the discovery scan
+            and every Query
+        
+    Returns:
+        Dict of carrier -> (total_count, reviewed_count, pending_count)
+    """
+    if carriers is None:
+        carriers = discover_carriers(table, index_name, carrier_attribute, controller)
+    carriers = list(dict.fromkeys(carriers))
+    if not carriers:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=min(len(carriers), MAX_SCAN_SEGMENTS)) as executor:
+        counts = executor.map(
+            instrumentation.propagate(
+                lambda carrier: query_carrier_metrics(table, index_name, carrier_attribute, carrier, controller)
+            ),
+            carriers
+        )
+        return dict(zip(carriers, counts))
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """
+    Parse an ISO 8601 item timestamp into epoch seconds.
+    
+    Timestamps without a zone are taken as UTC.
+    
+    Returns:
+        Epoch seconds, or None if the value is not a valid timestamp
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def format_timestamp(epoch: int) -> str:
+    """Format epoch seconds as an ISO 8601 UTC timestamp (bucket labels)."""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _sort_key_bound(epoch: int) -> str:
+    """
+    Sort key value marking an instant in a KeyConditionExpression.
+    
+    Item timestamps are UTC ISO 8601 strings ('...T05:00:00.000Z'). The bound
+    leaves out fractions and the zone, so it sorts before every timestamp
+    of that second and after every earlier one.
+    """
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def sort_key_bounds(time_range: Optional[tuple[int, int]]) -> Optional[tuple[str, str]]:
+    """
+    Inclusive timestamp string bounds of a time range, as the reads filter on.
+    
+    Returns:
+        Tuple of (low, high) for a BETWEEN condition, or None without a range
+    """
+    if time_range is None:
+        return None
+    return _sort_key_bound(time_range[0]), _sort_key_bound(time_range[1])
+
+
+def time_window(
+    interval: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    now: Optional[float] = None
+) -> tuple[int, int, int]:
+    """
+    Resolve a time-series request into aligned bucket boundaries.
+    
+    The start is rounded down and the end up to a bucket boundary, so the
+    current (open) bucket is included. The window defaults to the last 24
+    hourly or 30 daily buckets, ending with the current one.
+    
+    Args:
+        interval: 'hour' or 'day'
+        start: ISO 8601 window start (optional)
+        end: ISO 8601 window end (optional, default now)
+        now: Current epoch seconds (for tests)
+        
+    Returns:
+        Tuple of (interval_seconds, window_start, window_end) in epoch seconds
+        
+    Raises:
+        ValueError: If the interval or timestamps are invalid, or the window
+            is empty or has more than MAX_TIME_BUCKETS buckets
+    """
+    if interval not in TIME_BUCKET_SECONDS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    width = TIME_BUCKET_SECONDS[interval]
+    
+    end_epoch = time.time() if now is None else now
+    if end is not None:
+        end_epoch = parse_timestamp(end)
+        if end_epoch is None:
+            raise ValueError(f"Invalid end: {end}")
+    window_end = int(math.ceil(end_epoch / width)) * width
+    
+    if start is not None:
+        start_epoch = parse_timestamp(start)
+        if start_epoch is None:
+            raise ValueError(f"Invalid start: {start}")
+        window_start = int(start_epoch // width) * width
+    else:
+        window_start = window_end - (24 if interval == 'hour' else 30) * width
+    
+    if window_end == window_start:
+        window_end += width
+    if window_end < window_start:
+        raise ValueError("start must not be after end")
+    if (window_end - window_start) // width > MAX_TIME_BUCKETS:
+        raise ValueError(f"Window exceeds {MAX_TIME_BUCKETS} {interval} buckets")
+    return width, window_start, window_end
+
+
+def bucket_review_metrics(
+    items: Iterable[Dict[str, Any]],
+    time_field: str,
+    interval_seconds: int,
+    window_start: int,
+    window_end: int
+) -> Dict[int, tuple[int, int, int]]:
+    """
+    Count review metrics per time bucket in a single pass.
+    
+    Items outside [window_start, window_end) or without a valid timestamp
+    are skipped. Buckets without items are not included.
+    
+    Returns:
+        Dict of bucket start (epoch seconds) -> (total, reviewed, pending)
+    """
+    totals: Dict[int, int] = {}
+    reviewed: Dict[int, int] = {}
+    for item in items:
+        epoch = parse_timestamp(item.get(time_field))
+        if epoch is None or not window_start <= epoch < window_end:
+            continue
+        bucket = window_start + int((epoch - window_start) // interval_seconds) * interval_seconds
+        totals[bucket] = totals.get(bucket, 0) + 1
+        if is_reviewed(item):
+            reviewed[bucket] = reviewed.get(bucket, 0) + 1
+    return {
+        bucket: (total, reviewed.get(bucket, 0), total - reviewed.get(bucket, 0))
+        for bucket, total in totals.items()
+    }
+
+
+def _read_requests(
+    projection_kwargs: Dict[str, Any],
+    time_field: Optional[str] = None,
+    time_range: Optional[tuple[int, int]] = None,
+    index_name: Optional[str] = None,
+    carrier_attribute: Optional[str] = None,
+    carriers: Optional[List[Any]] = None,
+    filter_expression: Optional[ConditionBase] = None
+) -> List[Dict[str, Any]]:
+    """
+    Request parameters of a carrier- and time-filtered read (see fold_table_items).
+    
+    Returns:
+        One Query's parameters per carrier, or with carriers None a list
+        holding the parameters of the (parallel) Scan
+    """
+    bounds = sort_key_bounds(time_range)
+    
+    if carriers is not None:
+        requests = []
+        for carrier in carriers:
+            key_condition = Key(carrier_attribute).eq(carrier)
+            if bounds is not None:
+                key_condition = key_condition & Key(time_field).between(*bounds)
+            query_kwargs = dict(projection_kwargs, IndexName=index_name, KeyConditionExpression=key_condition)
+            if filter_expression is not None:
+                query_kwargs['FilterExpression'] = filter_expression
+            requests.append(query_kwargs)
+        return requests
+    
+    scan_kwargs = dict(projection_kwargs)
+    if bounds is not None:
+        time_filter = Attr(time_field).between(*bounds)
+        filter_expression = time_filter if filter_expression is None else time_filter & filter_expression
+    if filter_expression is not None:
+        scan_kwargs['FilterExpression'] = filter_expression
+    return [scan_kwargs]
+
+
+def fold_table_items(
+    table,
+    fold: Callable[[Iterator[Dict[str, Any]]], T],
+    projection_kwargs: Dict[str, Any],
+    time_field: Optional[str] = None,
+    time_range: Optional[tuple[int, int]] = None,
+    index_name: Optional[str] = None,
+    carrier_attribute: Optional[str] = None,
+    carriers: Optional[List[Any]] = None,
+    filter_expression: Optional[ConditionBase] = None,
+    controller: Optional[ScanRateController] = None
+) -> List[T]:
+    """
+    Read a table's items in parallel, optionally restricted to carriers and a time range.
+    
+    With carriers, each carrier is one Query on the carrier GSI with the
+    time range as a sort key condition, so only matching items are read.
+    Without carriers the time field is not a key of the table, and a
+    (parallel) scan filters on it; the scan still reads the whole table.
+    
+    Args:
+        table: DynamoDB table resource
+        fold: Called with the items of each carrier or scan segment
+        projection_kwargs: ProjectionExpression and ExpressionAttributeNames
+        time_field: Item timestamp attribute (the GSI sort key)
+        time_range: Optional [start, end) in epoch seconds
+        index_name: Carrier GSI name (used with carriers)
+        carrier_attribute: Partition key attribute of the index
+        carriers: Carriers to query; None to scan the table
+        filter_expression: Optional extra server-side filter
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        fold's result for every carrier or scan segment
+    """
+    def items_of(responses):
+        return (item for response in responses for item in response.get('Items', []))
+    
+    requests = _read_requests(
+        projection_kwargs, time_field, time_range, index_name, carrier_attribute, carriers, filter_expression
+    )
+    
+    if carriers is not None:
+        if not requests:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(requests), MAX_SCAN_SEGMENTS)) as executor:
+            return list(executor.map(
+                instrumentation.propagate(
+                    lambda query_kwargs: fold(items_of(iter_query_responses(table, query_kwargs, controller)))
+                ),
+                requests
+            ))
+    
+    return run_segments(
+        lambda segment, total: fold(items_of(
+            iter_scan_responses(table, requests[0], segment, total, controller=controller)
+        )),
+        choose_segment_count(table)
+    )
+
+
+def time_bucket_metrics(
+    table,
+    time_field: str,
+    interval_seconds: int,
+    window_start: int,
+    window_end: int,
+    index_name: Optional[str] = None,
+    carrier_attribute: Optional[str] = None,
+    carriers: Optional[List[Any]] = None,
+    controller: Optional[ScanRateController] = None
+) -> Dict[int, tuple[int, int, int]]:
+    """
+    Calculate review metrics per time bucket over a window.
+    
+    Items are read with fold_table_items, so with carriers only the window
+    of each carrier's index partition is read.
+    
+    Args:
+        table: DynamoDB table resource
+        time_field: Item timestamp attribute (the GSI sort key)
+        interval_seconds: Bucket width
+        window_start: First bucket start (epoch seconds)
+        window_end: End of the last bucket (epoch seconds)
+        index_name: Carrier GSI name (used with carriers)
+        carrier_attribute: Partition key attribute of the index
+        carriers: Carriers to query; None to scan the table
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        Dict of every bucket start in the window -> (total, reviewed, pending)
+    """
+    projection_kwargs = {
+        'ProjectionExpression': ', '.join(('#time',) + REVIEW_FIELDS),
+        'ExpressionAttributeNames': {'#time': time_field},
+    }
+    partials = fold_table_items(
+        table,
+        lambda items: bucket_review_metrics(items, time_field, interval_seconds, window_start, window_end),
+        projection_kwargs,
+        time_field,
+        (window_start, window_end),
+        index_name,
+        carrier_attribute,
+        carriers,
+        controller=controller
+    )
+    
+    return {
+        bucket: merge_metrics(partial.get(bucket, (0, 0, 0)) for partial in partials)
+        for bucket in range(window_start, window_end, interval_seconds)
+    }
+
+
+def time_range(start: Optional[str] = None, end: Optional[str] = None) -> Optional[tuple[int, int]]:
+    """
+    Resolve an optional start/end filter into a [start, end) range.
+    
+    A missing end is the next OPEN_RANGE_END_SECONDS boundary after now.
+    
+    Returns:
+        Tuple of epoch seconds, or None if neither bound is given
+        
+    Raises:
+        ValueError: If a timestamp is invalid or start is after end
+    """
+    if start is None and end is None:
+        return None
+    start_epoch = 0.0 if start is None else parse_timestamp(start)
+    if end is None:
+        # Round "now" up to a minute boundary: the range is part of the cache
+        # key, so a per-second end would make every open-ended request a miss
+        end_epoch = math.ceil(time.time() / OPEN_RANGE_END_SECONDS) * OPEN_RANGE_END_SECONDS
+    else:
+        end_epoch = parse_timestamp(end)
+    if start_epoch is None:
+        raise ValueError(f"Invalid start: {start}")
+    if end_epoch is None:
+        raise ValueError(f"Invalid end: {end}")
+    if start_epoch > end_epoch:
+        raise ValueError("start must not be after end")
+    return int(start_epoch), int(math.ceil(end_epoch))
+
+
+def _normalise_tags(tags: Iterable[Any]) -> tuple[str, ...]:
+    """Sorted distinct non-blank tags."""
+    return tuple(sorted({tag.strip() for tag in tags if isinstance(tag, str) and tag.strip()}))
+
+
+@lru_cache(maxsize=TAG_DECODE_CACHE_SIZE)
+def _decode_tag_string(value: str) -> tuple[str, ...]:
+    try:
+        tags = json.loads(value)
+    except ValueError:
+        return ()
+    if isinstance(tags, str):
+        tags = [tags]
+    return _normalise_tags(tags) if isinstance(tags, list) else ()
+
+
+def decode_issue_tags(value: Any) -> tuple[str, ...]:
+    """
+    Decode a chat log's issue_tags into a sorted tuple of distinct tags.
+    
+    The proxy stores the tags as a JSON-encoded string. The same few tag
+    sets repeat across many logs, so each distinct string is decoded once
+    and cached (TAG_DECODE_CACHE_SIZE strings). Native lists are accepted
+    too; malformed values have no tags.
+    """
+    if isinstance(value, str):
+        return _decode_tag_string(value)
+    if isinstance(value, (list, set)):
+        return _normalise_tags(value)
+    return ()
+
+
+def count_tag_sets(
+    items: Iterable[Dict[str, Any]],
+    time_field: Optional[str] = None,
+    time_range: Optional[tuple[int, int]] = None
+) -> tuple[int, Counter]:
+    """
+    Count how often each distinct tag set occurs, in a single pass.
+    
+    Args:
+        items: Chat log items with issue_tags
+        time_field: Item timestamp attribute, checked against time_range
+        time_range: Optional [start, end) in epoch seconds
+        
+    Returns:
+        Tuple of (logs counted, Counter of tag set -> logs)
+    """
+    total = 0
+    tag_sets: Counter = Counter()
+    for item in items:
+        if time_range is not None:
+            epoch = parse_timestamp(item.get(time_field))
+            if epoch is None or not time_range[0] <= epoch < time_range[1]:
+                continue
+        total += 1
+        tags = decode_issue_tags(item.get('issue_tags'))
+        if tags:
+            tag_sets[tags] += 1
+    return total, tag_sets
+
+
+class TagStatistics:
+    """
+    Issue tag frequencies and pairwise co-occurrence as compact integer arrays.
+    
+    Attributes:
+        tags: Tag names, most frequent first (ties by name)
+        counts: array('L') of logs carrying each tag, aligned with tags
+        pairs: array('L') holding the upper triangle (i < j) of the tag
+            co-occurrence matrix, row by row
+        total_logs: Logs counted
+        tagged_logs: Logs with at least one tag
+    """
+    
+    def __init__(self, total_logs: int, tag_sets: Counter):
+        frequencies: Counter = Counter()
+        for tags, logs in tag_sets.items():
+            for tag in tags:
+                frequencies[tag] += logs
+        
+        self.tags = sorted(frequencies, key=lambda tag: (-frequencies[tag], tag))
+        self.counts = array('L', (frequencies[tag] for tag in self.tags))
+        self.total_logs = total_logs
+        self.tagged_logs = sum(tag_sets.values())
+        
+        size = len(self.tags)
+        positions = {tag: position for position, tag in enumerate(self.tags)}
+        self.pairs = array('L', bytes(array('L').itemsize * (size * (size - 1) // 2)))
+        for tags, logs in tag_sets.items():
+            ids = sorted(positions[tag] for tag in tags)
+            for first_index, first in enumerate(ids):
+                for second in ids[first_index + 1:]:
+                    self.pairs[self._pair_index(first, second)] += logs
+    
+    def _pair_index(self, first: int, second: int) -> int:
+        """Position of pair (first < second) in the upper triangle."""
+        size = len(self.tags)
+        return first * size - first * (first + 1) // 2 + (second - first - 1)
+    
+    def cooccurrence(self, first: int, second: int) -> int:
+        """Logs carrying both tags (by position); the diagonal is the tag count."""
+        if first == second:
+            return self.counts[first]
+        if first > second:
+            first, second = second, first
+        return self.pairs[self._pair_index(first, second)]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Response representation with the co-occurrence as a sparse list.
+        
+        'pairs' holds [i, j, logs] for every i < j with logs > 0, so the
+        response grows with the pairs that occur, not with the square of
+        the tag count. A tag's own count is in 'tags'.
+        """
+        size = len(self.tags)
+        pairs = []
+        position = 0
+        for first in range(size):
+            for second in range(first + 1, size):
+                logs = self.pairs[position]
+                if logs:
+                    pairs.append([first, second, logs])
+                position += 1
+        return {
+            'totalChatLogs': self.total_logs,
+            'taggedChatLogs': self.tagged_logs,
+            'tags': [{'tag': tag, 'count': count} for tag, count in zip(self.tags, self.counts)],
+            'pairs': pairs,
+        }
+
+
+def issue_tag_statistics(
+    table,
+    carrier_index: tuple,
+    carriers: Optional[List[Any]] = None,
+    time_range: Optional[tuple[int, int]] = None,
+    controller: Optional[ScanRateController] = None
+) -> TagStatistics:
+    """
+    Aggregate chat log issue tags, optionally for some carriers and a time range.
+    
+    Items are read with fold_table_items, projecting only the tags and the
+    timestamp; each carrier or scan segment counts its tag sets and the
+    counts are merged before the arrays are built.
+    
+    Args:
+        table: Chat logs DynamoDB table resource
+        carrier_index: (index name, carrier attribute, time field) of the carrier GSI
+        carriers: Carriers to query; None for all
+        time_range: Optional [start, end) in epoch seconds
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        TagStatistics
+    """
+    index_name, carrier_attribute, time_field = carrier_index
+    projection_kwargs = {
+        'ProjectionExpression': '#time, issue_tags',
+        'ExpressionAttributeNames': {'#time': time_field},
+    }
+    partials = fold_table_items(
+        table,
+        lambda items: count_tag_sets(items, time_field, time_range),
+        projection_kwargs,
+        time_field,
+        time_range,
+        index_name,
+        carrier_attribute,
+        carriers,
+        controller=controller
+    )
+    
+    total = 0
+    tag_sets: Counter = Counter()
+    for partial_total, partial_sets in partials:
+        total += partial_total
+        tag_sets.update(partial_sets)
+    return TagStatistics(total, tag_sets)
+
+
+def estimate_read_units(size_bytes: float) -> float:
+    """Eventually consistent read capacity to read size_bytes (0.5 RCU per started 4 KB)."""
+    return math.ceil(size_bytes / READ_UNIT_BYTES) * 0.5
+
+
+def plan_table_read(
+    table,
+    carrier_index: tuple,
+    carriers: Optional[List[Any]] = None,
+    time_range: Optional[tuple[int, int]] = None
+) -> Dict[str, Any]:
+    """
+    Choose between carrier GSI Queries and a filtered Scan for a filtered read.
+    
+    The base tables are keyed by item ID, which no filter names, so the
+    candidates are one Query per carrier on the carrier GSI (carrier and
+    time range as key conditions) and a Scan filtering on both. The Scan
+    reads the whole table whatever the filters. Each Query is estimated to
+    read PLANNER_CARRIER_SHARE of the table, scaled by the share of
+    PLANNER_TIME_SPAN_SECONDS the time range covers, and at least 0.5 RCU.
+    With many carriers the Scan can be cheaper. Without carriers only the
+    Scan applies.
+    
+    Args:
+        table: DynamoDB table resource
+        carrier_index: (index name, carrier attribute, time field) of the carrier GSI
+        carriers: Carrier filter; None for all carriers
+        time_range: Optional [start, end) in epoch seconds
+        
+    Returns:
+        Dict with operation ('Query' or 'Scan'), indexName, requests (Queries,
+        or None for a Scan), estimatedReadUnits and the estimate of every
+        candidate under alternatives (None when the table size is unknown)
+    """
+    try:
+        size_bytes = table.table_size_bytes
+    except Exception:
+        size_bytes = None
+    if not isinstance(size_bytes, (int, Decimal)):
+        size_bytes = None
+    
+    scan_units = None if size_bytes is None else estimate_read_units(size_bytes)
+    alternatives = {'Scan': scan_units}
+    if carriers is not None:
+        share = PLANNER_CARRIER_SHARE
+        if time_range is not None:
+            share *= min(1.0, (time_range[1] - time_range[0]) / PLANNER_TIME_SPAN_SECONDS)
+        alternatives['Query'] = None if size_bytes is None else len(carriers) * max(
+            0.5, estimate_read_units(size_bytes * share)
+        )
+        # Queries never read more than the index; without a size, prefer them
+        if scan_units is None or alternatives['Query'] <= scan_units:
+            return {
+                'operation': 'Query',
+                'indexName': carrier_index[0],
+                'requests': len(carriers),
+                'estimatedReadUnits': alternatives['Query'],
+                'alternatives': alternatives,
+            }
+    return {
+        'operation': 'Scan',
+        'indexName': None,
+        'requests': None,
+        'estimatedReadUnits': scan_units,
+        'alternatives': alternatives,
+    }
+
+
+def _review_state_condition(review_state: str) -> Optional[ConditionBase]:
+    """
+    Server-side filter keeping every item that may be in review_state.
+    
+    The filter only reduces the data returned; is_reviewed still decides.
+    """
+    if review_state == 'reviewed':
+        return _any_field(_possibly_reviewed_condition, REVIEW_FIELDS)
+    if review_state == 'pending':
+        return ~_any_field(_certainly_reviewed_condition, REVIEW_FIELDS)
+    return None
+
+
+def _carrier_condition(carrier_attribute: str, time_field: str, carriers: List[Any]) -> ConditionBase:
+    """
+    Scan filter matching the items the carrier GSI holds for carriers.
+    
+    The IN lists hold at most MAX_IN_VALUES carriers each. Like the index,
+    which is sparse, the filter skips items without the time field.
+    """
+    chunks = [carriers[start:start + MAX_IN_VALUES] for start in range(0, len(carriers), MAX_IN_VALUES)]
+    condition = Attr(carrier_attribute).is_in(chunks[0])
+    for chunk in chunks[1:]:
+        condition = condition | Attr(carrier_attribute).is_in(chunk)
+    return condition & Attr(time_field).exists()
+
+
+def filter_state(
+    carriers: Optional[List[Any]],
+    time_range: Optional[tuple[int, int]],
+    review_state: str
+) -> Dict[str, Any]:
+    """The filters of a filtered read as stored in its resume state."""
+    return {
+        'carriers': carriers,
+        'range': None if time_range is None else list(time_range),
+        'reviewState': review_state,
+    }
+
+
+def filtered_table_metrics(
+    table,
+    carrier_index: tuple,
+    plan: Dict[str, Any],
+    carriers: Optional[List[Any]] = None,
+    time_range: Optional[tuple[int, int]] = None,
+    review_state: str = 'all',
+    controller: Optional[ScanRateController] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    resume_state: Optional[Dict[str, Any]] = None
+) -> tuple[int, int, int]:
+    """
+    Count the items matching the filters, read the way plan_table_read chose.
+    
+    Like aggregate_table_metrics, every carrier Query or scan segment calls
+    should_stop() before requesting another page and the read raises
+    ScanInterrupted when one stopped early. Its resume state also holds the
+    plan and the filters, so a continuation token resumes the same read.
+    
+    Args:
+        table: DynamoDB table resource
+        carrier_index: (index name, carrier attribute, time field) of the carrier GSI
+        plan: Result of plan_table_read
+        carriers: Carrier filter; None for all carriers
+        time_range: Optional [start, end) in epoch seconds
+        review_state: 'all', 'reviewed' or 'pending'
+        controller: Optional rate controller every page request goes through
+        should_stop: Optional callable polled between pages
+        resume_state: State from a previous ScanInterrupted to continue from
+        
+    Returns:
+        Tuple of (total, reviewed, pending) over the matching items; with a
+        review state only that state's items count
+        
+    Raises:
+        ScanInterrupted: If should_stop() asked the read to stop early, or
+            the controller's capacity budget ran out
+    """
+    index_name, carrier_attribute, time_field = carrier_index
+    if not carriers and carriers is not None:
+        return 0, 0, 0
+    
+    filter_expression = _review_state_condition(review_state)
+    query_carriers = carriers
+    if plan['operation'] == 'Scan' and carriers is not None:
+        carrier_filter = _carrier_condition(carrier_attribute, time_field, carriers)
+        filter_expression = carrier_filter if filter_expression is None else carrier_filter & filter_expression
+        query_carriers = None
+    
+    requests = _read_requests(
+        {'ProjectionExpression': ', '.join(REVIEW_FIELDS)},
+        time_field,
+        time_range,
+        index_name,
+        carrier_attribute,
+        query_carriers,
+        filter_expression
+    )
+    
+    # A unit is one carrier's Query or one scan segment
+    if resume_state is not None:
+        total_units = resume_state['segments']
+        start_keys = {int(unit): key for unit, key in resume_state['pending'].items()}
+        previous_counts = tuple(resume_state['counts'])
+    else:
+        total_units = len(requests) if query_carriers is not None else choose_segment_count(table)
+        start_keys = {unit: None for unit in range(max(total_units, 1))}
+        previous_counts = (0, 0, 0)
+    
+    def responses_of(unit, segment, total, last_key):
+        if query_carriers is not None:
+            return iter_query_responses(table, requests[unit], controller, last_key)
+        return iter_scan_responses(table, requests[0], segment, total, last_key, controller)
+    
+    # Each page is fetched before it is classified, so ClassifyTime does
+    # not include the request latency
+    def count_unit(unit, segment=None, total=None):
+        counts = (0, 0, 0)
+        last_key = start_keys[unit]
+        try:
+            for response in responses_of(unit, segment, total, last_key):
+                counts = merge_metrics([counts, calculate_metrics(response.get('Items', []))])
+                last_key = response.get('LastEvaluatedKey')
+                if last_key is not None and should_stop is not None and should_stop():
+                    return unit, counts, False, last_key
+        except CapacityBudgetExceeded:
+            return unit, counts, False, last_key
+        return unit, counts, True, None
+    
+    if query_carriers is not None:
+        units = sorted(start_keys)
+        results = []
+        if units:
+            with ThreadPoolExecutor(max_workers=min(len(units), MAX_SCAN_SEGMENTS)) as executor:
+                results = list(executor.map(instrumentation.propagate(count_unit), units))
+    else:
+        results = run_segments(
+            lambda segment, total: count_unit(segment or 0, segment, total),
+            total_units,
+            sorted(start_keys)
+        )
+    total, reviewed, pending = merge_metrics([previous_counts] + [counts for _, counts, _, _ in results])
+    # Applying the review state again to already filtered counts keeps them,
+    # so resumed counts can be merged with the ones carried by the token
+    if review_state == 'reviewed':
+        counts = (reviewed, reviewed, 0)
+    elif review_state == 'pending':
+        counts = (pending, 0, pending)
+    else:
+        counts = (total, reviewed, pending)
+    
+    unfinished = {unit: last_key for unit, _, finished, last_key in results if not finished}
+    if unfinished:
+        raise ScanInterrupted(counts, {
+            'segments': total_units,
+            'pending': unfinished,
+            'counts': list(counts),
+            'plan': plan,
+            'filters': filter_state(carriers, time_range, review_state),
+        })
+    return counts
+
+
+def reviewed_ratio_interval(
+    samples: List[tuple[int, int]],
+    z: float,
+    total_segments: int
+) -> tuple[float, float]:
+    """
+    Reviewed ratio and its confidence half-width from sampled segments.
+    
+    Each segment is a cluster of items: the ratio is the ratio estimator
+    sum(reviewed) / sum(items), and its variance comes from the spread of
+    the segments around it, with the finite population correction for the
+    share of segments sampled. It is at least the variance of a simple
+    random sample of the same items.
+    
+    Args:
+        samples: (items, reviewed) of every sampled segment
+        z: Standard normal quantile of the confidence level
+        total_segments: Number of segments the table was split into
+        
+    Returns:
+        Tuple of (ratio, half-width); the half-width is 1.0 with fewer than
+        two segments holding items
+    """
+    count = len(samples)
+    items = sum(total for total, _ in samples)
+    if items == 0:
+        return 0.0, 1.0
+    ratio = sum(reviewed for _, reviewed in samples) / items
+    if count < 2:
+        return ratio, 1.0
+    mean_items = items / count
+    residuals = sum((reviewed - ratio * total) ** 2 for total, reviewed in samples) / (count - 1)
+    correction = 1 - count / total_segments
+    variance = max(correction * residuals / (count * mean_items ** 2), correction * ratio * (1 - ratio) / items)
+    return ratio, z * math.sqrt(variance)
+
+
+def estimate_table_metrics(
+    table,
+    projection_expression: str,
+    target_error: float = ESTIMATE_TARGET_ERROR,
+    confidence: float = ESTIMATE_CONFIDENCE,
+    controller: Optional[ScanRateController] = None,
+    rng: Optional[random.Random] = None
+) -> Dict[str, Any]:
+    """
+    Estimate a table's counts from DescribeTable and a sample of scan segments.
+    
+    The total is DescribeTable's ItemCount, which DynamoDB refreshes about
+    every six hours. The reviewed ratio is estimated from whole segments:
+    the table is split into about ItemCount / ESTIMATE_PAGE_ITEMS parallel
+    scan segments, each one page, and rounds of ESTIMATE_PARALLEL_SEGMENTS
+    random segments are read until the ratio's confidence interval is
+    within target_error (after at least ESTIMATE_MIN_SEGMENTS segments),
+    ESTIMATE_TIME_BUDGET_SECONDS have passed, or ESTIMATE_MAX_SEGMENTS
+    segments were read. The time spent does not grow with the table. If
+    every segment was read completely the counts are exact.
+    
+    ItemCount is stale for sure when the sample alone holds more items or a
+    segment did not fit in one page (twice the mean size ItemCount implies),
+    e.g. ItemCount 0 for a new table. Then the total is extrapolated from the
+    sampled segments' mean size, and flagged as a lower bound if a segment
+    was cut off.
+    
+    Args:
+        table: DynamoDB table resource
+        projection_expression: Fields needed by is_reviewed
+        target_error: Wanted half-width of the reviewed ratio's interval
+        confidence: Confidence level of the interval
+        controller: Optional rate controller every page request goes through
+        rng: Random source for the segment choice (default the random module)
+        
+    Returns:
+        Dict with counts (total, reviewed, pending) and estimate, the
+        response details (ratio, interval, sample size, ItemCount staleness)
+    """
+    described_count = item_count = int(table.item_count)
+    total_segments = max(1, min(MAX_TOTAL_SEGMENTS, math.ceil(item_count / ESTIMATE_PAGE_ITEMS)))
+    order = (rng or random).sample(range(total_segments), min(total_segments, ESTIMATE_MAX_SEGMENTS))
+    raw = isinstance(table, ClientTable)
+    classify = calculate_raw_metrics if raw else calculate_metrics
+    # Segment sizes vary around the mean; twice that bounds a stale ItemCount
+    scan_kwargs = {'ProjectionExpression': projection_expression, 'Limit': 2 * ESTIMATE_PAGE_ITEMS}
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    deadline = time.monotonic() + ESTIMATE_TIME_BUDGET_SECONDS
+    
+    def sample(segment: int) -> tuple[int, int, bool]:
+        responses = iter_scan_responses(table, scan_kwargs, segment, total_segments, controller=controller, raw=raw)
+        response = next(responses)
+        total, reviewed, _ = classify(response.get('Items', []))
+        return total, reviewed, 'LastEvaluatedKey' not in response
+    
+    samples: List[tuple[int, int]] = []
+    complete = True
+    with ThreadPoolExecutor(max_workers=ESTIMATE_PARALLEL_SEGMENTS) as executor:
+        for start in range(0, len(order), ESTIMATE_PARALLEL_SEGMENTS):
+            for total, reviewed, segment_complete in executor.map(
+                instrumentation.propagate(sample), order[start:start + ESTIMATE_PARALLEL_SEGMENTS]
+            ):
+                samples.append((total, reviewed))
+                complete = complete and segment_complete
+            ratio, half_width = reviewed_ratio_interval(samples, z, total_segments)
+            if len(samples) >= ESTIMATE_MIN_SEGMENTS and half_width <= target_error:
+                break
+            if time.monotonic() >= deadline or (controller is not None and controller.exhausted()):
+                break
+    
+    sampled_items = sum(total for total, _ in samples)
+    exact = complete and len(samples) == total_segments
+    stale = not exact and (sampled_items > described_count or not complete)
+    if exact:
+        item_count = sampled_items
+        ratio = sum(reviewed for _, reviewed in samples) / item_count if item_count else 0.0
+        half_width = 0.0
+    elif stale:
+        # Cut-off segments hold more than was read, so their mean is a floor
+        extrapolated = round(sampled_items / len(samples) * total_segments)
+        item_count = extrapolated if complete else max(described_count, extrapolated)
+    low, high = max(0.0, ratio - half_width), min(1.0, ratio + half_width)
+    reviewed = round(ratio * item_count)
+    return {
+        'counts': (item_count, reviewed, item_count - reviewed),
+        'estimate': {
+            'method': 'exact' if exact else 'sampled',
+            'reviewedRatio': round(ratio, 6),
+            'reviewedRatioInterval': [round(low, 6), round(high, 6)],
+            'reviewedInterval': [math.floor(low * item_count), math.ceil(high * item_count)],
+            'confidence': confidence,
+            'halfWidth': round(half_width, 6),
+            'targetError': target_error,
+            'targetMet': half_width <= target_error,
+            'sampledSegments': len(samples),
+            'totalSegments': total_segments,
+            'sampledItems': sampled_items,
+            'itemCount': described_count,
+            'itemCountStale': stale,
+            'totalLowerBound': stale and not complete,
+        },
+    }
+
+
+class MetricDefinition:
+    """
+    One metric of the registry, evaluated by evaluate_metric_registry.
+    
+    A metric counts the items its predicate accepts (every item without a
+    predicate), or folds them with a reducer, optionally once per group of
+    attribute values.
+    
+    Attributes:
+        name: Metric name in the response
+        table: Table key ('chatLogs' or 'feedbackLogs')
+        attributes: Attributes the predicate, reducer and grouping read
+        predicate: Optional item filter; only accepted items are folded
+        reducer: Optional fold (accumulator, item) -> accumulator; None counts items
+        initial: Factory for an empty accumulator (default int, i.e. 0)
+        merge: Combines the accumulators of two scan segments (default +)
+        finalize: Optional conversion of an accumulator for the response
+        group_by: Attributes whose values split the metric into groups
+    """
+    
+    __slots__ = ('name', 'table', 'attributes', 'predicate', 'reducer', 'initial', 'merge', 'finalize', 'group_by')
+    
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        attributes: Iterable[str] = (),
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        reducer: Optional[Callable[[Any, Dict[str, Any]], Any]] = None,
+        initial: Callable[[], Any] = int,
+        merge: Callable[[Any, Any], Any] = operator.add,
+        finalize: Optional[Callable[[Any], Any]] = None,
+        group_by: Iterable[str] = ()
+    ):
+        self.name = name
+        self.table = table
+        self.group_by = tuple(group_by)
+        self.attributes = tuple(dict.fromkeys(tuple(attributes) + self.group_by))
+        self.predicate = predicate
+        self.reducer = reducer
+        self.initial = initial
+        self.merge = merge
+        self.finalize = finalize
+    
+    def group_key(self, item: Dict[str, Any]) -> Any:
+        """The item's group: () without grouping, else its group_by values."""
+        return tuple(item.get(attribute) for attribute in self.group_by)
+    
+    def fold_page(self, groups: Dict[Any, Any], page: List[Dict[str, Any]]) -> None:
+        """
+        Fold a page of items into the accumulators of their groups.
+        
+        Args:
+            groups: Group key -> accumulator, updated in place
+            page: Items of one page
+        """
+        matched = page if self.predicate is None else [item for item in page if self.predicate(item)]
+        if not self.group_by:
+            members = {(): matched}
+        else:
+            members = {}
+            for item in matched:
+                members.setdefault(self.group_key(item), []).append(item)
+        for key, items in members.items():
+            accumulator = groups[key] if key in groups else self.initial()
+            if self.reducer is None:
+                accumulator += len(items)
+            else:
+                for item in items:
+                    accumulator = self.reducer(accumulator, item)
+            groups[key] = accumulator
+    
+    def merge_groups(self, first: Dict[Any, Any], second: Dict[Any, Any]) -> Dict[Any, Any]:
+        """Combine the groups of two scan segments."""
+        merged = dict(first)
+        for key, accumulator in second.items():
+            merged[key] = self.merge(merged[key], accumulator) if key in merged else accumulator
+        return merged
+    
+    def result(self, groups: Dict[Any, Any]) -> Any:
+        """
+        Response value: the finalized accumulator, or with grouping a dict
+        of group label -> finalized accumulator, sorted by label. A missing group
+        attribute is labelled '(missing)'; several are joined with '/'.
+        """
+        finalize = self.finalize or (lambda accumulator: accumulator)
+        if not self.group_by:
+            return finalize(groups[()] if () in groups else self.initial())
+        labels = {
+            '/'.join('(missing)' if value is None else str(value) for value in key): accumulator
+            for key, accumulator in groups.items()
+        }
+        return {label: finalize(labels[label]) for label in sorted(labels)}
+
+
+# Registered metrics by (table key, name), in registration order
+METRIC_REGISTRY: Dict[tuple[str, str], MetricDefinition] = {}
+
+
+def register_metric(definition: MetricDefinition) -> MetricDefinition:
+    """
+    Add a metric to METRIC_REGISTRY, for 'registry' mode.
+    
+    Raises:
+        ValueError: If the table is unknown or the table already has a metric of that name
+    """
+    if definition.table not in TABLE_KEYS:
+        raise ValueError(f"Unknown table for metric {definition.name}: {definition.table}")
+    if (definition.table, definition.name) in METRIC_REGISTRY:
+        raise ValueError(f"Metric {definition.name} is already registered for {definition.table}")
+    METRIC_REGISTRY[(definition.table, definition.name)] = definition
+    return definition
+
+
+def registered_metrics(table: str, names: Optional[Iterable[str]] = None) -> List[MetricDefinition]:
+    """A table's registered metrics, optionally only those named."""
+    selected = None if names is None else set(names)
+    return [
+        definition for (table_key, name), definition in METRIC_REGISTRY.items()
+        if table_key == table and (selected is None or name in selected)
+    ]
+
+
+def evaluate_metric_registry(
+    table,
+    definitions: List[MetricDefinition],
+    key_field: str,
+    carrier_index: tuple,
+    carriers: Optional[List[Any]] = None,
+    time_range: Optional[tuple[int, int]] = None,
+    controller: Optional[ScanRateController] = None
+) -> Dict[str, Any]:
+    """
+    Evaluate every definition over one table in a single read pass.
+    
+    The definitions' attributes are merged into one projection; every page
+    (a CLASSIFY_BATCH_SIZE batch of a segment's items) is folded into each
+    definition's accumulators, and the segments' accumulators are merged.
+    
+    Args:
+        table: DynamoDB table resource
+        definitions: Metrics of this table
+        key_field: Key attribute, projected so items without any metric attribute still count
+        carrier_index: (index name, carrier attribute, time field) of the carrier GSI
+        carriers: Carriers to query; None to scan the table
+        time_range: Optional [start, end) in epoch seconds
+        controller: Optional rate controller every page request goes through
+        
+    Returns:
+        Dict of metric name -> value (see MetricDefinition.result)
+    """
+    attributes = [key_field]
+    for definition in definitions:
+        attributes.extend(definition.attributes)
+    names = {f'#m{position}': attribute for position, attribute in enumerate(dict.fromkeys(attributes))}
+    projection_kwargs = {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names,
+    }
+    
+    def fold(items: Iterable[Dict[str, Any]]) -> List[Dict[Any, Any]]:
+        accumulators: List[Dict[Any, Any]] = [{} for _ in definitions]
+        iterator = iter(items)
+        page = list(islice(iterator, CLASSIFY_BATCH_SIZE))
+        while page:
+            for definition, groups in zip(definitions, accumulators):
+                definition.fold_page(groups, page)
+            page = list(islice(iterator, CLASSIFY_BATCH_SIZE))
+        return accumulators
+    
+    index_name, carrier_attribute, time_field = carrier_index
+    segments = fold_table_items(
+        table, fold, projection_kwargs, time_field, time_range,
+        index_name, carrier_attribute, carriers, controller=controller
+    )
+    merged: List[Dict[Any, Any]] = [{} for _ in definitions]
+    for accumulators in segments:
+        merged = [
+            definition.merge_groups(groups, segment_groups)
+            for definition, groups, segment_groups in zip(definitions, merged, accumulators)
+        ]
+    return {definition.name: definition.result(groups) for definition, groups in zip(definitions, merged)}
+
+
+def _add_issue_tags(tags: Counter, item: Dict[str, Any]) -> Counter:
+    tags.update(decode_issue_tags(item.get('issue_tags')))
+    return tags
+
+
+def _most_common(counter: Counter) -> Dict[str, int]:
+    return dict(counter.most_common())
+
+
+def _guardrail_intervened(item: Dict[str, Any]) -> bool:
+    return item.get('guardrail_intervened') is True
+
+
+def _turnaround_sketch() -> sketches.DDSketch:
+    return sketches.DDSketch(TURNAROUND_RELATIVE_ACCURACY)
+
+
+def _turnaround_reducer(time_field: str) -> Callable[[sketches.DDSketch, Dict[str, Any]], sketches.DDSketch]:
+    """Reducer adding an item's seconds from time_field to its first review."""
+    def add(sketch: sketches.DDSketch, item: Dict[str, Any]) -> sketches.DDSketch:
+        created = parse_timestamp(item.get(time_field))
+        reviewed_at = parse_timestamp(item.get(REVIEW_DATE_FIELD))
+        if created is not None and reviewed_at is not None:
+            sketch.add(reviewed_at - created)
+        return sketch
+    return add
+
+
+def turnaround_percentiles(sketch: sketches.DDSketch) -> Dict[str, Any]:
+    """
+    Response value of a turnaround sketch.
+    
+    Returns:
+        Dict with count and p50/p90/p99 (TURNAROUND_QUANTILES) in seconds,
+        None without reviewed items
+    """
+    result: Dict[str, Any] = {'count': sketch.count}
+    for quantile in TURNAROUND_QUANTILES:
+        value = sketch.quantile(quantile)
+        result[f'p{quantile * 100:g}'] = None if value is None else round(value, 1)
+    return result
+
+
+class DistinctCounts(dict):
+    """
+    Response value of a distinct count: estimated total, reviewed and
+    pending distinct values ({'total': ..., 'reviewed': ..., 'pending': ...}).
+    
+    A value with reviewed and pending items counts in both, so reviewed plus
+    pending can exceed total. The HyperLogLog counters behind the estimates
+    stay in the sketches attribute (not serialized), for unions across
+    tables (combine_distinct_counts).
+    """
     
-    An item is considered reviewed if either rev_comment OR rev_feedback
-    is not empty (after stripping whitespace).
+    def __init__(self, sketches_by_state: Dict[str, sketches.HyperLogLog]):
+        self.sketches = sketches_by_state
+        union = sketches_by_state['reviewed'].copy().merge(sketches_by_state['pending'])
+        super().__init__(
+            total=union.count(),
+            reviewed=sketches_by_state['reviewed'].count(),
+            pending=sketches_by_state['pending'].count()
+        )
+
+
+def _distinct_sketches() -> Dict[str, sketches.HyperLogLog]:
+    return {'reviewed': sketches.HyperLogLog(DISTINCT_PRECISION), 'pending': sketches.HyperLogLog(DISTINCT_PRECISION)}
+
+
+def _merge_distinct_sketches(
+    first: Dict[str, sketches.HyperLogLog],
+    second: Dict[str, sketches.HyperLogLog]
+) -> Dict[str, sketches.HyperLogLog]:
+    for state, counter in second.items():
+        first[state].merge(counter)
+    return first
+
+
+def _identity(item: Dict[str, Any], attributes: tuple[str, ...]) -> Any:
+    """The item's first present, non-empty attribute value, or None."""
+    for attribute in attributes:
+        value = item.get(attribute)
+        if value is not None and value != '':
+            return value
+    return None
+
+
+def _distinct_reducer(
+    attributes: tuple[str, ...]
+) -> Callable[[Dict[str, sketches.HyperLogLog], Dict[str, Any]], Dict[str, sketches.HyperLogLog]]:
+    """Reducer adding the item's identity (see _identity) to its review state's counter."""
+    def add(counters: Dict[str, sketches.HyperLogLog], item: Dict[str, Any]) -> Dict[str, sketches.HyperLogLog]:
+        value = _identity(item, attributes)
+        if value is not None:
+            counters['reviewed' if is_reviewed(item) else 'pending'].add(value)
+        return counters
+    return add
+
+
+def combine_distinct_counts(values: Iterable[DistinctCounts]) -> DistinctCounts:
+    """
+    Distinct counts over several tables, e.g. users of chat logs or feedback.
     
-    Args:
-        item: DynamoDB item containing rev_comment and rev_feedback fields
+    Raises:
+        ValueError: If no values are given
+    """
+    combined = None
+    for value in values:
+        if combined is None:
+            combined = {state: counter.copy() for state, counter in value.sketches.items()}
+        else:
+            _merge_distinct_sketches(combined, value.sketches)
+    if combined is None:
+        raise ValueError("No distinct counts to combine")
+    return DistinctCounts(combined)
+
+
+def _heavy_hitter_summaries() -> Dict[str, sketches.SpaceSaving]:
+    return {volume: sketches.SpaceSaving(HEAVY_HITTERS_CAPACITY) for volume in ('pending', 'total')}
+
+
+def _merge_heavy_hitter_summaries(
+    first: Dict[str, sketches.SpaceSaving],
+    second: Dict[str, sketches.SpaceSaving]
+) -> Dict[str, sketches.SpaceSaving]:
+    for volume, summary in second.items():
+        first[volume].merge(summary)
+    return first
+
+
+def _heavy_hitter_reducer(
+    attributes: tuple[str, ...]
+) -> Callable[[Dict[str, sketches.SpaceSaving], Dict[str, Any]], Dict[str, sketches.SpaceSaving]]:
+    """Reducer counting the item's identity in the total summary, and if pending in the pending one."""
+    def add(summaries: Dict[str, sketches.SpaceSaving], item: Dict[str, Any]) -> Dict[str, sketches.SpaceSaving]:
+        value = _identity(item, attributes)
+        if value is not None:
+            value = str(value)
+            summaries['total'].add(value)
+            if not is_reviewed(item):
+                summaries['pending'].add(value)
+        return summaries
+    return add
+
+
+def heavy_hitters(summaries: Dict[str, sketches.SpaceSaving]) -> List[Dict[str, Any]]:
+    """
+    Response value of the heavy hitter summaries: the HEAVY_HITTERS_TOP_K
+    identities with the most pending items.
+    
+    Each entry's pending and total counts overestimate by at most its
+    error (reviewed = total - pending is off by at most error either way).
+    guaranteed is true when the identity belongs to the top K whatever the
+    errors: its lowest possible pending count reaches the next one's count.
+    
+    Returns:
+        List of dicts with id, pending, reviewed, total, error and guaranteed,
+        most pending first
+    """
+    ranked = summaries['pending'].top(HEAVY_HITTERS_TOP_K + 1)
+    threshold = ranked[HEAVY_HITTERS_TOP_K][1] if len(ranked) > HEAVY_HITTERS_TOP_K else summaries['pending'].floor
+    hitters = []
+    for key, pending, pending_error in ranked[:HEAVY_HITTERS_TOP_K]:
+        total, total_error = summaries['total'].estimate(key)
+        # Both counts overestimate, so the total is at least the pending count
+        total = max(total, pending)
+        hitters.append({
+            'id': key,
+            'pending': pending,
+            'reviewed': total - pending,
+            'total': total,
+            'error': max(pending_error, total_error),
+            'guaranteed': pending - pending_error >= threshold,
+        })
+    return hitters
+
+
+# Built-in metrics; 'total' and 'reviewed' also fill the usual counts
+for _table, (_, _carrier_attribute, _time_field) in CARRIER_INDEXES.items():
+    register_metric(MetricDefinition('total', _table))
+    register_metric(MetricDefinition('reviewed', _table, REVIEW_FIELDS, predicate=is_reviewed))
+    register_metric(MetricDefinition('totalByCarrier', _table, group_by=(_carrier_attribute,)))
+    register_metric(MetricDefinition(
+        'reviewedByCarrier', _table, REVIEW_FIELDS, predicate=is_reviewed, group_by=(_carrier_attribute,)
+    ))
+    # Time from the log to its first review, as a DDSketch per segment
+    for _name, _group_by in (('turnaroundSeconds', ()), ('turnaroundSecondsByCarrier', (_carrier_attribute,))):
+        register_metric(MetricDefinition(
+            _name, _table, REVIEW_FIELDS + (_time_field, REVIEW_DATE_FIELD),
+            predicate=is_reviewed,
+            reducer=_turnaround_reducer(_time_field),
+            initial=_turnaround_sketch,
+            merge=sketches.DDSketch.merge,
+            finalize=turnaround_percentiles,
+            group_by=_group_by
+        ))
+    # Distinct users and conversations, as HyperLogLog counters per review state,
+    # and those with the most pending items, as Space-Saving summaries
+    for _kind, _attributes in IDENTITY_ATTRIBUTES[_table].items():
+        register_metric(MetricDefinition(
+            f'distinct{_kind}', _table, REVIEW_FIELDS + _attributes,
+            reducer=_distinct_reducer(_attributes),
+            initial=_distinct_sketches,
+            merge=_merge_distinct_sketches,
+            finalize=DistinctCounts
+        ))
+        register_metric(MetricDefinition(
+            f'topPending{_kind}', _table, REVIEW_FIELDS + _attributes,
+            reducer=_heavy_hitter_reducer(_attributes),
+            initial=_heavy_hitter_summaries,
+            merge=_merge_heavy_hitter_summaries,
+            finalize=heavy_hitters
+        ))
+register_metric(MetricDefinition('guardrailInterventions', 'chatLogs', ('guardrail_intervened',),
+                                 predicate=_guardrail_intervened))
+register_metric(MetricDefinition('issueTags', 'chatLogs', ('issue_tags',), reducer=_add_issue_tags,
+                                 initial=Counter, finalize=_most_common))
+register_metric(MetricDefinition('byType', 'feedbackLogs', group_by=('type',)))
+del _table, _carrier_attribute, _time_field, _name, _group_by, _kind, _attributes
+
+
+class PendingIds:
+    """
+    Compact, sortable list of pending item IDs and their timestamps.
+    
+    IDs are stored back to back as UTF-8 in one bytearray, with their end
+    offsets in an array('I') and their timestamps (epoch seconds, inf when
+    missing or invalid) in an array('d'). Each ID costs its UTF-8 length
+    plus 12 bytes, where a str in a list costs over 50 bytes and an item
+    dict several hundred.
+    
+    After sort() (or merge() of sorted lists) the IDs are ordered by
+    (timestamp, ID) and after()/page() serve keyset-paginated slices.
+    """
+    
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array('I')
+        self.times = array('d')
+    
+    def __len__(self) -> int:
+        return len(self.ends)
+    
+    def add(self, item_id: Any, timestamp: Optional[float]) -> None:
+        self.data += str(item_id).encode('utf-8')
+        self.ends.append(len(self.data))
+        self.times.append(math.inf if timestamp is None else timestamp)
+    
+    def append_from(self, other: 'PendingIds', position: int) -> None:
+        self.data += other.data[other.ends[position - 1] if position else 0:other.ends[position]]
+        self.ends.append(len(self.data))
+        self.times.append(other.times[position])
+    
+    def id_bytes(self, position: int) -> bytes:
+        start = self.ends[position - 1] if position else 0
+        return bytes(self.data[start:self.ends[position]])
+    
+    def sort_key(self, position: int) -> tuple[float, bytes]:
+        return self.times[position], self.id_bytes(position)
+    
+    def sort(self) -> None:
+        """
+        Reorder the IDs by (timestamp, ID); missing timestamps sort last.
+        
+        Positions are sorted by timestamp alone, so no (timestamp, bytes)
+        key is built per ID; only runs of equal timestamps are sorted again
+        by ID. The order is kept in an array('I').
+        """
+        order = array('I', sorted(range(len(self)), key=self.times.__getitem__))
+        start = 0
+        while start < len(order):
+            timestamp = self.times[order[start]]
+            end = start + 1
+            while end < len(order) and self.times[order[end]] == timestamp:
+                end += 1
+            if end - start > 1:
+                order[start:end] = array('I', sorted(order[start:end], key=self.id_bytes))
+            start = end
         
+        ordered = PendingIds()
+        for position in order:
+            ordered.append_from(self, position)
+        self.data, self.ends, self.times = ordered.data, ordered.ends, ordered.times
+    
+    @classmethod
+    def merge(cls, parts: Iterable['PendingIds']) -> 'PendingIds':
+        """
+        Merge sorted lists into one sorted list.
+        
+        A k-way merge holding one sort key per list, so the lists are not
+        joined into an unsorted copy first.
+        """
+        def entries(part):
+            return ((part, position) for position in range(len(part)))
+        
+        merged = cls()
+        runs = [entries(part) for part in parts]
+        for part, position in heapq.merge(*runs, key=lambda entry: entry[0].sort_key(entry[1])):
+            merged.append_from(part, position)
+        return merged
+    
+    def after(self, key: Optional[tuple[float, str]]) -> int:
+        """Position of the first ID sorting after key (0 for None); needs sort()."""
+        if key is None:
+            return 0
+        timestamp, item_id = key
+        return bisect.bisect_right(range(len(self)), (timestamp, item_id.encode('utf-8')), key=self.sort_key)
+    
+    def page(self, start: int, limit: int) -> List[str]:
+        """Up to limit IDs from position start."""
+        return [self.id_bytes(position).decode('utf-8') for position in range(start, min(start + limit, len(self)))]
+
+
+def collect_pending_ids(
+    items: Iterable[Dict[str, Any]],
+    key_field: str,
+    time_field: str
+) -> tuple[tuple[int, int, int], PendingIds]:
+    """
+    Count items like calculate_metrics and keep the IDs of the pending ones.
+    
     Returns:
-        True if the item has been reviewed, False otherwise
+        Tuple of ((total, reviewed, pending), PendingIds in scan order)
+    """
+    pending = PendingIds()
+    total_count = 0
+    for item in items:
+        total_count += 1
+        if not is_reviewed(item):
+            pending.add(item[key_field], parse_timestamp(item.get(time_field)))
+    return (total_count, total_count - len(pending), len(pending)), pending
+
+
+def pending_review_ids(
+    table,
+    key_field: str,
+    carrier_index: tuple,
+    carriers: Optional[List[Any]] = None,
+    controller: Optional[ScanRateController] = None
+) -> tuple[tuple[int, int, int], PendingIds]:
+    """
+    Count a table's items and list its pending IDs in one pass.
+    
+    Items are read with fold_table_items (a parallel scan, or one carrier
+    GSI Query per carrier); each segment or carrier collects and sorts its
+    IDs, and the sorted lists are merged by (timestamp, ID).
+    
+    Args:
+        table: DynamoDB table resource
+        key_field: Key attribute to list (log_id or id)
+        carrier_index: (index name, carrier attribute, time field) of the carrier GSI
+        carriers: Carriers to query; None for all
+        controller: Optional rate controller every page request goes through
         
-    Validates: Requirements 8.2, 8.5
+    Returns:
+        Tuple of ((total, reviewed, pending), sorted PendingIds)
     """
-    rev_comment = item.get('rev_comment', '')
-    rev_feedback = item.get('rev_feedback', '')
+    index_name, carrier_attribute, time_field = carrier_index
+    projection_kwargs = {
+        'ProjectionExpression': ', '.join(('#key', '#time') + REVIEW_FIELDS),
+        'ExpressionAttributeNames': {'#key': key_field, '#time': time_field},
+    }
+    def collect_sorted(items):
+        counts, pending = collect_pending_ids(items, key_field, time_field)
+        pending.sort()
+        return counts, pending
     
-    # Check if either field has non-empty content after stripping whitespace
-    has_comment = bool(rev_comment and str(rev_comment).strip())
-    has_feedback = bool(rev_feedback and str(rev_feedback).strip())
+    partials = fold_table_items(
+        table,
+        collect_sorted,
+        projection_kwargs,
+        time_field,
+        None,
+        index_name,
+        carrier_attribute,
+        carriers,
+        controller=controller
+    )
     
-    return has_comment or has_feedback
+    pending = PendingIds.merge(partial for _, partial in partials)
+    return merge_metrics(counts for counts, _ in partials), pending
 
 
-def scan_table_with_pagination(table, projection_expression: str) -> List[Dict[str, Any]]:
+def encode_pending_cursor(positions: Dict[str, tuple[float, str]]) -> str:
     """
-    Scan a DynamoDB table with automatic pagination handling.
+    Encode the last (timestamp, ID) returned per table as a pagination cursor.
+    
+    Tables missing from positions have been listed completely.
+    """
+    payload = {
+        key: [None if math.isinf(timestamp) else timestamp, item_id]
+        for key, (timestamp, item_id) in positions.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_pending_cursor(cursor: str) -> Dict[str, tuple[float, str]]:
+    """
+    Decode a cursor from encode_pending_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        positions = {}
+        for key, (timestamp, item_id) in payload.items():
+            if key not in TABLE_KEYS:
+                raise ValueError(f"unknown table {key}")
+            if not isinstance(item_id, str):
+                raise ValueError(f"invalid ID for {key}")
+            positions[key] = (math.inf if timestamp is None else float(timestamp), item_id)
+        return positions
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}") from e
+
+
+def compute_table_metrics(
+    table,
+    projection_expression: str,
+    mode: str = 'scan',
+    should_stop: Optional[Callable[[], bool]] = None,
+    controller: Optional[ScanRateController] = None
+) -> tuple[int, int, int]:
+    """
+    Calculate one table's review metrics.
     
     Args:
         table: DynamoDB table resource
         projection_expression: Fields to retrieve from the table
+        mode: 'scan' to stream every item, 'count' for server-side counting,
+            'counters' to read the stream-maintained counters
+        should_stop: Deadline check for resumable scans ('scan' mode only)
+        controller: Optional rate controller for the scans ('scan' and 'count' mode)
         
     Returns:
-        List of all items from the table
+        Tuple of (total_count, reviewed_count, pending_count)
+        
+    Raises:
+        ScanInterrupted: If a 'scan' mode scan stopped before the deadline
     """
-    items = []
+    if mode == 'counters':
+        return read_review_counters(table)
     
-    # Initial scan
-    response = table.scan(ProjectionExpression=projection_expression)
-    items.extend(response.get('Items', []))
+    total_segments = choose_segment_count(table)
+    if mode == 'count':
+        return count_review_metrics(table, total_segments=total_segments, controller=controller)
+    return aggregate_table_metrics(
+        table, projection_expression, total_segments, should_stop, controller=controller
+    )
+
+
+def clear_metrics_cache() -> None:
+    """Drop every cached result (used by tests and after configuration changes)."""
+    with _metrics_cache_lock:
+        _metrics_cache.clear()
+        _bucket_cache.clear()
+
+
+def _cached_ids(value: Any) -> int:
+    """Number of pending IDs a cached result holds (see pending_review_ids)."""
+    if not isinstance(value, tuple):
+        return 0
+    return sum(len(part) for part in value if isinstance(part, PendingIds))
+
+
+def _store_cached_result(cache_key: tuple, value: Any) -> None:
+    """
+    Store a result as the most recently used entry.
     
-    # Handle pagination
-    while 'LastEvaluatedKey' in response:
-        response = table.scan(
-            ProjectionExpression=projection_expression,
-            ExclusiveStartKey=response['LastEvaluatedKey']
+    Entries past their stale window are dropped first, then the least
+    recently used ones until at most METRICS_CACHE_MAX_ENTRIES remain and
+    they hold at most PENDING_CACHE_MAX_IDS pending IDs. A result with more
+    IDs than that is not stored.
+    """
+    if _cached_ids(value) > PENDING_CACHE_MAX_IDS:
+        return
+    now = time.time()
+    with _metrics_cache_lock:
+        expired = [
+            key for key, (_, computed_at) in _metrics_cache.items()
+            if now - computed_at > METRICS_CACHE_TTL_SECONDS + METRICS_CACHE_STALE_SECONDS
+        ]
+        for key in expired:
+            del _metrics_cache[key]
+        _metrics_cache[cache_key] = (value, now)
+        _metrics_cache.move_to_end(cache_key)
+        while len(_metrics_cache) > METRICS_CACHE_MAX_ENTRIES:
+            _metrics_cache.popitem(last=False)
+        cached_ids = sum(_cached_ids(cached) for cached, _ in _metrics_cache.values())
+        while cached_ids > PENDING_CACHE_MAX_IDS:
+            _, (dropped, _) = _metrics_cache.popitem(last=False)
+            cached_ids -= _cached_ids(dropped)
+
+
+def _refresh_cached_result(cache_key: tuple, compute: Callable[..., Any]) -> None:
+    """
+    Recompute one cache entry; runs on a background thread.
+    
+    The refresh outlives the invocation that started it, so it gets its own
+    rate controller and capacity budget. It records no metrics: the
+    recorder belongs to the invocation, which may have finished or be busy
+    with its own reads.
+    """
+    instrumentation.detach()
+    try:
+        value = compute(None, ScanRateController())
+        _store_cached_result(cache_key, value)
+    except Exception as e:
+        print(f"Error refreshing cached metrics for {cache_key[0]}: {str(e)}")
+    finally:
+        with _metrics_cache_lock:
+            _metrics_cache_refreshing.discard(cache_key)
+
+
+def _cached_result(
+    cache_key: tuple,
+    compute: Callable[..., Any],
+    bypass_cache: bool = False,
+    should_stop: Optional[Callable[[], bool]] = None,
+    controller: Optional[ScanRateController] = None
+) -> tuple[Any, Dict[str, Any]]:
+    """
+    Serve compute(should_stop, controller) from the warm-container cache if possible.
+    
+    - Younger than METRICS_CACHE_TTL_SECONDS: served from the cache ("hit").
+    - Older, but within METRICS_CACHE_STALE_SECONDS more: the stale result is
+      served ("stale") and one background refresh is started for the key.
+    - Otherwise, or with bypass_cache: computed now ("miss"/"bypass") and stored.
+    
+    Lambda freezes the container between invocations, so a background
+    refresh may only finish during a later invocation.
+    
+    Returns:
+        Tuple of (value, cache info with status and ageSeconds)
+    """
+    if not bypass_cache and METRICS_CACHE_TTL_SECONDS > 0:
+        with _metrics_cache_lock:
+            entry = _metrics_cache.get(cache_key)
+            if entry is not None:
+                _metrics_cache.move_to_end(cache_key)
+        if entry is not None:
+            value, computed_at = entry
+            age = time.time() - computed_at
+            if age <= METRICS_CACHE_TTL_SECONDS:
+                return value, {'status': 'hit', 'ageSeconds': round(age, 1)}
+            if age <= METRICS_CACHE_TTL_SECONDS + METRICS_CACHE_STALE_SECONDS:
+                with _metrics_cache_lock:
+                    start_refresh = cache_key not in _metrics_cache_refreshing
+                    _metrics_cache_refreshing.add(cache_key)
+                if start_refresh:
+                    threading.Thread(
+                        target=_refresh_cached_result,
+                        args=(cache_key, compute),
+                        daemon=True
+                    ).start()
+                return value, {'status': 'stale', 'ageSeconds': round(age, 1)}
+    
+    value = compute(should_stop, controller)
+    _store_cached_result(cache_key, value)
+    return value, {'status': 'bypass' if bypass_cache else 'miss', 'ageSeconds': 0.0}
+
+
+def cached_table_metrics(
+    table,
+    projection_expression: str,
+    mode: str,
+    bypass_cache: bool = False,
+    should_stop: Optional[Callable[[], bool]] = None,
+    resume_state: Optional[Dict[str, Any]] = None,
+    controller: Optional[ScanRateController] = None
+) -> tuple[tuple[int, int, int], Dict[str, Any]]:
+    """
+    Return a table's review metrics from the warm-container cache if possible.
+    
+    See _cached_result for the hit/stale/miss rules. With resume_state an
+    interrupted scan is continued ("resumed"). Its result is built on counts
+    carried by the request, so neither resumed nor partial results are cached.
+    
+    Args:
+        table: DynamoDB table resource
+        projection_expression: Fields to retrieve from the table
+        mode: Metrics mode, part of the cache key
+        bypass_cache: Skip the cache lookup (the fresh result is still stored)
+        should_stop: Deadline check passed on to compute_table_metrics
+        resume_state: State of an interrupted 'scan' mode scan to continue
+        controller: Rate controller passed on to compute_table_metrics
+        
+    Returns:
+        Tuple of ((total, reviewed, pending), cache info with status and ageSeconds)
+        
+    Raises:
+        ScanInterrupted: If the scan stopped before the deadline
+    """
+    cache_key = (table.table_name, projection_expression, mode)
+    
+    if resume_state is not None:
+        counts = aggregate_table_metrics(
+            table, projection_expression, should_stop=should_stop, resume_state=resume_state,
+            controller=controller
         )
-        items.extend(response.get('Items', []))
+        return counts, {'status': 'resumed', 'ageSeconds': 0.0}
     
-    return items
+    return _cached_result(
+        cache_key,
+        lambda stop, rate: compute_table_metrics(table, projection_expression, mode, stop, rate),
+        bypass_cache,
+        should_stop,
+        controller
+    )
 
 
-def calculate_metrics(items: List[Dict[str, Any]]) -> tuple[int, int, int]:
+def cached_time_bucket_metrics(
+    table,
+    time_field: str,
+    interval_seconds: int,
+    window_start: int,
+    window_end: int,
+    index_name: Optional[str] = None,
+    carrier_attribute: Optional[str] = None,
+    carriers: Optional[List[Any]] = None,
+    bypass_cache: bool = False,
+    now: Optional[float] = None,
+    controller: Optional[ScanRateController] = None
+) -> tuple[Dict[int, tuple[int, int, int]], Dict[str, Any]]:
     """
-    Calculate total, reviewed, and pending counts for a list of items.
+    Return time_bucket_metrics, reusing closed buckets from earlier calls.
+    
+    Buckets that ended more than TIME_BUCKET_SETTLE_SECONDS ago are cached
+    in the warm container and never read again; only the remaining buckets
+    (normally just the current one) are computed, one Query/Scan range per
+    contiguous run of missing buckets.
+    
+    Only carrier-scoped Queries read less for the smaller range. Without
+    carriers each run is a filtered full-table scan, so the cache then saves
+    Lambda time and transferred bytes but no read capacity.
+    
+    Returns:
+        Tuple of (bucket start -> (total, reviewed, pending), cache info with
+        status hit/partial/miss/bypass and cachedBuckets)
+    """
+    cache_key = (
+        table.table_name, time_field, interval_seconds, index_name,
+        tuple(carriers) if carriers is not None else None
+    )
+    with _metrics_cache_lock:
+        closed = {}
+        if not bypass_cache and cache_key in _bucket_cache:
+            _bucket_cache.move_to_end(cache_key)
+            closed = dict(_bucket_cache[cache_key])
+    
+    buckets = list(range(window_start, window_end, interval_seconds))
+    cached = {bucket: closed[bucket] for bucket in buckets if bucket in closed}
+    
+    # Group the missing buckets into contiguous runs, one range read each
+    runs = []
+    for bucket in buckets:
+        if bucket in cached:
+            continue
+        if runs and runs[-1][1] == bucket:
+            runs[-1][1] = bucket + interval_seconds
+        else:
+            runs.append([bucket, bucket + interval_seconds])
+    
+    computed = {}
+    for run_start, run_end in runs:
+        computed.update(time_bucket_metrics(
+            table, time_field, interval_seconds, run_start, run_end,
+            index_name, carrier_attribute, carriers, controller
+        ))
+    
+    current = time.time() if now is None else now
+    newly_closed = {
+        bucket: counts for bucket, counts in computed.items()
+        if bucket + interval_seconds + TIME_BUCKET_SETTLE_SECONDS <= current
+    }
+    if newly_closed:
+        with _metrics_cache_lock:
+            stored = _bucket_cache.setdefault(cache_key, {})
+            stored.update(newly_closed)
+            for bucket in sorted(stored)[:-MAX_TIME_BUCKETS]:
+                del stored[bucket]
+            _bucket_cache.move_to_end(cache_key)
+            while len(_bucket_cache) > BUCKET_CACHE_MAX_ENTRIES:
+                _bucket_cache.popitem(last=False)
+    
+    if bypass_cache:
+        status = 'bypass'
+    elif not computed:
+        status = 'hit'
+    else:
+        status = 'partial' if cached else 'miss'
+    return dict(sorted({**cached, **computed}.items())), {'status': status, 'cachedBuckets': len(cached)}
+
+
+def _timed(read: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """
+    Run read(*args) for one table, capturing its duration and any error.
+    
+    Returns:
+        Dict with counts (or None), cache info (or None), durationMs,
+        error (exception or None), state (resume state if the scan was
+        interrupted, else None) and the fields read returned
+    """
+    start = time.perf_counter()
+    result = {'counts': None, 'cache': None, 'error': None, 'state': None}
+    try:
+        result.update(read(*args))
+    except ScanInterrupted as e:
+        result['counts'], result['state'] = e.counts, e.state
+    except Exception as e:
+        result['error'] = e
+    result['durationMs'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def read_table_metrics(key: str, table, projection_expression: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute one table's metrics in the request's mode, through the
+    warm-container cache (see _cached_result).
     
     Args:
-        items: List of DynamoDB items
+        key: Table key ('chatLogs' or 'feedbackLogs')
+        table: DynamoDB table resource
+        projection_expression: Fields 'scan', 'count' and 'estimate' mode read
+        request: Parsed request parameters (see lambda_handler)
         
     Returns:
-        Tuple of (total_count, reviewed_count, pending_count)
+        Dict with counts and cache info, plus carriers ('carrier'), buckets
+        ('timeseries'), pendingIds ('pending'), estimate ('estimate'),
+        metrics ('registry') or plan (filtered 'scan')
         
-    Validates: Requirements 8.2, 8.3, 8.5, 8.6
+    Raises:
+        ScanInterrupted: If a 'scan' mode scan (filtered or not) stopped
+            before the deadline
     """
-    total_count = len(items)
-    reviewed_count = sum(1 for item in items if is_reviewed(item))
-    pending_count = total_count - reviewed_count
+    mode, carriers, time_range = request['mode'], request['carriers'], request['filter_range']
+    bypass_cache, controller = request['bypass_cache'], request['controller']
+    index_name, carrier_attribute, time_field = carrier_index = CARRIER_INDEXES[key]
+    carrier_key = tuple(carriers) if carriers is not None else None
     
-    return total_count, reviewed_count, pending_count
+    def cached(cache_key: tuple, compute: Callable[..., Any]) -> tuple[Any, Dict[str, Any]]:
+        return _cached_result(cache_key, compute, bypass_cache, controller=controller)
+    
+    if mode == 'carrier':
+        by_carrier, cache = cached(
+            (table.table_name, index_name, 'carrier', carrier_key),
+            lambda stop, rate: carrier_review_metrics(table, index_name, carrier_attribute, carriers, rate)
+        )
+        return {'counts': merge_metrics(by_carrier.values()), 'cache': cache, 'carriers': by_carrier}
+    if mode == 'timeseries':
+        interval_seconds, window_start, window_end = request['window']
+        buckets, cache = cached_time_bucket_metrics(
+            table, time_field, interval_seconds, window_start, window_end,
+            index_name, carrier_attribute, carriers, bypass_cache, controller=controller
+        )
+        return {'counts': merge_metrics(buckets.values()), 'cache': cache, 'buckets': buckets}
+    if mode == 'pending':
+        # Later pages are usually served from the cache; the keyset cursor
+        # stays valid when the cached list is refreshed in between
+        (counts, pending_ids), cache = cached(
+            (table.table_name, 'pending', carrier_key),
+            lambda stop, rate: pending_review_ids(table, TABLE_KEYS[key], carrier_index, carriers, rate)
+        )
+        return {'counts': counts, 'cache': cache, 'pendingIds': pending_ids}
+    if mode == 'estimate':
+        target_error, confidence = request['target_error'], request['confidence']
+        estimate, cache = cached(
+            (table.table_name, 'estimate', target_error, confidence),
+            lambda stop, rate: estimate_table_metrics(table, projection_expression, target_error, confidence, rate)
+        )
+        return {'counts': estimate['counts'], 'cache': cache, 'estimate': estimate['estimate']}
+    if mode == 'registry':
+        definitions = request['definitions'][key]
+        metrics, cache = cached(
+            (table.table_name, 'registry', tuple(definition.name for definition in definitions), carrier_key,
+             time_range),
+            lambda stop, rate: evaluate_metric_registry(
+                table, definitions, TABLE_KEYS[key], carrier_index, carriers, time_range, rate
+            )
+        )
+        # The usual counts come from the 'total' and 'reviewed' metrics when selected
+        counts = None
+        if 'total' in metrics and 'reviewed' in metrics:
+            counts = (metrics['total'], metrics['reviewed'], metrics['total'] - metrics['reviewed'])
+        return {'counts': counts, 'cache': cache, 'metrics': metrics}
+    if request['filtered']:
+        review_state, resume_state = request['review_state'], request['resume_states'].get(key)
+        if resume_state is not None:
+            plan = resume_state['plan']
+            counts = filtered_table_metrics(
+                table, carrier_index, plan, carriers, time_range, review_state, controller,
+                request['should_stop'], resume_state
+            )
+            return {'counts': counts, 'cache': {'status': 'resumed', 'ageSeconds': 0.0}, 'plan': plan}
+        
+        def compute(stop, rate):
+            plan = plan_table_read(table, carrier_index, carriers, time_range)
+            counts = filtered_table_metrics(table, carrier_index, plan, carriers, time_range, review_state, rate, stop)
+            return counts, plan
+        
+        (counts, plan), cache = _cached_result(
+            (table.table_name, 'filtered', carrier_key, time_range, review_state), compute,
+            bypass_cache, request['should_stop'], controller
+        )
+        return {'counts': counts, 'cache': cache, 'plan': plan}
+    counts, cache = cached_table_metrics(
+        table, projection_expression, mode, bypass_cache, request['should_stop'],
+        request['resume_states'].get(key), controller
+    )
+    return {'counts': counts, 'cache': cache}
+
+
+def bad_request(message: str) -> Dict[str, Any]:
+    """API Gateway 400 response for an invalid request."""
+    return {
+        'statusCode': 400,
+        'body': json.dumps({
+            'error': 'Invalid request',
+            'message': message
+        })
+    }
+
+
+def _deadline_checker(context: Any) -> Optional[Callable[[], bool]]:
+    """
+    Build a should_stop callable from the Lambda context.
+    
+    Returns None (never stop) when there is no context, e.g. in local runs.
+    """
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return None
+    return lambda: context.get_remaining_time_in_millis() < DEADLINE_MARGIN_MS
+
+
+def _token_secret() -> bytes:
+    """
+    The continuation token signing key, CONTINUATION_TOKEN_SECRET.
+    
+    Continuation tokens carry running counts and start keys, so they are
+    signed with HMAC-SHA256. Every container must share the key, so it is
+    configuration like the table names and lambda_handler refuses to run
+    without it.
+    
+    Raises:
+        KeyError: If CONTINUATION_TOKEN_SECRET is not set
+    """
+    secret = os.environ.get('CONTINUATION_TOKEN_SECRET', '')
+    if not secret:
+        raise KeyError('CONTINUATION_TOKEN_SECRET')
+    return secret.encode('utf-8')
+
+
+def encode_continuation_token(mode: str, table_states: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Encode resume states into an opaque, signed continuation token.
+    
+    LastEvaluatedKeys are stored in DynamoDB wire format so numeric and
+    binary keys survive the JSON round trip. The payload is signed with
+    CONTINUATION_TOKEN_SECRET so clients cannot alter counts or keys.
+    
+    Args:
+        mode: Metrics mode the scans ran in
+        table_states: Response key ('chatLogs', ...) -> resume state; a
+            finished table has an empty 'pending' map and its final counts,
+            a segment that has not read a page yet has a None key; filtered
+            reads also keep their 'plan' and 'filters'
+            
+    Returns:
+        URL-safe base64 payload and HMAC signature, joined by '.'
+        
+    Raises:
+        KeyError: If CONTINUATION_TOKEN_SECRET is not set
+    """
+    tables = {}
+    for key, state in table_states.items():
+        tables[key] = {
+            'segments': state['segments'],
+            'counts': list(state['counts']),
+            'pending': {
+                str(segment): None if last_key is None else {
+                    name: _serializer.serialize(value) for name, value in last_key.items()
+                }
+                for segment, last_key in state['pending'].items()
+            },
+        }
+        if state.get('filters') is not None:
+            tables[key]['plan'] = state['plan']
+            tables[key]['filters'] = state['filters']
+    payload = json.dumps({'mode': mode, 'tables': tables}, separators=(',', ':')).encode('utf-8')
+    signature = hmac.new(_token_secret(), payload, hashlib.sha256).digest()
+    return '.'.join(base64.urlsafe_b64encode(part).decode('ascii') for part in (payload, signature))
+
+
+def _decode_filter_state(plan: Any, filters: Any, segments: int) -> Dict[str, Any]:
+    """
+    Check the plan and filters a filtered read stored in its resume state.
+    
+    Raises:
+        ValueError: If they do not describe a read filtered_table_metrics can resume
+    """
+    carriers, filter_range, review_state = filters['carriers'], filters['range'], filters['reviewState']
+    if carriers is not None and not (carriers and all(isinstance(carrier, str) for carrier in carriers)):
+        raise ValueError("invalid carriers")
+    if filter_range is not None:
+        start, end = (int(bound) for bound in filter_range)
+        if not start < end:
+            raise ValueError("invalid time range")
+        filter_range = [start, end]
+    if review_state not in REVIEW_STATES:
+        raise ValueError(f"invalid reviewState: {review_state}")
+    if plan['operation'] == 'Query':
+        if carriers is None or segments > len(carriers):
+            raise ValueError(f"segments out of range: {segments}")
+    elif plan['operation'] != 'Scan':
+        raise ValueError(f"invalid operation: {plan['operation']}")
+    return {
+        'plan': plan,
+        'filters': {'carriers': carriers, 'range': filter_range, 'reviewState': review_state},
+    }
+
+
+def decode_continuation_token(token: str) -> tuple[str, Dict[str, Dict[str, Any]]]:
+    """
+    Verify and decode a token produced by encode_continuation_token.
+    
+    Besides the signature, the states are checked for shape: at most
+    MAX_SCAN_SEGMENTS segments (or one per carrier for filtered Queries),
+    pending segment ids below the segment count and three consistent,
+    non-negative counts.
+    
+    Returns:
+        Tuple of (mode, table_states)
+        
+    Raises:
+        ValueError: If the token is malformed, tampered with or out of range
+        KeyError: If CONTINUATION_TOKEN_SECRET is not set
+    """
+    secret = _token_secret()
+    try:
+        encoded_payload, encoded_signature = token.split('.')
+        payload = base64.urlsafe_b64decode(encoded_payload.encode('ascii'))
+        signature = base64.urlsafe_b64decode(encoded_signature.encode('ascii'))
+        expected = hmac.new(secret, payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(signature, expected):
+            raise ValueError("signature mismatch")
+        
+        payload = json.loads(payload)
+        table_states = {}
+        for key, state in payload['tables'].items():
+            if key not in ('chatLogs', 'feedbackLogs'):
+                raise ValueError(f"unknown table {key}")
+            segments = int(state['segments'])
+            # Filtered Queries have one segment per carrier (see _decode_filter_state)
+            carrier_queries = state.get('filters') is not None and state['plan']['operation'] == 'Query'
+            if not 1 <= segments <= (math.inf if carrier_queries else MAX_SCAN_SEGMENTS):
+                raise ValueError(f"segments out of range: {segments}")
+            total, reviewed, pending = (int(count) for count in state['counts'])
+            if min(total, reviewed, pending) < 0 or reviewed + pending != total:
+                raise ValueError("inconsistent counts")
+            start_keys = {}
+            for segment, last_key in state['pending'].items():
+                segment = int(segment)
+                if not 0 <= segment < segments:
+                    raise ValueError(f"segment out of range: {segment}")
+                start_keys[segment] = None if last_key is None else {
+                    name: _deserializer.deserialize(value) for name, value in last_key.items()
+                }
+            table_states[key] = {
+                'segments': segments,
+                'counts': [total, reviewed, pending],
+                'pending': start_keys,
+            }
+            if state.get('filters') is not None:
+                table_states[key].update(_decode_filter_state(state['plan'], state['filters'], segments))
+        return payload['mode'], table_states
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid continuation token: {str(e)}") from e
+
+
+def _checkpoint_table():
+    return dynamodb.Table(os.environ['METRICS_TABLE'])
+
+
+def save_checkpoint(token: str) -> None:
+    """Persist a continuation token so a scheduled invocation can resume it."""
+    _checkpoint_table().put_item(Item={
+        'metric_key': CHECKPOINT_KEY,
+        'token': token,
+        'updated_at': int(time.time()),
+    })
 
 
+def load_checkpoint() -> Optional[str]:
+    """Return the persisted continuation token, if any."""
+    item = _checkpoint_table().get_item(Key={'metric_key': CHECKPOINT_KEY}).get('Item')
+    return item['token'] if item else None
+
+
+def delete_checkpoint() -> None:
+    """Remove the persisted continuation token once its scan has finished."""
+    _checkpoint_table().delete_item(Key={'metric_key': CHECKPOINT_KEY})
+
+
+def _is_true(value: Any) -> bool:
+    """Interpret a boolean event flag, which arrives as a string from query strings."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+def _param_list(value: Any) -> Optional[List[str]]:
+    """Interpret a list event parameter, given as a list or a comma-separated string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    elements = [str(element).strip() for element in value if str(element).strip()]
+    return elements or None
+
+
+@instrumentation.instrument_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler function to calculate review metrics.
     
+    Both tables are scanned concurrently through the shared DynamoDB client,
+    which is created on first use.
+    The response reports each table's scan duration; if one table fails its
+    counts are null and its error is listed under "errors", while the other
+    table's counts are still returned. Results are cached per table and mode
+    in the warm container; "cache" reports hit/stale/miss and the data age.
+    
+    In 'carrier' mode each table's carrier GSI is queried once per carrier,
+    in parallel; the counts are summed over the carriers and broken down
+    per carrier under "carriers".
+    
+    In 'timeseries' mode the counts are bucketed per hour or day over a
+    window, listed under "buckets"; closed buckets are cached and only the
+    open ones are computed again (read from the index with carriers, by a
+    filtered full scan without).
+    
+    In 'tags' mode only chat logs are read: the response lists issue tag
+    counts ("tags") and the co-occurring tag pairs ("pairs").
+    
+    In 'pending' mode the scan that counts also keeps the IDs of pending
+    items (see PendingIds); "pendingIds" holds one page per table, oldest
+    first, and "nextCursor" requests the next page.
+    
+    In 'registry' mode every metric of METRIC_REGISTRY (or those named in
+    "metrics") is evaluated in one read pass per table and listed under
+    "metrics"; the counts come from its 'total' and 'reviewed' metrics.
+    "distinct" combines the tables' distinct user and conversation counts.
+    
+    In 'estimate' mode the totals come from DescribeTable and the reviewed
+    counts from a sample of scan segments (see estimate_table_metrics);
+    "estimates" holds each ratio's confidence interval. Its latency is
+    bounded by ESTIMATE_TIME_BUDGET_SECONDS, whatever the table size.
+    
+    In 'scan' mode, carriers, start/end and reviewState filter the counted
+    items. plan_table_read picks carrier GSI Queries or a filtered Scan per
+    table by estimated read cost; "plans" reports the choice and its
+    estimate, "consumedCapacity" what the reads actually cost.
+    
+    Every Scan and Query of the invocation, in every mode, goes through one
+    ScanRateController that backs off on throttling and accounts consumed
+    read capacity ("consumedCapacity") against SCAN_RCU_BUDGET.
+    
+    A METRICS_SAMPLE_RATE share of invocations prints one CloudWatch EMF
+    line (see instrumentation.py) with page count and latency, items and
+    bytes per second, consumed capacity and the time spent deserialising
+    and classifying items.
+    
+    A warm-up event ({"warmup": true}, e.g. from a schedule) creates the
+    client, opens WARMUP_CONNECTIONS pooled connections and returns without
+    reading any table.
+    
+    In 'scan' mode the scans stop shortly before the invocation deadline (or
+    once the capacity budget is spent) and the response carries partial counts, "partial": true and a
+    "continuationToken" that resumes them in a follow-up invocation.
+    
     Environment Variables:
         CHAT_LOGS_TABLE: Name of the UnityAIAssistantLogs DynamoDB table
         FEEDBACK_TABLE: Name of the UserFeedback DynamoDB table
+        SCAN_SEGMENTS: Optional fixed parallel scan segment count
+        MAX_SCAN_SEGMENTS: Upper bound for the derived segment count (default 16)
+        SCAN_SEGMENT_TARGET_BYTES: Table bytes per derived segment (default 64 MiB)
+        METRICS_MODE: Default metrics mode: 'scan', 'count', 'counters', 'carrier',
+            'timeseries', 'tags', 'pending', 'registry' or 'estimate' (default 'scan')
+        METRICS_TABLE: Table holding the stream-maintained counters (counters mode)
+        METRICS_CACHE_TTL_SECONDS: Age up to which cached results are served (default 30, 0 disables)
+        METRICS_CACHE_STALE_SECONDS: Extra age served stale while refreshing (default 300)
+        DEADLINE_MARGIN_MS: Remaining time at which scans stop early (default 3000)
+        TIME_BUCKET_SETTLE_SECONDS: Age after its end at which a time bucket is cached (default 300)
+        SCAN_RCU_BUDGET: Read capacity units one invocation may consume (default 0, unlimited)
+        SCAN_MAX_PAGE_RATE: Upper bound of the adaptive page rate per second (default 200)
+        METRICS_SAMPLE_RATE: Share of invocations that log EMF metrics (default 0.1)
+        DYNAMODB_CONNECT_TIMEOUT, DYNAMODB_READ_TIMEOUT: Client timeouts in seconds (default 2, 10)
+        WARMUP_CONNECTIONS: Connections opened by a warm-up event (default 4)
+        PLANNER_CARRIER_SHARE: Assumed share of a table's items per carrier (default 0.1)
+        PLANNER_TIME_SPAN_SECONDS: Assumed time span of a table's items (default 90 days)
+        ESTIMATE_TARGET_ERROR: Default targetError of 'estimate' mode (default 0.01)
+        ESTIMATE_TIME_BUDGET_SECONDS: Time after which sampling stops (default 0.8)
+        
+    Event Parameters (top level or queryStringParameters):
+        mode: 'scan' streams every item; 'count' counts server-side with
+            Select='COUNT' and only fetches possibly whitespace-only items;
+            'counters' reads the counters kept by stream_consumer.py (one
+            GetItem per table); 'carrier' queries the byCarrierName/byCarrier
+            GSIs for a per-carrier breakdown
+        carriers: Carriers for 'carrier' mode (list or comma-separated);
+            discovered with a key-only scan of each index if omitted. In
+            'timeseries', 'tags', 'pending' and 'registry' mode they turn the
+            table scan into Queries; in 'scan' mode they filter the counts
+        interval: 'hour' (default) or 'day' buckets for 'timeseries' mode
+        start, end: ISO 8601 window for 'timeseries' mode (default: last
+            24 hours or 30 days); optional time filter for 'tags', 'scan' and
+            'registry' mode
+        tables: Tables to read (list or comma-separated of chatLogs,
+            feedbackLogs; default both); the others report null counts
+        reviewState: 'reviewed' or 'pending' to count only those items in
+            'scan' mode (default 'all')
+        metrics: Registry metrics to evaluate in 'registry' mode (list or
+            comma-separated; default all)
+        targetError: Half-width of the reviewed ratio's confidence interval
+            at which 'estimate' mode stops sampling (default 0.01)
+        confidence: Confidence level of that interval (default 0.95)
+        limit: Pending IDs per table and page in 'pending' mode (default 100, at most 1000)
+        cursor: nextCursor of the previous 'pending' mode page
+        bypassCache: 'true' to ignore cached results and recompute
+        continuationToken: Token from a partial response to resume its scans
+        warmup: 'true' to only warm the container up (see above)
+        persistCheckpoint: 'true' to save the token of a partial run in METRICS_TABLE
+        resumeCheckpoint: 'true' to resume the saved token (e.g. from a schedule),
+            saving progress again or deleting it once the scan completes
         
     Returns:
         API Gateway response with metrics data
@@ -108,44 +3480,311 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Get table names from environment variables
         chat_logs_table_name = os.environ['CHAT_LOGS_TABLE']
         feedback_table_name = os.environ['FEEDBACK_TABLE']
+        _token_secret()
+        
+        # Scheduled warm-up pings only prepare the container
+        if _is_true(get_event_param(event, 'warmup', False)):
+            recorder = instrumentation.active()
+            if recorder is not None:
+                recorder.dimensions['Mode'] = 'warmup'
+            return {
+                'statusCode': 200,
+                'body': json.dumps(warm_up([chat_logs_table_name, feedback_table_name]))
+            }
+        
+        mode = get_event_param(event, 'mode', os.environ.get('METRICS_MODE', 'scan'))
+        
+        # A continuation token (given, or persisted by an earlier run)
+        # resumes interrupted scans in the mode they were started in
+        resume_checkpoint = _is_true(get_event_param(event, 'resumeCheckpoint', False))
+        persist_checkpoint = resume_checkpoint or _is_true(get_event_param(event, 'persistCheckpoint', False))
+        token = get_event_param(event, 'continuationToken')
+        if token is None and resume_checkpoint:
+            token = load_checkpoint()
+        resume_states = {}
+        if token:
+            try:
+                mode, resume_states = decode_continuation_token(token)
+            except ValueError as e:
+                return bad_request(str(e))
+        
+        if mode not in METRICS_MODES:
+            return bad_request(f"Unsupported mode: {mode}")
+        
+        recorder = instrumentation.active()
+        if recorder is not None:
+            recorder.dimensions['Mode'] = mode
+        
+        bypass_cache = _is_true(get_event_param(event, 'bypassCache', False))
+        
+        # One rate controller and capacity budget for every scan of this
+        # invocation; a spent budget stops resumable scans like the deadline
+        controller = ScanRateController()
+        deadline_reached = _deadline_checker(context)
+        if deadline_reached is None:
+            should_stop = controller.exhausted
+        else:
+            should_stop = lambda: deadline_reached() or controller.exhausted()
+        carriers = _param_list(get_event_param(event, 'carriers'))
+        
+        selected_tables = _param_list(get_event_param(event, 'tables'))
+        review_state = get_event_param(event, 'reviewState', 'all')
+        filter_range = None
+        window = None
+        pending_positions = None
+        pending_limit = PENDING_PAGE_SIZE
+        try:
+            unknown_tables = sorted(set(selected_tables or ()) - set(TABLE_KEYS))
+            if unknown_tables:
+                raise ValueError(f"Unsupported tables: {', '.join(unknown_tables)}")
+            if review_state not in REVIEW_STATES:
+                raise ValueError(f"Unsupported reviewState: {review_state}")
+            given_filters = [
+                name for name in FILTER_PARAMETER_MODES
+                if get_event_param(event, name) is not None and (name != 'reviewState' or review_state != 'all')
+            ]
+            unsupported_filters = [name for name in given_filters if mode not in FILTER_PARAMETER_MODES[name]]
+            if unsupported_filters:
+                raise ValueError(f"{', '.join(unsupported_filters)} cannot be used in {mode} mode")
+            if resume_states and given_filters:
+                raise ValueError("Filters cannot be combined with a continuation token")
+            # Filters in scan mode; a resumed scan keeps its original filters
+            resumed_filters = next(
+                (state['filters'] for state in resume_states.values() if state.get('filters') is not None), None
+            )
+            if resumed_filters is not None:
+                filtered = True
+                carriers, review_state = resumed_filters['carriers'], resumed_filters['reviewState']
+                filter_range = None if resumed_filters['range'] is None else tuple(resumed_filters['range'])
+            else:
+                filtered = mode == 'scan' and not resume_states and (
+                    carriers is not None or review_state != 'all'
+                    or get_event_param(event, 'start') is not None or get_event_param(event, 'end') is not None
+                )
+            if (filtered and resumed_filters is None) or mode in ('registry', 'tags'):
+                filter_range = time_range(get_event_param(event, 'start'), get_event_param(event, 'end'))
+            metric_names = _param_list(get_event_param(event, 'metrics'))
+            unknown_metrics = sorted(set(metric_names or ()) - {name for _, name in METRIC_REGISTRY})
+            if mode == 'registry' and unknown_metrics:
+                raise ValueError(f"Unknown metrics: {', '.join(unknown_metrics)}")
+            # Tables without a selected metric are not read
+            definitions = None
+            if mode == 'registry':
+                definitions = {
+                    key: registered_metrics(key, metric_names) for key in TABLE_KEYS
+                    if selected_tables is None or key in selected_tables
+                }
+                definitions = {key: selected for key, selected in definitions.items() if selected}
+                if not definitions:
+                    raise ValueError("No selected metric applies to the selected tables")
+            target_error = float(get_event_param(event, 'targetError', ESTIMATE_TARGET_ERROR))
+            confidence = float(get_event_param(event, 'confidence', ESTIMATE_CONFIDENCE))
+            if not 0 < target_error < 1:
+                raise ValueError("targetError must be between 0 and 1")
+            if not 0 < confidence < 1:
+                raise ValueError("confidence must be between 0 and 1")
+            if mode == 'timeseries':
+                window = time_window(
+                    get_event_param(event, 'interval', 'hour'),
+                    get_event_param(event, 'start'),
+                    get_event_param(event, 'end')
+                )
+            if mode == 'pending':
+                pending_limit = int(get_event_param(event, 'limit', PENDING_PAGE_SIZE))
+                if not 1 <= pending_limit <= MAX_PENDING_PAGE_SIZE:
+                    raise ValueError(f"limit must be between 1 and {MAX_PENDING_PAGE_SIZE}")
+                cursor = get_event_param(event, 'cursor')
+                if cursor:
+                    pending_positions = decode_pending_cursor(cursor)
+        except ValueError as e:
+            return bad_request(str(e))
+        
+        if mode == 'tags':
+            # Issue tags only exist on chat logs
+            chat_logs_table = dynamodb.Table(chat_logs_table_name)
+            start = time.perf_counter()
+            statistics, cache_info = _cached_result(
+                (chat_logs_table.table_name, 'tags', tuple(carriers) if carriers is not None else None, filter_range),
+                lambda stop, rate: issue_tag_statistics(
+                    chat_logs_table, CARRIER_INDEXES['chatLogs'], carriers, filter_range, rate
+                ),
+                bypass_cache,
+                controller=controller
+            )
+            body = statistics.to_dict()
+            body['mode'] = mode
+            body['durationsMs'] = {'chatLogs': round((time.perf_counter() - start) * 1000, 1)}
+            body['cache'] = {'chatLogs': cache_info}
+            body['consumedCapacity'] = controller.summary()
+            return {
+                'statusCode': 200,
+                'body': json.dumps(body)
+            }
         
         # Get table resources
         chat_logs_table = dynamodb.Table(chat_logs_table_name)
         feedback_table = dynamodb.Table(feedback_table_name)
         
-        # Scan chat logs table - only fetch fields needed for metrics calculation
+        # Scan both tables concurrently - only fetch fields needed for metrics calculation
         # Requirement 8.1: Calculate total count of chat logs
-        chat_logs_items = scan_table_with_pagination(
-            chat_logs_table,
-            'log_id, rev_comment, rev_feedback'
-        )
-        
-        # Scan feedback table - only fetch fields needed for metrics calculation
         # Requirement 8.4: Calculate total count of feedback logs
-        feedback_items = scan_table_with_pagination(
-            feedback_table,
-            'id, rev_comment, rev_feedback'
-        )
+        tables = {
+            'chatLogs': (chat_logs_table, 'log_id, rev_comment, rev_feedback'),
+            'feedbackLogs': (feedback_table, 'id, rev_comment, rev_feedback'),
+        }
+        if selected_tables is not None:
+            tables = {key: value for key, value in tables.items() if key in selected_tables}
+        if definitions is not None:
+            tables = {key: value for key, value in tables.items() if key in definitions}
+        request = {
+            'mode': mode,
+            'carriers': carriers,
+            'filter_range': filter_range,
+            'filtered': filtered,
+            'review_state': review_state,
+            'window': window,
+            'definitions': definitions,
+            'target_error': target_error,
+            'confidence': confidence,
+            'bypass_cache': bypass_cache,
+            'should_stop': should_stop,
+            'resume_states': resume_states,
+            'controller': controller,
+        }
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = {
+                key: executor.submit(instrumentation.propagate(_timed), read_table_metrics, key, table, projection_expression, request)
+                for key, (table, projection_expression) in tables.items()
+            }
+            results = {key: future.result() for key, future in futures.items()}
+        
+        errors = {key: str(result['error']) for key, result in results.items() if result['error'] is not None}
+        for key, message in errors.items():
+            print(f"Error calculating {key} metrics: {message}")
+        
+        if results and len(errors) == len(results):
+            raise next(iter(results.values()))['error']
+        
+        # Requirements 8.1, 8.2, 8.3 (chat logs) and 8.4, 8.5, 8.6 (feedback logs).
+        # A table that failed (or was not selected) reports null counts so the
+        # other table's counts still reach the dashboard.
+        chat_logs_counts = results.get('chatLogs', {}).get('counts') or (None, None, None)
+        feedback_counts = results.get('feedbackLogs', {}).get('counts') or (None, None, None)
+        total_chat_logs, reviewed_chat_logs, pending_chat_logs = chat_logs_counts
+        total_feedback_logs, reviewed_feedback_logs, pending_feedback_logs = feedback_counts
+        
+        body = {
+            'totalChatLogs': total_chat_logs,
+            'reviewedChatLogs': reviewed_chat_logs,
+            'pendingChatLogs': pending_chat_logs,
+            'totalFeedbackLogs': total_feedback_logs,
+            'reviewedFeedbackLogs': reviewed_feedback_logs,
+            'pendingFeedbackLogs': pending_feedback_logs,
+            'mode': mode,
+            'durationsMs': {key: round(result['durationMs'], 1) for key, result in results.items()},
+            'cache': {key: result['cache'] for key, result in results.items() if result['cache']}
+        }
+        if errors:
+            body['errors'] = errors
         
-        # Calculate chat logs metrics
-        # Requirements 8.1, 8.2, 8.3
-        total_chat_logs, reviewed_chat_logs, pending_chat_logs = calculate_metrics(chat_logs_items)
+        body['consumedCapacity'] = controller.summary()
         
-        # Calculate feedback logs metrics
-        # Requirements 8.4, 8.5, 8.6
-        total_feedback_logs, reviewed_feedback_logs, pending_feedback_logs = calculate_metrics(feedback_items)
+        # How each table's counts were estimated, with their confidence interval
+        if mode == 'estimate':
+            body['estimates'] = {
+                key: result['estimate'] for key, result in results.items() if result.get('estimate') is not None
+            }
+        
+        # Every selected registry metric per table
+        if mode == 'registry':
+            body['metrics'] = {
+                key: result['metrics'] for key, result in results.items() if result.get('metrics') is not None
+            }
+            # Distinct users and conversations over both tables
+            distinct = {}
+            for name in ('distinctUsers', 'distinctConversations'):
+                values = [metrics[name] for metrics in body['metrics'].values() if name in metrics]
+                if values:
+                    distinct[name] = combine_distinct_counts(values)
+            if distinct:
+                body['distinct'] = distinct
+        
+        # The filters and how each table was read
+        if filtered:
+            body['filters'] = {
+                'carriers': carriers,
+                'start': None if filter_range is None else format_timestamp(filter_range[0]),
+                'end': None if filter_range is None else format_timestamp(filter_range[1]),
+                'reviewState': review_state,
+            }
+            # Interrupted reads keep their plan in the resume state
+            plans = {key: result.get('plan') or (result['state'] or {}).get('plan') for key, result in results.items()}
+            body['plans'] = {key: plan for key, plan in plans.items() if plan is not None}
+        
+        # Per-carrier breakdown; the totals above are summed over these carriers
+        if mode == 'carrier':
+            body['carriers'] = {
+                key: {
+                    str(carrier): {'total': total, 'reviewed': reviewed, 'pending': pending}
+                    for carrier, (total, reviewed, pending) in result['carriers'].items()
+                }
+                for key, result in results.items()
+                if result.get('carriers') is not None
+            }
+        
+        # Per-bucket counts; the totals above are summed over the window
+        if mode == 'timeseries':
+            body['interval'] = get_event_param(event, 'interval', 'hour')
+            body['window'] = {'start': format_timestamp(window[1]), 'end': format_timestamp(window[2])}
+            body['buckets'] = {
+                key: [
+                    {'start': format_timestamp(bucket), 'total': total, 'reviewed': reviewed, 'pending': pending}
+                    for bucket, (total, reviewed, pending) in result['buckets'].items()
+                ]
+                for key, result in results.items()
+                if result.get('buckets') is not None
+            }
+        
+        # One page of pending IDs per table, oldest first. The cursor keeps
+        # the last (timestamp, ID) of every table that has more to list
+        if mode == 'pending':
+            body['pendingIds'] = {}
+            next_positions = {}
+            for key, result in results.items():
+                pending = result.get('pendingIds')
+                if pending is None or (pending_positions is not None and key not in pending_positions):
+                    continue
+                start = pending.after(None if pending_positions is None else pending_positions[key])
+                body['pendingIds'][key] = pending.page(start, pending_limit)
+                end = start + len(body['pendingIds'][key])
+                if end < len(pending):
+                    next_positions[key] = (pending.times[end - 1], pending.id_bytes(end - 1).decode('utf-8'))
+            body['nextCursor'] = encode_pending_cursor(next_positions) if next_positions else None
+        
+        # Interrupted scans return their partial counts plus a token holding
+        # every table's progress; finished tables are stored as done
+        if any(result['state'] for result in results.values()):
+            table_states = {
+                key: result['state'] or {'segments': 1, 'pending': {}, 'counts': result['counts']}
+                for key, result in results.items()
+                if result['counts'] is not None
+            }
+            if filtered:
+                for key, state in table_states.items():
+                    if state.get('filters') is None:
+                        state['plan'] = results[key]['plan']
+                        state['filters'] = filter_state(carriers, filter_range, review_state)
+            body['partial'] = True
+            body['continuationToken'] = encode_continuation_token(mode, table_states)
+            if persist_checkpoint:
+                save_checkpoint(body['continuationToken'])
+        elif resume_checkpoint and token:
+            delete_checkpoint()
         
         # Return metrics
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'totalChatLogs': total_chat_logs,
-                'reviewedChatLogs': reviewed_chat_logs,
-                'pendingChatLogs': pending_chat_logs,
-                'totalFeedbackLogs': total_feedback_logs,
-                'reviewedFeedbackLogs': reviewed_feedback_logs,
-                'pendingFeedbackLogs': pending_feedback_logs
-            })
+            'body': json.dumps(body)
         }
         
     except KeyError as e:
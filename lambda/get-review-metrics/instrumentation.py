@@ -0,0 +1,262 @@
+"""
+Hot-path instrumentation emitted as CloudWatch Embedded Metric Format (EMF).
+
+A sampled invocation gets a MetricRecorder. The scan code records into it:
+- every Scan/Query page: latency, items, response bytes, consumed capacity
+- time spent deserialising pages and classifying items (is_reviewed)
+- cold starts: the CPU time of the init phase and of creating the client
+
+When the invocation ends the recorder prints one EMF JSON line to stdout.
+CloudWatch Logs turns it into metrics, so no agent or extra service is
+needed, and tests can read the line from stdout.
+
+Only a METRICS_SAMPLE_RATE share of invocations is recorded. Unsampled
+invocations only check once per page whether a recorder is active. The first
+invocation of every container is always recorded, so cold starts can be
+tracked over time.
+
+The active recorder is a context variable. Worker threads of the invocation
+run their function through propagate() to record into it. Any other thread
+(e.g. a background cache refresh) starts with an empty context and records
+nothing, even while an invocation is being recorded.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from array import array
+from typing import Dict, Any, Callable, Optional
+
+# Share of invocations that are recorded (0 disables, 1 records all)
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '0.1'))
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'InsightSphere/GetReviewMetrics')
+
+# EMF accepts at most 100 values per metric in one log line
+MAX_METRIC_VALUES = 100
+
+# Metric name -> CloudWatch unit, in output order
+METRIC_UNITS = {
+    'Duration': 'Milliseconds',
+    'Pages': 'Count',
+    'PageLatency': 'Milliseconds',
+    'Items': 'Count',
+    'Bytes': 'Bytes',
+    'ItemsPerSecond': 'Count/Second',
+    'BytesPerSecond': 'Bytes/Second',
+    'ConsumedCapacity': 'Count',
+    'DeserializeTime': 'Milliseconds',
+    'ClassifyTime': 'Milliseconds',
+    'ClientInitTime': 'Milliseconds',
+    'ColdStart': 'Count',
+    'InitTime': 'Milliseconds',
+}
+
+_active: contextvars.ContextVar[Optional['MetricRecorder']] = contextvars.ContextVar('recorder', default=None)
+_cold_start = True
+
+
+class MetricRecorder:
+    """
+    Metrics of one invocation, shared by all scan segment threads.
+
+    Args:
+        dimensions: EMF dimensions, e.g. {'Mode': 'scan'}
+    """
+
+    def __init__(self, dimensions: Optional[Dict[str, str]] = None):
+        self.dimensions = dict(dimensions or {})
+        self.pages = 0
+        self.page_latencies = array('d')
+        self.items = 0
+        self.bytes = 0
+        self.capacity_units = 0.0
+        self.timers: Dict[str, float] = {'DeserializeTime': 0.0, 'ClassifyTime': 0.0, 'ClientInitTime': 0.0}
+        # CPU seconds of the container's init phase, set on its first invocation
+        self.init_seconds: Optional[float] = None
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record_page(self, seconds: float, response: Dict[str, Any]) -> None:
+        """Record one Scan/Query page response and how long it took."""
+        items = response.get('ScannedCount')
+        if items is None:
+            items = len(response.get('Items', ()))
+        headers = (response.get('ResponseMetadata') or {}).get('HTTPHeaders') or {}
+        consumed = response.get('ConsumedCapacity') or {}
+        with self._lock:
+            self.pages += 1
+            if len(self.page_latencies) < MAX_METRIC_VALUES:
+                self.page_latencies.append(seconds * 1000)
+            self.items += items
+            self.bytes += int(headers.get('content-length', 0))
+            self.capacity_units += float(consumed.get('CapacityUnits', 0))
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Add to one of the timers (DeserializeTime, ClassifyTime, ClientInitTime)."""
+        with self._lock:
+            self.timers[name] += seconds
+
+    def to_emf(self, properties: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Build the EMF document.
+
+        Args:
+            properties: Extra log fields that are not metrics (e.g. statusCode)
+
+        Returns:
+            Dict with the _aws metadata, the dimension values and one value
+            (or list of values) per metric
+        """
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            values = {
+                'Duration': round(elapsed * 1000, 3),
+                'Pages': self.pages,
+                'PageLatency': [round(latency, 3) for latency in self.page_latencies],
+                'Items': self.items,
+                'Bytes': self.bytes,
+                'ItemsPerSecond': round(self.items / elapsed, 1) if elapsed > 0 else 0.0,
+                'BytesPerSecond': round(self.bytes / elapsed, 1) if elapsed > 0 else 0.0,
+                'ConsumedCapacity': round(self.capacity_units, 1),
+                'DeserializeTime': round(self.timers['DeserializeTime'] * 1000, 3),
+                'ClassifyTime': round(self.timers['ClassifyTime'] * 1000, 3),
+                'ClientInitTime': round(self.timers['ClientInitTime'] * 1000, 3),
+                'ColdStart': int(self.init_seconds is not None),
+            }
+        if not values['PageLatency']:
+            del values['PageLatency']
+        if self.init_seconds is not None:
+            values['InitTime'] = round(self.init_seconds * 1000, 3)
+
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [sorted(self.dimensions)],
+                    'Metrics': [
+                        {'Name': name, 'Unit': unit}
+                        for name, unit in METRIC_UNITS.items() if name in values
+                    ],
+                }],
+            },
+        }
+        document.update(properties or {})
+        document.update(self.dimensions)
+        document.update(values)
+        return document
+
+    def emit(self, properties: Optional[Dict[str, Any]] = None) -> None:
+        """Print the EMF document as one log line."""
+        print(json.dumps(self.to_emf(properties), separators=(',', ':')))
+
+
+def active() -> Optional[MetricRecorder]:
+    """The recorder of the current invocation, or None if it is not sampled."""
+    return _active.get()
+
+
+def propagate(function: Callable) -> Callable:
+    """
+    Bind a function to the caller's recorder, to run it on a worker thread.
+
+    New threads start with an empty context, so without this a scan segment
+    thread would not record into the invocation that started it.
+    """
+    recorder = _active.get()
+    if recorder is None:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _active.set(recorder)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _active.reset(token)
+    return wrapper
+
+
+def detach() -> None:
+    """Stop recording on the current thread, e.g. for work outliving the invocation."""
+    _active.set(None)
+
+
+def start(dimensions: Optional[Dict[str, str]] = None, sample_rate: Optional[float] = None) -> Optional[MetricRecorder]:
+    """
+    Start recording the current invocation if it is sampled.
+
+    Args:
+        dimensions: EMF dimensions of the invocation
+        sample_rate: Share of invocations to record (default METRICS_SAMPLE_RATE)
+
+    Returns:
+        The new active recorder, or None if the invocation is not sampled
+    """
+    rate = METRICS_SAMPLE_RATE if sample_rate is None else sample_rate
+    recorder = MetricRecorder(dimensions) if rate > 0 and random.random() < rate else None
+    _active.set(recorder)
+    return recorder
+
+
+def finish(properties: Optional[Dict[str, Any]] = None) -> None:
+    """Emit and clear the active recorder, if any."""
+    recorder = _active.get()
+    _active.set(None)
+    if recorder is not None:
+        recorder.emit(properties)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator adding a function's run time to the active recorder's timer.
+
+    The function is called directly when no recorder is active.
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            recorder = _active.get()
+            if recorder is None:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                recorder.add_time(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def instrument_handler(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable:
+    """
+    Decorator recording a sampled Lambda invocation and emitting its metrics.
+
+    The handler can add dimensions through active().dimensions. The response
+    statusCode is logged as a property of the EMF line. The first invocation
+    of the container is recorded whenever sampling is enabled, with the
+    process CPU time up to that point (runtime start, imports) as InitTime.
+    """
+    @functools.wraps(handler)
+    def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+        global _cold_start
+        if _cold_start:
+            _cold_start = False
+            init_seconds = time.process_time()
+            recorder = start(sample_rate=1.0 if METRICS_SAMPLE_RATE > 0 else 0.0)
+            if recorder is not None:
+                recorder.init_seconds = init_seconds
+        else:
+            start()
+        response = None
+        try:
+            response = handler(event, context)
+            return response
+        finally:
+            status = response.get('statusCode') if isinstance(response, dict) else None
+            finish({'statusCode': status})
+    return wrapper
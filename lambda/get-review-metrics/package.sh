@@ -5,8 +5,17 @@
 rm -rf package
 mkdir -p package
 
-# Copy function code
-cp index.py package/
+# Copy function code (index.py is the GetReviewMetrics handler with its
+# EMF metrics in instrumentation.py and streaming sketches in sketches.py,
+# stream_consumer.py the review counter stream handler, eval_metrics.py the
+# evaluation job summary handler)
+cp index.py instrumentation.py sketches.py stream_consumer.py eval_metrics.py package/
+
+# Precompile bytecode: the Lambda filesystem is read-only, so without it every
+# cold start compiles the sources again. Unchecked hashes skip the source
+# timestamp check, which zip does not preserve exactly. The packaging Python
+# must match the function runtime (3.11), or the bytecode is ignored.
+python3 -m compileall -q --invalidation-mode unchecked-hash package/
 
 # Install dependencies (if any beyond boto3 which is provided by Lambda runtime)
 # pip install -r requirements.txt -t package/
@@ -0,0 +1,220 @@
+"""
+Recompute review metrics offline from DynamoDB table exports.
+
+DynamoDB's export to S3 (DYNAMODB_JSON format) writes gzipped files holding
+one {"Item": {...}} record per line, with the attributes in wire format
+({'S': ...}). This tool counts those records with the classifier of
+GetReviewMetrics, count_reviewed_raw, so the items are never deserialized,
+and applies the Lambda's filters the way its reads do (carriers as in the
+sparse carrier GSI, start/end as an inclusive timestamp string range,
+reviewState).
+
+The files are spread over a process pool, one task per file. Each worker
+streams its file line by line in CLASSIFY_BATCH_SIZE batches and returns
+its counters, which are merged at the end; no file is ever loaded whole, so
+memory stays flat and throughput grows with the cores while there are at
+least as many files as processes.
+
+Usage:
+    python recompute_export.py --table chatLogs exports/chat/data/
+    python recompute_export.py --table feedbackLogs --carriers Acme,Globex \\
+        --start 2024-01-01T00:00:00Z --review-state pending export-1.json.gz export-2.json.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional
+
+from index import (
+    CARRIER_INDEXES,
+    CLASSIFY_BATCH_SIZE,
+    REVIEW_STATES,
+    count_reviewed_raw,
+    merge_metrics,
+    sort_key_bounds,
+    time_range,
+)
+
+
+# File names DynamoDB exports use for their data files
+EXPORT_SUFFIXES = ('.json.gz', '.json')
+
+
+def find_export_files(paths: List[str]) -> List[str]:
+    """
+    Expand files and directories into the export data files they hold.
+
+    Args:
+        paths: Export files, or directories searched recursively
+
+    Returns:
+        Sorted list of file paths, largest first so the pool finishes evenly
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                files.update(os.path.join(directory, name) for name in names if name.endswith(EXPORT_SUFFIXES))
+        else:
+            files.add(path)
+    return sorted(files, key=lambda file: (-os.path.getsize(file), file))
+
+
+def iter_export_records(path: str, stats: Dict[str, int]) -> Iterator[Dict[str, Dict[str, Any]]]:
+    """
+    Stream the items of one export file in wire format.
+
+    Args:
+        path: .json.gz (or uncompressed .json) export file
+        stats: Counts records and invalidRecords (lines that are not records)
+
+    Yields:
+        Each record's Item attribute map
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)['Item']
+            except (ValueError, KeyError, TypeError):
+                stats['invalidRecords'] += 1
+                continue
+            stats['records'] += 1
+            yield item
+
+
+def _string_value(attribute: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Value of a wire-format string or number attribute, None otherwise."""
+    if not attribute:
+        return None
+    value = attribute.get('S', attribute.get('N'))
+    return value if isinstance(value, str) else None
+
+
+def count_export_file(task: tuple) -> Dict[str, Any]:
+    """
+    Count the records of one export file; runs in a pool worker.
+
+    Args:
+        task: (path, carrier attribute, time field, carriers or None, time bounds or None)
+
+    Returns:
+        Dict with counts (total, reviewed, pending), records and invalidRecords
+    """
+    path, carrier_attribute, time_field, carriers, bounds = task
+    stats = {'records': 0, 'invalidRecords': 0}
+    items = iter_export_records(path, stats)
+    if carriers is not None or bounds is not None:
+        items = (item for item in items if _matches(item, carrier_attribute, time_field, carriers, bounds))
+
+    total = reviewed = 0
+    batch = list(islice(items, CLASSIFY_BATCH_SIZE))
+    while batch:
+        total += len(batch)
+        reviewed += count_reviewed_raw(batch)
+        batch = list(islice(items, CLASSIFY_BATCH_SIZE))
+    return dict(stats, counts=(total, reviewed, total - reviewed))
+
+
+def _matches(
+    item: Dict[str, Dict[str, Any]],
+    carrier_attribute: str,
+    time_field: str,
+    carriers: Optional[frozenset],
+    bounds: Optional[tuple[str, str]]
+) -> bool:
+    """Whether the Lambda's carrier and time filters would read the item."""
+    timestamp = _string_value(item.get(time_field))
+    if carriers is not None and (timestamp is None or _string_value(item.get(carrier_attribute)) not in carriers):
+        return False
+    return bounds is None or (timestamp is not None and bounds[0] <= timestamp <= bounds[1])
+
+
+def recompute(
+    paths: List[str],
+    table: str,
+    carriers: Optional[List[str]] = None,
+    filter_range: Optional[tuple[int, int]] = None,
+    review_state: str = 'all',
+    processes: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Count an export's records over a process pool.
+
+    Args:
+        paths: Export files or directories
+        table: 'chatLogs' or 'feedbackLogs', selecting the carrier and time attributes
+        carriers: Carrier filter; None for all carriers
+        filter_range: Optional [start, end) in epoch seconds
+        review_state: 'all', 'reviewed' or 'pending'
+        processes: Pool size (default os.cpu_count()); 1 counts in this process
+
+    Returns:
+        Dict with total, reviewed, pending, files, records read, invalidRecords,
+        processes and seconds
+    """
+    _, carrier_attribute, time_field = CARRIER_INDEXES[table]
+    files = find_export_files(paths)
+    selected = None if carriers is None else frozenset(carriers)
+    tasks = [(path, carrier_attribute, time_field, selected, sort_key_bounds(filter_range)) for path in files]
+
+    started = time.perf_counter()
+    processes = min(processes or os.cpu_count() or 1, max(1, len(tasks)))
+    if processes == 1:
+        results = [count_export_file(task) for task in tasks]
+    else:
+        with Pool(processes) as pool:
+            results = list(pool.imap_unordered(count_export_file, tasks))
+
+    total, reviewed, pending = merge_metrics(result['counts'] for result in results)
+    if review_state == 'reviewed':
+        total, pending = reviewed, 0
+    elif review_state == 'pending':
+        total, reviewed = pending, 0
+    return {
+        'table': table,
+        'total': total,
+        'reviewed': reviewed,
+        'pending': pending,
+        'files': len(files),
+        'records': sum(result['records'] for result in results),
+        'invalidRecords': sum(result['invalidRecords'] for result in results),
+        'processes': processes,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='Export data files or directories')
+    parser.add_argument('--table', required=True, choices=sorted(CARRIER_INDEXES), help='Table the export is of')
+    parser.add_argument('--carriers', help='Comma-separated carriers to count')
+    parser.add_argument('--start', help='ISO 8601 start of the time filter')
+    parser.add_argument('--end', help='ISO 8601 end of the time filter')
+    parser.add_argument('--review-state', default='all', choices=REVIEW_STATES, help='Count only these items')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    try:
+        filter_range = time_range(args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    carriers = None
+    if args.carriers:
+        carriers = [carrier.strip() for carrier in args.carriers.split(',') if carrier.strip()]
+
+    result = recompute(args.paths, args.table, carriers, filter_range, args.review_state, args.processes)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,423 @@
+"""
+Mergeable streaming sketches for the metrics scan.
+
+A sketch summarises a stream of values in memory that does not grow with
+the number of items. Sketches of the same parameters merge exactly, so each
+parallel scan segment fills its own and the segments are merged at the end
+(see index.MetricDefinition). Their state converts to and from JSON-safe
+dicts, for merging with results kept from earlier invocations.
+
+- DDSketch: quantiles with a bounded relative error
+- HyperLogLog: distinct counts with a fixed standard error
+- SpaceSaving: the most frequent keys, with bounded overestimates
+"""
+
+import base64
+import hashlib
+import math
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative error guarantees (DDSketch).
+
+    A positive value v is counted in bucket ceil(log(v) / log(gamma)), with
+    gamma = (1 + alpha) / (1 - alpha), alpha the relative accuracy. Every
+    value of a bucket is within alpha of its representative value
+    2 * gamma**k / (gamma + 1), so each quantile is within alpha of the
+    exact one. Zero and negative values are counted as zero.
+
+    The buckets span log(max / min) / log(gamma) keys: with alpha = 0.01,
+    durations from one second to a year need about 870. Beyond max_buckets
+    the lowest buckets are collapsed into one, so only the lowest quantiles
+    lose the guarantee.
+
+    Args:
+        relative_accuracy: alpha, between 0 and 1 (default 0.01)
+        max_buckets: Upper bound of the buckets kept (default 2048)
+    """
+
+    __slots__ = ('relative_accuracy', 'max_buckets', 'gamma', '_log_gamma', 'buckets', 'zero_count', 'count',
+                 'min', 'max')
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """Count value weight times."""
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zero_count += weight
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        if key in self.buckets:
+            self.buckets[key] += weight
+        else:
+            self.buckets[key] = weight
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+
+    def _collapse(self) -> None:
+        """Merge the lowest buckets until max_buckets remain."""
+        keys = sorted(self.buckets)
+        excess = len(keys) - self.max_buckets
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.buckets[target] += self.buckets.pop(key)
+
+    def merge(self, other: 'DDSketch') -> 'DDSketch':
+        """
+        Add other's counts to this sketch.
+
+        Returns:
+            This sketch
+
+        Raises:
+            ValueError: If the sketches have a different relative accuracy
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches of different relative accuracy")
+        for key, weight in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-quantile (0 <= q <= 1), None for an empty sketch.
+
+        The result is within relative_accuracy of the value at rank
+        q * (count - 1) of the sorted values, and within [min, max];
+        values counted as zero are reported as 0.
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe state, restored by from_dict."""
+        keys = sorted(self.buckets)
+        return {
+            'relativeAccuracy': self.relative_accuracy,
+            'maxBuckets': self.max_buckets,
+            'count': self.count,
+            'zeroCount': self.zero_count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'keys': keys,
+            'counts': [self.buckets[key] for key in keys],
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'DDSketch':
+        """
+        Restore a sketch from to_dict's state.
+
+        Raises:
+            ValueError: If the state is malformed
+        """
+        try:
+            sketch = cls(float(state['relativeAccuracy']), int(state['maxBuckets']))
+            sketch.buckets = {int(key): int(weight) for key, weight in zip(state['keys'], state['counts'], strict=True)}
+            sketch.zero_count = int(state['zeroCount'])
+            sketch.count = int(state['count'])
+            if sketch.count:
+                sketch.min, sketch.max = float(state['min']), float(state['max'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid sketch state: {e}") from e
+        return sketch
+
+
+class HyperLogLog:
+    """
+    Distinct value counter (HyperLogLog).
+
+    A value's 64-bit hash picks one of m = 2**precision registers with its
+    first precision bits; the register keeps the highest rank (position of
+    the first 1 bit) of the remaining bits. The count is estimated from the
+    harmonic mean of 2**register, with linear counting while registers are
+    still empty. The standard error is 1.04 / sqrt(m): 0.81% for the default
+    precision of 14, whose registers take 16 KB whatever the count.
+
+    Hashes come from BLAKE2b, not hash(), so registers filled by other
+    processes or earlier runs merge with these.
+
+    Args:
+        precision: Register index bits, from 4 to 16 (default 14)
+    """
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str) -> None:
+        """Count value (a string; other values are counted as str(value))."""
+        if not isinstance(value, str):
+            value = str(value)
+        hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        remaining_bits = 64 - self.precision
+        register = hashed >> remaining_bits
+        rank = remaining_bits - (hashed & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """
+        Count other's values in this counter too (the union of both).
+
+        Returns:
+            This counter
+
+        Raises:
+            ValueError: If the counters have a different precision
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge counters of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self) -> 'HyperLogLog':
+        counter = HyperLogLog(self.precision)
+        counter.registers = bytearray(self.registers)
+        return counter
+
+    def count(self) -> int:
+        """
+        Estimated number of distinct values.
+
+        Uses Ertl's improved estimator ("New cardinality estimation
+        algorithms for HyperLogLog sketches", 2017) over the histogram of
+        register values. Unlike the original estimator it needs no switch to
+        linear counting, whose bias peaks near 2.5 * m values.
+        """
+        size = len(self.registers)
+        histogram = Counter(self.registers)
+        max_rank = 64 - self.precision
+        z = size * _tau(1 - histogram[max_rank + 1] / size)
+        for rank in range(max_rank, 0, -1):
+            z = 0.5 * (z + histogram[rank])
+        z += size * _sigma(histogram[0] / size)
+        if math.isinf(z):
+            return 0
+        return round(size * size / (2 * math.log(2) * z))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe state (registers in base64), restored by from_dict."""
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(bytes(self.registers)).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'HyperLogLog':
+        """
+        Restore a counter from to_dict's state.
+
+        Raises:
+            ValueError: If the state is malformed
+        """
+        try:
+            counter = cls(int(state['precision']))
+            registers = bytearray(base64.b64decode(state['registers'], validate=True))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid counter state: {e}") from e
+        if len(registers) != len(counter.registers) or max(registers) > 65 - counter.precision:
+            raise ValueError("Invalid counter state: registers do not match the precision")
+        counter.registers = registers
+        return counter
+
+
+class SpaceSaving:
+    """
+    Heavy hitter counter (Space-Saving, Metwally et al.).
+
+    At most capacity keys are monitored. A key that is not monitored takes
+    the place of the key with the lowest count, and starts from that count
+    plus its weight; the count it inherited is its error. Every count
+    overestimates its key by at most its error, and the errors are at most
+    (total weight) / capacity, so every key weighing more than that is
+    monitored.
+
+    Summaries merge as in Agarwal et al., "Mergeable Summaries" (2012): a key
+    missing from one summary is taken to have that summary's lowest count,
+    then the capacity highest counts are kept. The bounds still hold for
+    the combined stream.
+
+    Args:
+        capacity: Number of keys monitored (default 1000)
+    """
+
+    __slots__ = ('capacity', 'counts', 'errors', '_minimum', '_candidates')
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self._minimum = 0
+        self._candidates: List[Hashable] = []
+
+    def add(self, key: Hashable, weight: int = 1) -> None:
+        """Count key weight times."""
+        counts = self.counts
+        if key in counts:
+            counts[key] += weight
+        elif len(counts) < self.capacity:
+            counts[key] = weight
+            self.errors[key] = 0
+        else:
+            victim, floor = self._pop_minimum()
+            del counts[victim], self.errors[victim]
+            counts[key] = floor + weight
+            self.errors[key] = floor
+
+    def _pop_minimum(self) -> tuple[Hashable, int]:
+        """
+        A key with the lowest count, and that count.
+
+        Counts only grow, so the keys found at the lowest count stay valid
+        candidates until they are incremented; the counts are scanned again
+        only when every candidate is used up.
+        """
+        counts = self.counts
+        while True:
+            while self._candidates:
+                key = self._candidates.pop()
+                if counts.get(key) == self._minimum:
+                    return key, self._minimum
+            self._minimum = min(counts.values())
+            self._candidates = [key for key, count in counts.items() if count == self._minimum]
+
+    @property
+    def floor(self) -> int:
+        """Upper bound of the count of any key that is not monitored."""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def estimate(self, key: Hashable) -> tuple[int, int]:
+        """
+        Count of key and its error: the exact count lies in [count - error, count].
+        """
+        if key in self.counts:
+            return self.counts[key], self.errors[key]
+        return self.floor, self.floor
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        Count other's keys in this summary too.
+
+        Returns:
+            This summary
+
+        Raises:
+            ValueError: If the summaries have a different capacity
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("Cannot merge summaries of different capacity")
+        own_floor, other_floor = self.floor, other.floor
+        combined = {
+            key: (self.counts.get(key, own_floor) + other.counts.get(key, other_floor),
+                  self.errors.get(key, own_floor) + other.errors.get(key, other_floor))
+            for key in self.counts.keys() | other.counts.keys()
+        }
+        kept = sorted(combined.items(), key=lambda entry: entry[1][0], reverse=True)[:self.capacity]
+        self.counts = {key: count for key, (count, _) in kept}
+        self.errors = {key: error for key, (_, error) in kept}
+        self._minimum, self._candidates = 0, []
+        return self
+
+    def top(self, k: int) -> List[tuple[Hashable, int, int]]:
+        """The k highest counts as (key, count, error), highest first."""
+        ranked = sorted(self.counts.items(), key=lambda entry: (-entry[1], str(entry[0])))
+        return [(key, count, self.errors[key]) for key, count in ranked[:k]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe state (for string keys), restored by from_dict."""
+        keys = list(self.counts)
+        return {
+            'capacity': self.capacity,
+            'keys': keys,
+            'counts': [self.counts[key] for key in keys],
+            'errors': [self.errors[key] for key in keys],
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'SpaceSaving':
+        """
+        Restore a summary from to_dict's state.
+
+        Raises:
+            ValueError: If the state is malformed
+        """
+        try:
+            summary = cls(int(state['capacity']))
+            entries = list(zip(state['keys'], state['counts'], state['errors'], strict=True))
+            summary.counts = {key: int(count) for key, count, _ in entries}
+            summary.errors = {key: int(error) for key, _, error in entries}
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid summary state: {e}") from e
+        if len(summary.counts) > summary.capacity:
+            raise ValueError("Invalid summary state: more keys than its capacity")
+        return summary
+
+
+def _sigma(x: float) -> float:
+    """Ertl's sigma series for the share x of empty registers."""
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    """Ertl's tau series for the share x of registers below the maximum rank."""
+    if x in (0, 1):
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
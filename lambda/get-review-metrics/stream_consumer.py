@@ -0,0 +1,210 @@
+"""
+DynamoDB stream consumer that keeps review counters up to date incrementally.
+
+Subscribed to the UnityAIAssistantLogs and UserFeedback table streams with
+NEW_AND_OLD_IMAGES (see ReviewCountersConsumerFunction in the
+chat-logs-review stack). For every change it
+applies is_reviewed to the old and new image and moves the table's total and
+reviewed counters in the METRICS_TABLE accordingly:
+- INSERT adds one item (reviewed or pending)
+- MODIFY moves an item between pending and reviewed
+- REMOVE drops one item
+
+GetReviewMetrics reads those counters with mode=counters (one GetItem per
+table) instead of scanning the tables.
+
+Stream records can be delivered more than once and a retried batch can replay
+records older than ones already applied. Each source item therefore has a
+state record in METRICS_TABLE holding the last applied sequence number and the
+item's last known presence and review status. A record is applied only if its
+sequence number is newer, and the state record and counter update are written
+in one transaction, so every change is counted exactly once.
+
+The counters must be seeded once (seed_counters) with the counts of a full
+scan taken before the event source mapping starts reading the stream.
+"""
+
+import os
+import time
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from typing import Dict, Any, Optional
+
+from index import is_reviewed
+
+
+dynamodb_client = boto3.client('dynamodb')
+
+_deserializer = TypeDeserializer()
+
+# Partition key of the METRICS_TABLE
+METRICS_KEY = 'metric_key'
+
+# Stream sequence numbers are decimal strings of varying length; padding them
+# makes string comparison (in Python and in condition expressions) numeric.
+SEQUENCE_WIDTH = 40
+
+# Deleted items leave a tombstone so replayed older records are still
+# rejected. Streams keep records for 24 hours, so the tombstone can expire
+# after that (enable TTL on the expires_at attribute).
+TOMBSTONE_TTL_SECONDS = 2 * 24 * 60 * 60
+
+# Retries when a concurrent writer changed the same state record
+MAX_APPLY_ATTEMPTS = 5
+
+
+def table_name_from_arn(event_source_arn: str) -> str:
+    """
+    Extract the table name from a stream ARN
+    (arn:aws:dynamodb:region:account:table/NAME/stream/LABEL).
+    """
+    return event_source_arn.split(':table/', 1)[1].split('/', 1)[0]
+
+
+def image_state(image: Optional[Dict[str, Any]]) -> tuple[bool, bool]:
+    """
+    Classify a stream image.
+
+    Args:
+        image: NewImage or OldImage in DynamoDB wire format, or None
+
+    Returns:
+        Tuple of (present, reviewed)
+    """
+    if not image:
+        return False, False
+    item = {name: _deserializer.deserialize(value) for name, value in image.items()}
+    return True, is_reviewed(item)
+
+
+def _state_key(table_name: str, keys: Dict[str, Any]) -> str:
+    """METRICS_TABLE key of the state record for one source item."""
+    parts = [
+        f"{name}={_deserializer.deserialize(value)}"
+        for name, value in sorted(keys.items())
+    ]
+    return f"{table_name}#item#{'|'.join(parts)}"
+
+
+def apply_record(record: Dict[str, Any], metrics_table: str) -> bool:
+    """
+    Apply one stream record to the review counters.
+
+    Args:
+        record: DynamoDB stream record from the Lambda event
+        metrics_table: Name of the METRICS_TABLE
+
+    Returns:
+        True if the record changed the state, False if it was a duplicate
+        or older than the last applied record for the same item
+    """
+    change = record['dynamodb']
+    table_name = table_name_from_arn(record['eventSourceARN'])
+    sequence = change['SequenceNumber'].zfill(SEQUENCE_WIDTH)
+    state_key = _state_key(table_name, change['Keys'])
+
+    if record['eventName'] == 'REMOVE':
+        new_present, new_reviewed = False, False
+    else:
+        new_present, new_reviewed = image_state(change.get('NewImage'))
+
+    for _ in range(MAX_APPLY_ATTEMPTS):
+        stored = dynamodb_client.get_item(
+            TableName=metrics_table,
+            Key={METRICS_KEY: {'S': state_key}},
+            ConsistentRead=True
+        ).get('Item')
+
+        if stored and stored['seq']['S'] >= sequence:
+            return False
+
+        # The last applied state wins over the old image; the old image is
+        # only used for the first record seen for an item
+        if stored:
+            old_present = stored['present']['BOOL']
+            old_reviewed = stored['reviewed']['BOOL']
+        else:
+            old_present, old_reviewed = image_state(change.get('OldImage'))
+
+        total_delta = int(new_present) - int(old_present)
+        reviewed_delta = int(new_present and new_reviewed) - int(old_present and old_reviewed)
+
+        state_item = {
+            METRICS_KEY: {'S': state_key},
+            'seq': {'S': sequence},
+            'present': {'BOOL': new_present},
+            'reviewed': {'BOOL': new_reviewed},
+        }
+        if not new_present:
+            state_item['expires_at'] = {'N': str(int(time.time()) + TOMBSTONE_TTL_SECONDS)}
+
+        put = {'TableName': metrics_table, 'Item': state_item}
+        if stored:
+            put['ConditionExpression'] = '#seq = :expected_seq'
+            put['ExpressionAttributeNames'] = {'#seq': 'seq'}
+            put['ExpressionAttributeValues'] = {':expected_seq': stored['seq']}
+        else:
+            put['ConditionExpression'] = 'attribute_not_exists(#key)'
+            put['ExpressionAttributeNames'] = {'#key': METRICS_KEY}
+
+        transact_items = [{'Put': put}]
+        if total_delta or reviewed_delta:
+            transact_items.append({'Update': {
+                'TableName': metrics_table,
+                'Key': {METRICS_KEY: {'S': table_name}},
+                'UpdateExpression': 'ADD #total :total, #reviewed :reviewed',
+                'ExpressionAttributeNames': {'#total': 'total', '#reviewed': 'reviewed'},
+                'ExpressionAttributeValues': {
+                    ':total': {'N': str(total_delta)},
+                    ':reviewed': {'N': str(reviewed_delta)},
+                },
+            }})
+
+        try:
+            dynamodb_client.transact_write_items(TransactItems=transact_items)
+            return True
+        except dynamodb_client.exceptions.TransactionCanceledException:
+            # Another invocation updated the state record first; re-read it
+            continue
+
+    raise RuntimeError(f"Could not apply stream record {change['SequenceNumber']} for {state_key}")
+
+
+def seed_counters(metrics_table: str, table_name: str, total: int, reviewed: int) -> None:
+    """
+    Initialise a table's counters, e.g. from a GetReviewMetrics scan taken
+    just before the stream consumer is enabled.
+    """
+    dynamodb_client.put_item(
+        TableName=metrics_table,
+        Item={
+            METRICS_KEY: {'S': table_name},
+            'total': {'N': str(total)},
+            'reviewed': {'N': str(reviewed)},
+        }
+    )
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Lambda handler for DynamoDB stream batches.
+
+    Environment Variables:
+        METRICS_TABLE: Name of the table holding counters and item state
+
+    Returns:
+        Partial batch response. Processing stops at the first failing record
+        so that, with ReportBatchItemFailures enabled, the batch is retried
+        from that record and later records are never applied out of order.
+    """
+    metrics_table = os.environ['METRICS_TABLE']
+
+    for record in event.get('Records', []):
+        try:
+            apply_record(record, metrics_table)
+        except Exception as e:
+            sequence = record['dynamodb']['SequenceNumber']
+            print(f"Error applying stream record {sequence}: {str(e)}")
+            return {'batchItemFailures': [{'itemIdentifier': sequence}]}
+
+    return {'batchItemFailures': []}
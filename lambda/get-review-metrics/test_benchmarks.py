@@ -0,0 +1,102 @@
+"""
+Unit tests for the benchmark helpers.
+
+The synthetic table must agree with FakeTable, or the benchmarks would time
+a different workload than the tests cover.
+"""
+
+import unittest
+import sys
+import os
+
+# Add the lambda and benchmark directories to the path
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'benchmarks'))
+
+from index import ScanRateController, aggregate_table_metrics, calculate_metrics
+from fake_dynamodb import FakeTable
+from synthetic import SyntheticTable, generate_items
+from run_benchmarks import MICRO_ITEMS, compare, parse_size, run_handler, summarise_runs
+
+
+class TestSyntheticTable(unittest.TestCase):
+    """Test the generated table against FakeTable."""
+
+    def test_scan_matches_fake_table(self):
+        """Both tables should give the same counts for the same items."""
+        synthetic = SyntheticTable(2500, page_size=300)
+        fake = FakeTable(list(generate_items(2500)), key_name='log_id', page_size=300)
+
+        self.assertEqual(
+            aggregate_table_metrics(synthetic, 'log_id, rev_comment, rev_feedback'),
+            aggregate_table_metrics(fake, 'log_id, rev_comment, rev_feedback'),
+        )
+
+    def test_segments_cover_every_item(self):
+        """Parallel segments should read each item exactly once."""
+        table = SyntheticTable(1001, page_size=64)
+
+        counts = aggregate_table_metrics(table, 'log_id', 7, controller=ScanRateController())
+
+        self.assertEqual(counts, calculate_metrics(generate_items(1001)))
+        self.assertEqual(counts[0], 1001)
+
+    def test_field_mix_is_respected(self):
+        """A mix without content should leave every item pending."""
+        items = list(generate_items(500, field_mix={'missing': 0.5, 'whitespace': 0.5}))
+
+        self.assertEqual(calculate_metrics(items), (500, 0, 500))
+
+    def test_handler_counts_are_verified(self):
+        """The handler case should return the counts of the generated items."""
+        body = run_handler(3000, segments=2, verify=True)
+
+        self.assertEqual(body['totalChatLogs'], 3000)
+
+
+class TestRegressionCheck(unittest.TestCase):
+    """Test the comparison against stored baselines."""
+
+    def setUp(self):
+        self.cases = {
+            'calibration': {'relative': 1.0},
+            'is_reviewed': {'relative': 0.5},
+        }
+
+    def test_within_tolerance_passes(self):
+        baseline = {'tolerance': 0.2, 'cases': {'is_reviewed': {'relative': 0.6}}}
+
+        self.assertEqual(compare(self.cases, baseline), [])
+
+    def test_slowdown_fails(self):
+        baseline = {'tolerance': 0.1, 'cases': {'is_reviewed': {'relative': 0.6}}}
+
+        regressions = compare(self.cases, baseline)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('is_reviewed', regressions[0])
+
+    def test_case_tolerance_overrides_default(self):
+        baseline = {'tolerance': 0.1, 'cases': {'is_reviewed': {'relative': 0.6, 'tolerance': 0.5}}}
+
+        self.assertEqual(compare(self.cases, baseline), [])
+
+    def test_relative_is_median_of_paired_runs(self):
+        """A repetition slowed by a busy neighbour should not move the relative throughput."""
+        calibration = MICRO_ITEMS / 1000.0
+        runs = [(calibration, 2.0), (calibration * 2, 4.0), (calibration, 2.0), (calibration, 20.0), (calibration, 2.0)]
+
+        result = summarise_runs(1000, runs)
+
+        self.assertAlmostEqual(result['relative'], 0.5)
+        self.assertEqual(result['seconds'], 2.0)
+        self.assertEqual(result['itemsPerSecond'], 500.0)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('10k'), 10_000)
+        self.assertEqual(parse_size('1M'), 1_000_000)
+        self.assertEqual(parse_size('2500'), 2500)
+
+
+if __name__ == '__main__':
+    unittest.main()
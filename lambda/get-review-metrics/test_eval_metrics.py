@@ -0,0 +1,157 @@
+"""
+Unit tests for the evaluation job metric summary.
+
+The UnityAIAssistantEvalJob table is replaced by a FakeTable holding jobs
+with Decimal results, as returned by the boto3 resource.
+"""
+
+import bisect
+import unittest
+from unittest.mock import patch
+from decimal import Decimal
+import json
+import sys
+import os
+
+# Add the lambda directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import eval_metrics
+from eval_metrics import aggregate_eval_jobs, collect_scores, summarise_scores, lambda_handler
+from fake_dynamodb import FakeTable
+
+
+def job(job_id, timestamp, **scores):
+    return {
+        'log_id': job_id,
+        'timestamp': timestamp,
+        'prompt_text': 'x' * 200,
+        'results': [
+            {'metricName': f'Builtin.{name}', 'result': Decimal(str(score)), 'explanation': '...'}
+            for name, score in scores.items()
+        ],
+    }
+
+
+# 2024-01-15T00:00:00Z is the end of the current period in these tests
+JOBS = [
+    job('j1', '2024-01-14T10:00:00Z', Correctness=0.9, Helpfulness=0.8),
+    job('j2', '2024-01-10T10:00:00Z', Correctness=0.7, Helpfulness=1.0),
+    job('j3', '2024-01-05T10:00:00Z', Correctness=0.5),
+    job('j4', '2024-01-01T10:00:00Z', Correctness=0.3, Helpfulness=0.3),
+    job('j5', 'unknown', Correctness=0.1),
+]
+
+
+class TestEvalMetrics(unittest.TestCase):
+    """Test per-metric averages, period change and distribution."""
+
+    def summary(self, jobs=JOBS):
+        _, metrics = collect_scores(jobs)
+        end = 1705276800  # 2024-01-15T00:00:00Z
+        return {name: summarise_scores(scores, end, 7 * 86400) for name, scores in metrics.items()}
+
+    def test_averages_and_change(self):
+        """Averages should cover all jobs and the change compare the two periods."""
+        correctness = self.summary()['Builtin.Correctness']
+
+        self.assertEqual(correctness['count'], 5)
+        self.assertAlmostEqual(correctness['average'], 0.5)
+        self.assertAlmostEqual(correctness['currentAverage'], 0.8)
+        self.assertAlmostEqual(correctness['previousAverage'], 0.4)
+        self.assertAlmostEqual(correctness['change'], 0.4)
+
+    def test_change_is_none_without_previous_scores(self):
+        """A metric missing from one period should report no change."""
+        helpfulness = self.summary(JOBS[:2])['Builtin.Helpfulness']
+
+        self.assertAlmostEqual(helpfulness['currentAverage'], 0.9)
+        self.assertIsNone(helpfulness['previousAverage'])
+        self.assertIsNone(helpfulness['change'])
+
+    def test_distribution_matches_dashboard_bins(self):
+        """Scores on a bin edge should fall into the lower bin, like the dashboard."""
+        jobs = [job(f'j{i}', '2024-01-14T00:00:00Z', Correctness=score)
+                for i, score in enumerate([0.0, 0.1, 0.3, 0.35, 1.0, 1.5])]
+        distribution = self.summary(jobs)['Builtin.Correctness']['distribution']
+
+        self.assertEqual(distribution, [2, 0, 1, 1, 0, 0, 0, 0, 0, 1])
+
+    def test_distribution_matches_edge_search(self):
+        """The single-pass bins should agree with a search over the bin edges."""
+        scores = [index / 1000 for index in range(1001)] + list(eval_metrics.SCORE_BIN_EDGES)
+        jobs = [job(f'j{i}', '2024-01-14T00:00:00Z', Correctness=score) for i, score in enumerate(scores)]
+        expected = [0] * 10
+        for score in scores:
+            expected[bisect.bisect_left(eval_metrics.SCORE_BIN_EDGES, score)] += 1
+
+        self.assertEqual(self.summary(jobs)['Builtin.Correctness']['distribution'], expected)
+
+    def test_invalid_results_are_skipped(self):
+        """Results without a name or numeric score should be ignored."""
+        jobs = [{'timestamp': '2024-01-14T00:00:00Z', 'results': [
+            {'metricName': 'Builtin.Correctness'},
+            {'result': Decimal('0.5')},
+            {'metricName': 'Builtin.Correctness', 'result': 'n/a'},
+            {'metricName': 'Builtin.Correctness', 'result': Decimal('0.25')},
+        ]}, {'timestamp': '2024-01-14T00:00:00Z'}]
+
+        job_count, metrics = collect_scores(jobs)
+
+        self.assertEqual(job_count, 2)
+        self.assertEqual(list(metrics['Builtin.Correctness'].scores), [0.25])
+
+    def test_parallel_scan_matches_serial(self):
+        """Segmented scans should produce the same summary as a serial scan."""
+        jobs = [
+            job(f'j{i}', f'2024-01-{1 + i % 14:02d}T00:00:00Z', Correctness=(i % 11) / 10, Helpfulness=(i % 7) / 7)
+            for i in range(500)
+        ]
+        table = FakeTable(jobs, key_name='log_id', page_size=30)
+
+        serial = aggregate_eval_jobs(table)
+        parallel = aggregate_eval_jobs(table, 4)
+
+        self.assertEqual(serial[0], 500)
+        self.assertEqual(parallel[0], 500)
+        for name in serial[1]:
+            self.assertEqual(sorted(serial[1][name].scores), sorted(parallel[1][name].scores))
+        for call in table.scan_calls:
+            self.assertEqual(call['ProjectionExpression'], '#ts, results')
+
+    @patch.dict(os.environ, {'EVAL_JOB_TABLE': 'eval-jobs', 'SCAN_SEGMENTS': '2'})
+    def test_lambda_handler(self):
+        """The handler should return only the summary."""
+        table = FakeTable(JOBS, key_name='log_id', name='eval-jobs')
+        with patch.object(eval_metrics, 'dynamodb') as mock_dynamodb:
+            mock_dynamodb.Table.return_value = table
+            result = lambda_handler({'queryStringParameters': {'end': '2024-01-15T00:00:00Z'}}, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        body = json.loads(result['body'])
+        self.assertEqual(body['totalJobs'], 5)
+        self.assertEqual(body['period'], {'days': 7.0, 'currentStart': '2024-01-08T00:00:00Z', 'end': '2024-01-15T00:00:00Z'})
+        self.assertEqual(sorted(body['metrics']), ['Builtin.Correctness', 'Builtin.Helpfulness'])
+        self.assertAlmostEqual(body['metrics']['Builtin.Helpfulness']['change'], 0.6)
+        # Per result (3 scores) and per job (5 jobs, as on the dashboard)
+        self.assertAlmostEqual(body['metrics']['Builtin.Helpfulness']['average'], 0.7)
+        self.assertAlmostEqual(body['metrics']['Builtin.Helpfulness']['jobAverage'], 0.42)
+        self.assertNotIn('prompt_text', result['body'])
+
+    @patch.dict(os.environ, {'EVAL_JOB_TABLE': 'eval-jobs'})
+    def test_lambda_handler_rejects_bad_period(self):
+        """Invalid periods should return 400."""
+        for params in ({'periodDays': '0'}, {'periodDays': 'week'}, {'end': 'tomorrow'}):
+            self.assertEqual(lambda_handler(params, None)['statusCode'], 400)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_lambda_handler_missing_table(self):
+        """A missing EVAL_JOB_TABLE should be a configuration error."""
+        result = lambda_handler({}, None)
+
+        self.assertEqual(result['statusCode'], 500)
+        self.assertEqual(json.loads(result['body'])['error'], 'Configuration error')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,15 +6,55 @@ requiring actual DynamoDB tables.
 """
 
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, PropertyMock
+from decimal import Decimal
+import base64
 import json
 import sys
 import os
+import itertools
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
 
 # Add the lambda directory to the path
 sys.path.insert(0, os.path.dirname(__file__))
+# Continuation tokens are signed with this key; the handler refuses to run without one
+os.environ.setdefault('CONTINUATION_TOKEN_SECRET', 'test-secret')
 
-from index import is_reviewed, calculate_metrics, scan_table_with_pagination, lambda_handler
+from index import (
+    is_reviewed,
+    is_reviewed_raw,
+    count_reviewed,
+    calculate_metrics,
+    scan_table_with_pagination,
+    choose_segment_count,
+    aggregate_table_metrics,
+    iter_table_pages,
+    count_review_metrics,
+    cached_table_metrics,
+    clear_metrics_cache,
+    carrier_review_metrics,
+    discover_carriers,
+    time_window,
+    bucket_review_metrics,
+    cached_time_bucket_metrics,
+    decode_issue_tags,
+    issue_tag_statistics,
+    TagStatistics,
+    encode_continuation_token,
+    decode_continuation_token,
+    ScanInterrupted,
+    ScanRateController,
+    CapacityBudgetExceeded,
+    ClientTable,
+    lambda_handler,
+)
+from botocore.exceptions import ClientError
+import index
+from fake_dynamodb import FakeTable
 
 
 class TestIsReviewed(unittest.TestCase):
@@ -102,6 +142,26 @@ class TestCalculateMetrics(unittest.TestCase):
         self.assertEqual(total, 4)
         self.assertEqual(reviewed, 2)
         self.assertEqual(pending, 2)
+    
+    def test_generator_is_classified_in_batches(self):
+        """A generator longer than one batch should be counted in full."""
+        items = ({'rev_comment': 'ok' if i % 3 == 0 else ' \u3000'} for i in range(2500))
+        
+        self.assertEqual(calculate_metrics(items), (2500, 834, 1666))
+    
+    def test_count_reviewed_large_and_unusual_values(self):
+        """count_reviewed should agree with is_reviewed on every value kind."""
+        items = [
+            {'rev_comment': 'x' * 8192},
+            {'rev_comment': ' ' * 8192 + 'x'},
+            {'rev_comment': '\n' * 8192, 'rev_feedback': '\u2003'},
+            {'rev_comment': Decimal('0'), 'rev_feedback': True},
+            {'rev_comment': False},
+            {'rev_feedback': None},
+        ]
+        
+        self.assertEqual(count_reviewed(items), sum(map(is_reviewed, items)))
+        self.assertEqual(count_reviewed(items), 3)
 
 
 class TestScanTableWithPagination(unittest.TestCase):
@@ -144,9 +204,1974 @@ class TestScanTableWithPagination(unittest.TestCase):
         self.assertEqual(mock_table.scan.call_count, 3)
 
 
+class TestParallelScan(unittest.TestCase):
+    """Test the parallel segmented scan path."""
+    
+    def setUp(self):
+        items = [
+            {'log_id': f'log-{i}', 'rev_comment': 'ok' if i % 3 == 0 else '', 'rev_feedback': ''}
+            for i in range(250)
+        ]
+        self.table = FakeTable(items, key_name='log_id', page_size=20)
+    
+    def test_parallel_matches_serial(self):
+        """Every segment count should return exactly the serial scan items."""
+        projection = 'log_id, rev_comment, rev_feedback'
+        serial = scan_table_with_pagination(self.table, projection)
+        
+        for segments in (2, 3, 8):
+            parallel = scan_table_with_pagination(self.table, projection, segments)
+            self.assertEqual(parallel, serial)
+            self.assertEqual(calculate_metrics(parallel), calculate_metrics(serial))
+    
+    def test_segments_passed_to_scan(self):
+        """Each scan call should carry its Segment and TotalSegments."""
+        scan_table_with_pagination(self.table, 'log_id', 4)
+        
+        segments = {call['Segment'] for call in self.table.scan_calls}
+        self.assertEqual(segments, {0, 1, 2, 3})
+        self.assertTrue(all(call['TotalSegments'] == 4 for call in self.table.scan_calls))
+    
+    @patch.dict(os.environ, {'SCAN_SEGMENTS': '6'})
+    def test_segment_count_from_environment(self):
+        """SCAN_SEGMENTS should override the size-based choice."""
+        self.assertEqual(choose_segment_count(self.table), 6)
+    
+    @patch('index.SCAN_SEGMENT_TARGET_BYTES', 1000)
+    @patch('index.MAX_SCAN_SEGMENTS', 8)
+    def test_segment_count_from_table_size(self):
+        """Segment count should grow with table size up to the cap."""
+        table = Mock(table_size_bytes=2500)
+        self.assertEqual(choose_segment_count(table), 3)
+        
+        table = Mock(table_size_bytes=10 ** 9)
+        self.assertEqual(choose_segment_count(table), 8)
+    
+    def test_segment_count_unknown_size(self):
+        """Tables without a usable size should be scanned serially."""
+        self.assertEqual(choose_segment_count(Mock()), 1)
+
+
+class TestClientTable(unittest.TestCase):
+    """Test the table handle on the thread-safe low-level client."""
+    
+    def test_scan_serializes_request_and_deserializes_items(self):
+        """Conditions, keys and values should be converted to and from wire format."""
+        client = Mock()
+        client.scan.return_value = {
+            'Items': [{'log_id': {'S': 'a'}, 'score': {'N': '2'}}],
+            'LastEvaluatedKey': {'log_id': {'S': 'a'}},
+            'Count': 1,
+            'ScannedCount': 3,
+        }
+        table = ClientTable('logs', client)
+        
+        response = table.scan(
+            ProjectionExpression='log_id, #s',
+            ExpressionAttributeNames={'#s': 'score'},
+            FilterExpression=index.Attr('score').gt(1),
+            ExclusiveStartKey={'log_id': 'z'}
+        )
+        
+        request = client.scan.call_args.kwargs
+        self.assertEqual(request['TableName'], 'logs')
+        self.assertEqual(request['ExclusiveStartKey'], {'log_id': {'S': 'z'}})
+        self.assertEqual(request['FilterExpression'], '#n0 > :v0')
+        self.assertEqual(request['ExpressionAttributeNames'], {'#s': 'score', '#n0': 'score'})
+        self.assertEqual(request['ExpressionAttributeValues'], {':v0': {'N': '1'}})
+        self.assertEqual(response['Items'], [{'log_id': 'a', 'score': Decimal('2')}])
+        self.assertEqual(response['LastEvaluatedKey'], {'log_id': 'a'})
+        self.assertEqual(response['ScannedCount'], 3)
+    
+    def test_item_operations_and_table_size(self):
+        """get_item, put_item and table_size_bytes should go through the client."""
+        client = Mock()
+        client.get_item.return_value = {'Item': {'total': {'N': '5'}}}
+        client.put_item.return_value = {}
+        client.describe_table.return_value = {'Table': {'TableSizeBytes': 1024}}
+        table = ClientTable('metrics', client)
+        
+        self.assertEqual(table.get_item(Key={'metric_key': 'logs'})['Item'], {'total': Decimal('5')})
+        table.put_item(Item={'metric_key': 'logs', 'total': 5})
+        
+        self.assertEqual(client.get_item.call_args.kwargs['Key'], {'metric_key': {'S': 'logs'}})
+        self.assertEqual(client.put_item.call_args.kwargs['Item'], {'metric_key': {'S': 'logs'}, 'total': {'N': '5'}})
+        self.assertEqual(table.table_size_bytes, 1024)
+    
+    def test_scan_raw_keeps_items_in_wire_format(self):
+        """scan_raw should only convert the key used to resume the scan."""
+        client = Mock()
+        client.scan.return_value = {
+            'Items': [{'log_id': {'S': 'a'}, 'rev_comment': {'S': ' '}}],
+            'LastEvaluatedKey': {'log_id': {'S': 'a'}},
+        }
+        
+        response = ClientTable('logs', client).scan_raw(ExclusiveStartKey={'log_id': 'z'})
+        
+        self.assertEqual(client.scan.call_args.kwargs['ExclusiveStartKey'], {'log_id': {'S': 'z'}})
+        self.assertEqual(response['Items'], [{'log_id': {'S': 'a'}, 'rev_comment': {'S': ' '}}])
+        self.assertEqual(response['LastEvaluatedKey'], {'log_id': 'a'})
+    
+    def test_aggregation_classifies_raw_pages(self):
+        """aggregate_table_metrics on a ClientTable should count wire-format items."""
+        client = Mock()
+        client.scan.side_effect = [
+            {
+                'Items': [
+                    {'log_id': {'S': 'a'}, 'rev_comment': {'S': 'Looks good'}},
+                    {'log_id': {'S': 'b'}, 'rev_comment': {'S': '  '}, 'rev_feedback': {'NULL': True}},
+                ],
+                'LastEvaluatedKey': {'log_id': {'S': 'b'}},
+            },
+            {'Items': [{'log_id': {'S': 'c'}, 'rev_feedback': {'N': '1'}}, {'log_id': {'S': 'd'}}]},
+        ]
+        
+        counts = aggregate_table_metrics(ClientTable('logs', client), 'log_id, rev_comment, rev_feedback')
+        
+        self.assertEqual(counts, (4, 2, 2))
+        self.assertEqual(client.scan.call_args.kwargs['ExclusiveStartKey'], {'log_id': {'S': 'b'}})
+    
+    def test_is_reviewed_raw(self):
+        """Wire-format values should be classified like their Python values."""
+        self.assertTrue(is_reviewed_raw({'rev_comment': {'S': ' x '}}))
+        self.assertTrue(is_reviewed_raw({'rev_feedback': {'BOOL': True}}))
+        self.assertFalse(is_reviewed_raw({'rev_comment': {'S': '\t\n'}, 'rev_feedback': {'S': ''}}))
+        self.assertFalse(is_reviewed_raw({'rev_comment': {'N': '0'}, 'rev_feedback': {'BOOL': False}}))
+        self.assertFalse(is_reviewed_raw({'log_id': {'S': 'a'}}))
+
+
+class TestColdStart(unittest.TestCase):
+    """Test lazy client creation and warm-up events."""
+    
+    @patch('index.boto3.client')
+    def test_client_is_created_on_first_use(self, mock_client):
+        """The client should be created once, when a table is first needed."""
+        tables = index.ClientTables(index.create_dynamodb_client)
+        self.assertFalse(mock_client.called)
+        
+        threads = [threading.Thread(target=tables.Table, args=('logs',)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(mock_client.call_count, 1)
+        config = mock_client.call_args.kwargs['config']
+        self.assertEqual(config.connect_timeout, index.DYNAMODB_CONNECT_TIMEOUT)
+        self.assertEqual(config.read_timeout, index.DYNAMODB_READ_TIMEOUT)
+        self.assertEqual(config.max_pool_connections, 2 * index.MAX_SCAN_SEGMENTS)
+    
+    @patch.dict(os.environ, {'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'})
+    @patch('index.WARMUP_CONNECTIONS', 4)
+    def test_warmup_event_opens_connections_without_reading(self):
+        """A warm-up event should only describe the tables, concurrently."""
+        client = Mock()
+        client.describe_table.return_value = {'Table': {}}
+        
+        with patch('index.dynamodb', index.ClientTables(lambda: client)):
+            result = lambda_handler({'warmup': True}, None)
+        
+        body = json.loads(result['body'])
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(body['connections'], 4)
+        self.assertEqual(
+            Counter(call.kwargs['TableName'] for call in client.describe_table.call_args_list),
+            {'chat': 2, 'feedback': 2}
+        )
+        self.assertFalse(client.scan.called)
+
+
+class TestStreamingAggregation(unittest.TestCase):
+    """Test the page-at-a-time aggregation path."""
+    
+    @staticmethod
+    def _table(count):
+        items = [
+            {
+                'log_id': f'log-{i}',
+                'rev_comment': ('Reviewed ' * 50) if i % 4 == 0 else '  ',
+                'rev_feedback': '',
+            }
+            for i in range(count)
+        ]
+        return FakeTable(items, key_name='log_id', page_size=50)
+    
+    def test_calculate_metrics_accepts_generator(self):
+        """calculate_metrics should give the same result for a generator."""
+        items = [{'rev_comment': 'a'}, {}, {'rev_feedback': ' b '}]
+        self.assertEqual(calculate_metrics(iter(items)), calculate_metrics(items))
+    
+    def test_pages_are_fetched_lazily(self):
+        """No Scan request should be issued before its page is consumed."""
+        table = self._table(200)
+        pages = iter_table_pages(table, 'log_id')
+        
+        self.assertEqual(len(table.scan_calls), 0)
+        next(pages)
+        self.assertEqual(len(table.scan_calls), 1)
+    
+    def test_matches_materialised_metrics(self):
+        """Streaming counts should equal the list-based calculation."""
+        table = self._table(500)
+        projection = 'log_id, rev_comment, rev_feedback'
+        expected = calculate_metrics(scan_table_with_pagination(table, projection))
+        
+        self.assertEqual(aggregate_table_metrics(table, projection), expected)
+        self.assertEqual(aggregate_table_metrics(table, projection, 4), expected)
+    
+    def test_peak_memory_independent_of_table_size(self):
+        """Streaming peak memory should be a small fraction of the materialised scan."""
+        projection = 'log_id, rev_comment, rev_feedback'
+        table = self._table(10000)
+        
+        def peak(function):
+            table.scan_calls.clear()
+            tracemalloc.start()
+            function()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak_bytes
+        
+        materialised = peak(lambda: calculate_metrics(scan_table_with_pagination(table, projection)))
+        streamed = peak(lambda: aggregate_table_metrics(table, projection))
+        
+        self.assertLess(streamed, materialised / 10)
+
+
+class TestCountMode(unittest.TestCase):
+    """Test the Select='COUNT' server-side counting mode."""
+    
+    REVIEW_VALUES = [
+        'Reviewed', '  leading space', '\u3000', '\u00a0content', '\u4e2d\u6587',
+        '\t\n', '', None, Decimal('0'), Decimal('3'), True, False, [], ['tag'],
+    ]
+    
+    def setUp(self):
+        clear_metrics_cache()
+        items = []
+        for i, comment in enumerate(self.REVIEW_VALUES):
+            for j, feedback in enumerate(self.REVIEW_VALUES):
+                item = {'log_id': f'log-{i}-{j}'}
+                if comment is not None:
+                    item['rev_comment'] = comment
+                if feedback is not None:
+                    item['rev_feedback'] = feedback
+                items.append(item)
+        self.items = items
+        self.table = FakeTable(items, key_name='log_id', page_size=25)
+    
+    def test_counts_match_calculate_metrics(self):
+        """Server-side counts should equal the client-side calculation."""
+        expected = calculate_metrics(self.items)
+        
+        self.assertEqual(count_review_metrics(self.table), expected)
+        self.assertEqual(count_review_metrics(self.table, total_segments=4), expected)
+    
+    def test_count_pass_returns_no_items(self):
+        """Only possibly whitespace-only items should be transferred."""
+        items = []
+        for i in range(1000):
+            item = {'log_id': f'log-{i}', 'rev_comment': '', 'rev_feedback': ''}
+            if i % 3 == 0:
+                item['rev_comment'] = 'Looks correct ' * 20
+            elif i % 50 == 1:
+                item['rev_feedback'] = '   '
+            items.append(item)
+        table = FakeTable(items, key_name='log_id', page_size=100)
+        
+        responses = []
+        
+        def recording_scan(**kwargs):
+            response = FakeTable.scan(table, **kwargs)
+            responses.append((kwargs, response))
+            return response
+        
+        table.scan = recording_scan
+        self.assertEqual(count_review_metrics(table), calculate_metrics(items))
+        
+        count_responses = [r for kwargs, r in responses if kwargs.get('Select') == 'COUNT']
+        item_responses = [r for kwargs, r in responses if kwargs.get('Select') != 'COUNT']
+        self.assertTrue(count_responses)
+        self.assertTrue(all('Items' not in r for r in count_responses))
+        
+        transferred = [item for r in item_responses for item in r['Items']]
+        whitespace_only = [item for item in items if item['rev_feedback'] and not item['rev_comment']]
+        self.assertEqual(len(transferred), len(whitespace_only))
+        self.assertTrue(all(item == {'rev_comment': '', 'rev_feedback': '   '} for item in transferred))
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_count_mode(self, mock_dynamodb):
+        """mode=count in the query string should select server-side counting."""
+        feedback_table = FakeTable([], key_name='id')
+        mock_dynamodb.Table.side_effect = [self.table, feedback_table]
+        
+        result = lambda_handler({'queryStringParameters': {'mode': 'count'}}, None)
+        
+        body = json.loads(result['body'])
+        total, reviewed, pending = calculate_metrics(self.items)
+        self.assertEqual(body['mode'], 'count')
+        self.assertEqual(body['totalChatLogs'], total)
+        self.assertEqual(body['reviewedChatLogs'], reviewed)
+        self.assertEqual(body['pendingChatLogs'], pending)
+        self.assertTrue(any(call.get('Select') == 'COUNT' for call in self.table.scan_calls))
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_rejects_unknown_mode(self, mock_dynamodb):
+        """Unknown modes should be rejected without scanning."""
+        result = lambda_handler({'mode': 'guess'}, None)
+        
+        self.assertEqual(result['statusCode'], 400)
+        mock_dynamodb.Table.assert_not_called()
+
+
+class TestMetricsCache(unittest.TestCase):
+    """Test the warm-container result cache."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        self.items = [{'log_id': 'a', 'rev_comment': 'ok'}, {'log_id': 'b'}]
+        self.table = FakeTable(self.items, key_name='log_id', name='cache-test')
+        self.projection = 'log_id, rev_comment, rev_feedback'
+    
+    def test_hit_within_ttl(self):
+        """A second call within the TTL should not scan again."""
+        counts, info = cached_table_metrics(self.table, self.projection, 'scan')
+        self.assertEqual(info['status'], 'miss')
+        scans = len(self.table.scan_calls)
+        
+        cached_counts, info = cached_table_metrics(self.table, self.projection, 'scan')
+        self.assertEqual(info['status'], 'hit')
+        self.assertEqual(cached_counts, counts)
+        self.assertEqual(len(self.table.scan_calls), scans)
+    
+    def test_key_includes_mode(self):
+        """Different modes should not share cache entries."""
+        cached_table_metrics(self.table, self.projection, 'scan')
+        _, info = cached_table_metrics(self.table, self.projection, 'count')
+        self.assertEqual(info['status'], 'miss')
+    
+    def test_bypass_recomputes(self):
+        """bypass_cache should always scan and refresh the entry."""
+        cached_table_metrics(self.table, self.projection, 'scan')
+        scans = len(self.table.scan_calls)
+        
+        _, info = cached_table_metrics(self.table, self.projection, 'scan', bypass_cache=True)
+        self.assertEqual(info['status'], 'bypass')
+        self.assertGreater(len(self.table.scan_calls), scans)
+    
+    @patch('index.METRICS_CACHE_STALE_SECONDS', 60)
+    @patch('index.METRICS_CACHE_TTL_SECONDS', 10)
+    def test_stale_served_while_refreshing(self):
+        """An expired entry should be served stale while one refresh runs."""
+        with patch('index.time.time', return_value=1000.0):
+            cached_table_metrics(self.table, self.projection, 'scan')
+        scans = len(self.table.scan_calls)
+        
+        with patch('index.threading.Thread') as mock_thread:
+            with patch('index.time.time', return_value=1020.0):
+                counts, info = cached_table_metrics(self.table, self.projection, 'scan')
+                cached_table_metrics(self.table, self.projection, 'scan')
+        
+        self.assertEqual(info, {'status': 'stale', 'ageSeconds': 20.0})
+        self.assertEqual(counts, (2, 1, 1))
+        self.assertEqual(len(self.table.scan_calls), scans)
+        mock_thread.assert_called_once()
+        
+        # Run the refresh the handler would have started
+        target, args = mock_thread.call_args.kwargs['target'], mock_thread.call_args.kwargs['args']
+        target(*args)
+        self.assertGreater(len(self.table.scan_calls), scans)
+        _, info = cached_table_metrics(self.table, self.projection, 'scan')
+        self.assertEqual(info['status'], 'hit')
+    
+    @patch('index.METRICS_CACHE_STALE_SECONDS', 60)
+    @patch('index.METRICS_CACHE_TTL_SECONDS', 10)
+    def test_expired_beyond_stale_window(self):
+        """Entries older than TTL plus the stale window should be recomputed."""
+        with patch('index.time.time', return_value=1000.0):
+            cached_table_metrics(self.table, self.projection, 'scan')
+        with patch('index.time.time', return_value=1100.0):
+            _, info = cached_table_metrics(self.table, self.projection, 'scan')
+        self.assertEqual(info['status'], 'miss')
+    
+    @patch('index.METRICS_CACHE_MAX_ENTRIES', 2)
+    def test_least_recently_used_entry_is_evicted(self):
+        """The cache should hold at most METRICS_CACHE_MAX_ENTRIES, dropping the LRU entry."""
+        for mode in ('scan', 'count'):
+            cached_table_metrics(self.table, self.projection, mode)
+        cached_table_metrics(self.table, self.projection, 'scan')
+        cached_table_metrics(self.table, 'log_id, rev_comment', 'scan')
+        
+        self.assertEqual(len(index._metrics_cache), 2)
+        self.assertEqual(cached_table_metrics(self.table, self.projection, 'scan')[1]['status'], 'hit')
+        self.assertEqual(cached_table_metrics(self.table, self.projection, 'count')[1]['status'], 'miss')
+    
+    @patch('index.METRICS_CACHE_STALE_SECONDS', 60)
+    @patch('index.METRICS_CACHE_TTL_SECONDS', 10)
+    def test_expired_entries_are_dropped_on_store(self):
+        """Storing a result should remove entries past their stale window."""
+        with patch('index.time.time', return_value=1000.0):
+            cached_table_metrics(self.table, self.projection, 'scan')
+        with patch('index.time.time', return_value=1100.0):
+            cached_table_metrics(self.table, self.projection, 'count')
+        
+        self.assertEqual([key[2] for key in index._metrics_cache], ['count'])
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_reports_cache_status(self, mock_dynamodb):
+        """The response should expose cache status and honour bypassCache."""
+        chat_table = FakeTable(self.items, key_name='log_id', name='test-chat-logs')
+        feedback_table = FakeTable([], key_name='id', name='test-feedback')
+        mock_dynamodb.Table.side_effect = lambda name: {
+            'test-chat-logs': chat_table, 'test-feedback': feedback_table
+        }[name]
+        
+        first = json.loads(lambda_handler({}, None)['body'])
+        second = json.loads(lambda_handler({}, None)['body'])
+        bypassed = json.loads(lambda_handler({'queryStringParameters': {'bypassCache': 'true'}}, None)['body'])
+        
+        self.assertEqual(first['cache']['chatLogs']['status'], 'miss')
+        self.assertEqual(second['cache']['chatLogs']['status'], 'hit')
+        self.assertEqual(second['cache']['feedbackLogs']['status'], 'hit')
+        self.assertIn('ageSeconds', second['cache']['chatLogs'])
+        self.assertEqual(bypassed['cache']['chatLogs']['status'], 'bypass')
+        self.assertEqual(second['totalChatLogs'], first['totalChatLogs'])
+
+
+class StopAfter:
+    """should_stop stand-in that asks to stop after a number of pages."""
+    
+    def __init__(self, pages):
+        self.remaining = pages
+    
+    def __call__(self):
+        self.remaining -= 1
+        return self.remaining < 0
+
+
+class TestResumableScan(unittest.TestCase):
+    """Test deadline-aware scans and continuation tokens."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        self.items = [
+            {'log_id': f'log-{i}', 'rev_comment': 'ok' if i % 5 == 0 else '', 'rev_feedback': ''}
+            for i in range(300)
+        ]
+        self.table = FakeTable(self.items, key_name='log_id', page_size=20, name='test-chat-logs')
+        self.projection = 'log_id, rev_comment, rev_feedback'
+    
+    def test_interrupted_scan_resumes_to_full_counts(self):
+        """Repeatedly resuming an interrupted scan should give the full counts."""
+        for segments in (1, 3):
+            state = None
+            rounds = 0
+            while True:
+                rounds += 1
+                try:
+                    counts = aggregate_table_metrics(
+                        self.table, self.projection, segments, StopAfter(2), state
+                    )
+                    break
+                except ScanInterrupted as e:
+                    self.assertLess(e.counts[0], len(self.items))
+                    state = e.state
+            
+            self.assertGreater(rounds, 1)
+            self.assertEqual(counts, calculate_metrics(self.items))
+    
+    def test_token_round_trip(self):
+        """Tokens should preserve counts and string or numeric start keys."""
+        states = {
+            'chatLogs': {'segments': 4, 'pending': {1: {'log_id': 'log-7'}, 3: {'n': Decimal('12')}}, 'counts': [5, 2, 3]},
+            'feedbackLogs': {'segments': 1, 'pending': {}, 'counts': [9, 9, 0]},
+        }
+        
+        mode, decoded = decode_continuation_token(encode_continuation_token('scan', states))
+        
+        self.assertEqual(mode, 'scan')
+        self.assertEqual(decoded, states)
+    
+    def test_malformed_token(self):
+        """Malformed tokens should raise ValueError."""
+        with self.assertRaises(ValueError):
+            decode_continuation_token('not-a-token')
+    
+    def test_tampered_or_out_of_range_token(self):
+        """Altered payloads and out-of-range segments should be rejected."""
+        states = {'chatLogs': {'segments': 2, 'pending': {1: {'log_id': 'log-7'}}, 'counts': [5, 2, 3]}}
+        payload, signature = encode_continuation_token('scan', states).split('.')
+        forged = json.loads(base64.urlsafe_b64decode(payload))
+        forged['tables']['chatLogs']['counts'] = [10 ** 9, 10 ** 9, 0]
+        forged_payload = base64.urlsafe_b64encode(json.dumps(forged).encode('utf-8')).decode('ascii')
+        with self.assertRaises(ValueError):
+            decode_continuation_token(f'{forged_payload}.{signature}')
+        
+        for state in (
+            {'segments': 10 ** 6, 'pending': {}, 'counts': [0, 0, 0]},
+            {'segments': 2, 'pending': {5: None}, 'counts': [0, 0, 0]},
+            {'segments': 2, 'pending': {}, 'counts': [5, 9, 0]},
+        ):
+            with self.assertRaises(ValueError):
+                decode_continuation_token(encode_continuation_token('scan', {'chatLogs': state}))
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_returns_token_and_resumes(self, mock_dynamodb):
+        """A near-deadline invocation should return a token that a follow-up completes."""
+        feedback_items = [{'id': 'f1', 'rev_comment': 'ok'}, {'id': 'f2'}]
+        feedback_table = FakeTable(feedback_items, key_name='id', name='test-feedback')
+        mock_dynamodb.Table.side_effect = lambda name: {
+            'test-chat-logs': self.table, 'test-feedback': feedback_table
+        }[name]
+        
+        context = Mock()
+        context.get_remaining_time_in_millis.side_effect = [10000] * 3 + [1000] * 1000
+        
+        first = json.loads(lambda_handler({}, context)['body'])
+        self.assertTrue(first['partial'])
+        self.assertLess(first['totalChatLogs'], len(self.items))
+        self.assertEqual(first['totalFeedbackLogs'], 2)
+        
+        second = json.loads(lambda_handler({'continuationToken': first['continuationToken']}, None)['body'])
+        self.assertNotIn('partial', second)
+        self.assertEqual(second['cache']['chatLogs']['status'], 'resumed')
+        expected = calculate_metrics(self.items)
+        self.assertEqual(
+            (second['totalChatLogs'], second['reviewedChatLogs'], second['pendingChatLogs']),
+            expected
+        )
+        self.assertEqual(second['totalFeedbackLogs'], 2)
+        
+        # Results built on a client token are not cached
+        self.assertFalse(any(key[0] == 'test-chat-logs' for key in index._metrics_cache))
+    
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_rejects_bad_token(self):
+        """An invalid continuation token should be a client error."""
+        result = lambda_handler({'continuationToken': '!!!'}, None)
+        self.assertEqual(result['statusCode'], 400)
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback',
+        'METRICS_TABLE': 'metrics'
+    })
+    def test_checkpoint_persisted_and_cleared(self, mock_dynamodb):
+        """persistCheckpoint should save progress and resumeCheckpoint should finish and delete it."""
+        feedback_table = FakeTable([], key_name='id', name='test-feedback')
+        checkpoints = {}
+        metrics_table = Mock()
+        metrics_table.put_item.side_effect = lambda Item: checkpoints.update({Item['metric_key']: Item})
+        metrics_table.get_item.side_effect = lambda Key: (
+            {'Item': checkpoints[Key['metric_key']]} if Key['metric_key'] in checkpoints else {}
+        )
+        metrics_table.delete_item.side_effect = lambda Key: checkpoints.pop(Key['metric_key'])
+        mock_dynamodb.Table.side_effect = lambda name: {
+            'test-chat-logs': self.table, 'test-feedback': feedback_table, 'metrics': metrics_table
+        }[name]
+        
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 1000
+        first = json.loads(lambda_handler({'persistCheckpoint': 'true'}, context)['body'])
+        self.assertTrue(first['partial'])
+        self.assertEqual(len(checkpoints), 1)
+        
+        finished = json.loads(lambda_handler({'resumeCheckpoint': True}, None)['body'])
+        self.assertEqual(finished['totalChatLogs'], len(self.items))
+        self.assertEqual(checkpoints, {})
+
+
+class TestCarrierMode(unittest.TestCase):
+    """Test per-carrier metrics from the carrier GSIs."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        carriers = ['att', 'tmobile', 'verizon']
+        self.items = [
+            {
+                'log_id': f'log-{i}',
+                'carrier_name': carriers[i % 3],
+                'timestamp': f'2024-01-01T00:{i % 60:02d}:00Z',
+                'rev_comment': 'ok' if i % 4 == 0 else '',
+                'rev_feedback': '',
+            }
+            for i in range(90)
+        ]
+        # Items without a carrier are not in the index
+        self.items.append({'log_id': 'log-none', 'timestamp': '2024-01-01T00:00:00Z', 'rev_comment': 'ok'})
+        self.table = FakeTable(
+            self.items,
+            key_name='log_id',
+            page_size=7,
+            name='test-chat-logs',
+            indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+    
+    def expected(self, carrier):
+        return calculate_metrics(item for item in self.items if item.get('carrier_name') == carrier)
+    
+    def test_breakdown_matches_client_side_grouping(self):
+        """Per-carrier counts should match grouping a full scan by carrier."""
+        breakdown = carrier_review_metrics(self.table, 'byCarrierName', 'carrier_name')
+        
+        self.assertEqual(sorted(breakdown), ['att', 'tmobile', 'verizon'])
+        for carrier, counts in breakdown.items():
+            self.assertEqual(counts, self.expected(carrier))
+    
+    def test_discovery_projects_only_the_carrier(self):
+        """Carrier discovery should scan the index keys only."""
+        self.assertEqual(
+            discover_carriers(self.table, 'byCarrierName', 'carrier_name'),
+            ['att', 'tmobile', 'verizon']
+        )
+        for call in self.table.scan_calls:
+            self.assertEqual(call['IndexName'], 'byCarrierName')
+            self.assertEqual(call['ProjectionExpression'], 'carrier_name')
+    
+    def test_single_carrier_is_one_partition_query(self):
+        """A single requested carrier should only query its partition, never scan."""
+        breakdown = carrier_review_metrics(self.table, 'byCarrierName', 'carrier_name', ['verizon'])
+        
+        self.assertEqual(breakdown, {'verizon': self.expected('verizon')})
+        self.assertEqual(self.table.scan_calls, [])
+        for call in self.table.query_calls:
+            self.assertEqual(call['IndexName'], 'byCarrierName')
+            self.assertEqual(call['ProjectionExpression'], 'rev_comment, rev_feedback')
+    
+    def test_unknown_carrier_has_zero_counts(self):
+        """A carrier without items should report zeros."""
+        breakdown = carrier_review_metrics(self.table, 'byCarrierName', 'carrier_name', ['sprint'])
+        self.assertEqual(breakdown, {'sprint': (0, 0, 0)})
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_carrier_mode(self, mock_dynamodb):
+        """mode=carrier should return totals and a breakdown for the requested carriers."""
+        feedback_items = [
+            {'id': 'f1', 'carrier': 'att', 'datetime': '2024-01-01', 'rev_comment': 'ok'},
+            {'id': 'f2', 'carrier': 'verizon', 'datetime': '2024-01-02'},
+        ]
+        feedback_table = FakeTable(
+            feedback_items, key_name='id', name='test-feedback',
+            indexes={'byCarrier': ('carrier', 'datetime')}
+        )
+        mock_dynamodb.Table.side_effect = lambda name: {
+            'test-chat-logs': self.table, 'test-feedback': feedback_table
+        }[name]
+        
+        event = {'queryStringParameters': {'mode': 'carrier', 'carriers': 'att, verizon'}}
+        result = lambda_handler(event, None)
+        
+        self.assertEqual(result['statusCode'], 200)
+        body = json.loads(result['body'])
+        self.assertEqual(body['mode'], 'carrier')
+        att, verizon = self.expected('att'), self.expected('verizon')
+        self.assertEqual(
+            body['carriers']['chatLogs']['att'],
+            {'total': att[0], 'reviewed': att[1], 'pending': att[2]}
+        )
+        self.assertEqual(body['totalChatLogs'], att[0] + verizon[0])
+        self.assertEqual(body['reviewedChatLogs'], att[1] + verizon[1])
+        self.assertEqual(
+            body['carriers']['feedbackLogs'],
+            {
+                'att': {'total': 1, 'reviewed': 1, 'pending': 0},
+                'verizon': {'total': 1, 'reviewed': 0, 'pending': 1},
+            }
+        )
+        self.assertEqual(self.table.scan_calls, [])
+        self.assertEqual(feedback_table.scan_calls, [])
+
+
+class TestTimeSeriesMode(unittest.TestCase):
+    """Test time-bucketed metrics over the GSI sort keys."""
+    
+    # 2024-01-01T00:00:00Z
+    DAY = 1704067200
+    
+    def setUp(self):
+        clear_metrics_cache()
+        self.items = [
+            {
+                'log_id': f'log-{i}',
+                'carrier_name': 'att' if i % 2 else 'verizon',
+                'timestamp': f'2024-01-01T{i % 24:02d}:{i % 60:02d}:00.{i % 1000:03d}Z',
+                'rev_comment': 'ok' if i % 3 == 0 else '',
+            }
+            for i in range(200)
+        ]
+        self.table = FakeTable(
+            self.items,
+            key_name='log_id',
+            page_size=25,
+            name='test-chat-logs',
+            indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+    
+    def expected(self, hour, carriers=None):
+        return calculate_metrics(
+            item for item in self.items
+            if item['timestamp'].startswith(f'2024-01-01T{hour:02d}:')
+            and (carriers is None or item['carrier_name'] in carriers)
+        )
+    
+    def test_time_window_alignment(self):
+        """Windows should be rounded out to whole buckets."""
+        self.assertEqual(
+            time_window('hour', '2024-01-01T01:30:00Z', '2024-01-01T03:10:00Z'),
+            (3600, self.DAY + 3600, self.DAY + 4 * 3600)
+        )
+        self.assertEqual(time_window('day', now=self.DAY + 10), (86400, self.DAY - 29 * 86400, self.DAY + 86400))
+        for args in (('week',), ('hour', 'yesterday'), ('hour', '2024-01-02T00:00:00Z', '2024-01-01T00:00:00Z')):
+            with self.assertRaises(ValueError):
+                time_window(*args)
+    
+    def test_bucket_review_metrics_single_pass(self):
+        """Items should be counted in their bucket; outside items skipped."""
+        buckets = bucket_review_metrics(
+            iter(self.items), 'timestamp', 3600, self.DAY + 2 * 3600, self.DAY + 4 * 3600
+        )
+        self.assertEqual(buckets, {
+            self.DAY + 2 * 3600: self.expected(2),
+            self.DAY + 3 * 3600: self.expected(3),
+        })
+    
+    def test_query_and_scan_paths_agree(self):
+        """Range Queries per carrier and the filtered scan should give the same buckets."""
+        window = (3600, self.DAY, self.DAY + 24 * 3600)
+        scanned, _ = cached_time_bucket_metrics(self.table, 'timestamp', *window, now=0)
+        queried, _ = cached_time_bucket_metrics(
+            self.table, 'timestamp', *window, 'byCarrierName', 'carrier_name', ['att', 'verizon'], now=0
+        )
+        
+        self.assertEqual(scanned, queried)
+        self.assertEqual(len(scanned), 24)
+        for hour in range(24):
+            self.assertEqual(scanned[self.DAY + hour * 3600], self.expected(hour))
+        
+        # Two carriers of 100 items, 25 per page; the Queries carry the window
+        # as a sort key condition
+        self.assertEqual(len(self.table.query_calls), 2 * 4)
+        self.assertIn('KeyConditionExpression', self.table.query_calls[0])
+    
+    def test_closed_buckets_are_not_read_again(self):
+        """Only buckets that were still open should be recomputed."""
+        window = (3600, self.DAY, self.DAY + 4 * 3600)
+        args = (self.table, 'timestamp', *window, 'byCarrierName', 'carrier_name', ['att'])
+        now = self.DAY + 3 * 3600 + 1800  # during the fourth hour
+        
+        first, info = cached_time_bucket_metrics(*args, now=now)
+        self.assertEqual(info, {'status': 'miss', 'cachedBuckets': 0})
+        
+        self.table.query_calls.clear()
+        second, info = cached_time_bucket_metrics(*args, now=now)
+        self.assertEqual(info, {'status': 'partial', 'cachedBuckets': 3})
+        self.assertEqual(second, first)
+        self.assertEqual(second[self.DAY + 3600], self.expected(1, ['att']))
+        
+        # Only the open hour is queried
+        condition = self.table.query_calls[0]['KeyConditionExpression']
+        self.assertEqual(condition.get_expression()['values'][1].get_expression()['values'][1:],
+                         ('2024-01-01T03:00:00', '2024-01-01T04:00:00'))
+        
+        _, info = cached_time_bucket_metrics(*args, bypass_cache=True, now=now)
+        self.assertEqual(info['status'], 'bypass')
+    
+    @patch('index.BUCKET_CACHE_MAX_ENTRIES', 1)
+    @patch('index.MAX_TIME_BUCKETS', 2)
+    def test_bucket_cache_is_bounded(self):
+        """Only the latest buckets of the most recently used keys should be kept."""
+        window = (3600, self.DAY, self.DAY + 4 * 3600)
+        now = self.DAY + 5 * 3600
+        for carriers in (['att'], ['verizon']):
+            cached_time_bucket_metrics(
+                self.table, 'timestamp', *window, 'byCarrierName', 'carrier_name', carriers, now=now
+            )
+        
+        self.assertEqual(len(index._bucket_cache), 1)
+        (key, buckets), = index._bucket_cache.items()
+        self.assertEqual(key[-1], ('verizon',))
+        self.assertEqual(sorted(buckets), [self.DAY + 2 * 3600, self.DAY + 3 * 3600])
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_timeseries_mode(self, mock_dynamodb):
+        """mode=timeseries should return buckets per table and window totals."""
+        feedback_table = FakeTable(
+            [{'id': 'f1', 'carrier': 'att', 'datetime': '2024-01-01T02:15:00Z', 'rev_feedback': 'ok'}],
+            key_name='id', name='test-feedback', indexes={'byCarrier': ('carrier', 'datetime')}
+        )
+        mock_dynamodb.Table.side_effect = lambda name: {
+            'test-chat-logs': self.table, 'test-feedback': feedback_table
+        }[name]
+        
+        event = {'queryStringParameters': {
+            'mode': 'timeseries', 'interval': 'hour',
+            'start': '2024-01-01T01:00:00Z', 'end': '2024-01-01T03:00:00Z',
+        }}
+        body = json.loads(lambda_handler(event, None)['body'])
+        
+        self.assertEqual(body['window'], {'start': '2024-01-01T01:00:00Z', 'end': '2024-01-01T03:00:00Z'})
+        self.assertEqual([bucket['start'] for bucket in body['buckets']['chatLogs']],
+                         ['2024-01-01T01:00:00Z', '2024-01-01T02:00:00Z'])
+        self.assertEqual(body['totalChatLogs'], self.expected(1)[0] + self.expected(2)[0])
+        self.assertEqual(
+            body['buckets']['feedbackLogs'][1],
+            {'start': '2024-01-01T02:00:00Z', 'total': 1, 'reviewed': 1, 'pending': 0}
+        )
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_rejects_bad_window(self, mock_dynamodb):
+        """Invalid intervals should be rejected without reading the tables."""
+        result = lambda_handler({'mode': 'timeseries', 'interval': 'minute'}, None)
+        
+        self.assertEqual(result['statusCode'], 400)
+        mock_dynamodb.Table.assert_not_called()
+
+
+class TestIssueTags(unittest.TestCase):
+    """Test issue tag frequencies and co-occurrence."""
+    
+    TAG_SETS = [
+        ['Incorrect answer', 'Missing citation'],
+        ['Incorrect answer'],
+        ['Tone', 'Incorrect answer', 'Missing citation'],
+        [],
+    ]
+    
+    def setUp(self):
+        clear_metrics_cache()
+        self.items = []
+        for i in range(120):
+            item = {
+                'log_id': f'log-{i}',
+                'carrier_name': 'att' if i % 2 else 'verizon',
+                'timestamp': f'2024-01-{1 + i % 10:02d}T12:00:00Z',
+            }
+            if i % 5:
+                item['issue_tags'] = json.dumps(self.TAG_SETS[i % 4])
+            self.items.append(item)
+        self.table = FakeTable(
+            self.items, key_name='log_id', page_size=16, name='test-chat-logs',
+            indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+        self.index = ('byCarrierName', 'carrier_name', 'timestamp')
+    
+    def expected(self, items):
+        """Brute-force tag counts and pair counts."""
+        counts, pairs = Counter(), Counter()
+        for item in items:
+            tags = set(json.loads(item['issue_tags'])) if 'issue_tags' in item else set()
+            counts.update(tags)
+            pairs.update(frozenset(pair) for pair in itertools.combinations(sorted(tags), 2))
+        return counts, pairs
+    
+    def check(self, statistics, items):
+        counts, pairs = self.expected(items)
+        self.assertEqual(statistics.total_logs, len(items))
+        self.assertEqual(dict(zip(statistics.tags, statistics.counts)), dict(counts))
+        for (first, tag_a), (second, tag_b) in itertools.combinations(enumerate(statistics.tags), 2):
+            self.assertEqual(statistics.cooccurrence(first, second), pairs[frozenset((tag_a, tag_b))])
+            self.assertEqual(statistics.cooccurrence(second, first), pairs[frozenset((tag_a, tag_b))])
+    
+    def test_decode_issue_tags(self):
+        """Tag strings, lists and malformed values should decode to sorted distinct tags."""
+        self.assertEqual(decode_issue_tags('["b", "a", "b", " "]'), ('a', 'b'))
+        self.assertEqual(decode_issue_tags(['b', 'a']), ('a', 'b'))
+        self.assertEqual(decode_issue_tags('"single"'), ('single',))
+        self.assertEqual(decode_issue_tags('not json'), ())
+        self.assertEqual(decode_issue_tags('{"a": 1}'), ())
+        self.assertEqual(decode_issue_tags(None), ())
+    
+    def test_statistics_match_brute_force(self):
+        """Frequencies and co-occurrence should match counting every pair."""
+        statistics = issue_tag_statistics(self.table, self.index)
+        
+        self.check(statistics, self.items)
+        self.assertEqual(statistics.tags[0], 'Incorrect answer')
+        self.assertEqual(statistics.tagged_logs, sum(1 for item in self.items if item.get('issue_tags', '[]') != '[]'))
+        self.assertEqual(statistics.pairs.typecode, 'L')
+        self.assertEqual(len(statistics.pairs), 3)
+    
+    def test_carrier_and_time_filters(self):
+        """Carrier and time filters should use Queries and restrict the logs."""
+        statistics = issue_tag_statistics(
+            self.table, self.index, ['att'],
+            (1704067200, 1704067200 + 3 * 86400)  # 2024-01-01 to 2024-01-04
+        )
+        
+        selected = [
+            item for item in self.items
+            if item['carrier_name'] == 'att' and item['timestamp'] < '2024-01-04'
+        ]
+        self.check(statistics, selected)
+        self.assertEqual(self.table.scan_calls, [])
+    
+    def test_empty_statistics(self):
+        """No tags should give empty arrays."""
+        statistics = TagStatistics(3, Counter())
+        self.assertEqual(statistics.to_dict(), {
+            'totalChatLogs': 3, 'taggedChatLogs': 0, 'tags': [], 'pairs': []
+        })
+    
+    def test_open_end_is_aligned_for_the_cache(self):
+        """Requests with only a start should share a cache key within a minute."""
+        with patch('index.time.time', return_value=1704067200.5):
+            first = index.time_range('2024-01-01T00:00:00Z')
+        with patch('index.time.time', return_value=1704067259.0):
+            second = index.time_range('2024-01-01T00:00:00Z')
+        
+        self.assertEqual(first, (1704067200, 1704067260))
+        self.assertEqual(first, second)
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_tags_mode(self, mock_dynamodb):
+        """mode=tags should return tag counts and the non-zero tag pairs."""
+        mock_dynamodb.Table.side_effect = lambda name: {'test-chat-logs': self.table}[name]
+        
+        result = lambda_handler({'queryStringParameters': {'mode': 'tags', 'end': '2024-01-06T00:00:00Z'}}, None)
+        
+        self.assertEqual(result['statusCode'], 200)
+        body = json.loads(result['body'])
+        selected = [item for item in self.items if item['timestamp'] < '2024-01-06']
+        counts, pairs = self.expected(selected)
+        self.assertEqual(body['totalChatLogs'], len(selected))
+        self.assertEqual({entry['tag']: entry['count'] for entry in body['tags']}, dict(counts))
+        tags = [entry['tag'] for entry in body['tags']]
+        returned = {frozenset((tags[first], tags[second])): logs for first, second, logs in body['pairs']}
+        self.assertEqual(returned, {pair: logs for pair, logs in pairs.items() if logs})
+        self.assertTrue(all(first < second for first, second, _ in body['pairs']))
+        self.assertEqual(body['cache']['chatLogs']['status'], 'miss')
+        
+        bad = lambda_handler({'mode': 'tags', 'start': 'soon'}, None)
+        self.assertEqual(bad['statusCode'], 400)
+
+
+class TestPendingIds(unittest.TestCase):
+    """Test the pending ID listing ('pending' mode)."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        self.chat_items = [
+            {
+                'log_id': f'log-{i:03d}',
+                'carrier_name': 'A' if i % 2 else 'B',
+                'timestamp': f'2024-01-{1 + i % 20:02d}T00:00:00Z',
+                'rev_comment': 'done' if i % 3 == 0 else ' ',
+            }
+            for i in range(60)
+        ]
+        # Missing and unparseable timestamps sort last
+        self.chat_items[1].pop('timestamp')
+        self.chat_items[2]['timestamp'] = 'unknown'
+        self.feedback_items = [
+            {'id': f'fb-{i}', 'carrier': 'A', 'datetime': f'2024-02-{1 + i:02d}T00:00:00Z', 'rev_feedback': ''}
+            for i in range(5)
+        ]
+        self.chat_table = FakeTable(
+            self.chat_items, key_name='log_id', page_size=7, name='chat',
+            indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+        self.feedback_table = FakeTable(
+            self.feedback_items, key_name='id', page_size=7, name='feedback',
+            indexes={'byCarrier': ('carrier', 'datetime')}
+        )
+    
+    @staticmethod
+    def expected_ids(items, key_field, time_field):
+        pending = [item for item in items if not is_reviewed(item)]
+        
+        def sort_key(item):
+            timestamp = index.parse_timestamp(item.get(time_field))
+            return (float('inf') if timestamp is None else timestamp, item[key_field])
+        return [item[key_field] for item in sorted(pending, key=sort_key)]
+    
+    def test_packed_ids_sort_and_page(self):
+        """IDs should sort by (timestamp, ID) and page from a keyset position."""
+        pending = index.PendingIds()
+        for item_id, timestamp in [('b', 2.0), ('ü', None), ('a', 2.0), ('c', 1.0)]:
+            pending.add(item_id, timestamp)
+        pending.sort()
+        
+        self.assertEqual(pending.page(0, 10), ['c', 'a', 'b', 'ü'])
+        self.assertEqual(pending.after((2.0, 'a')), 2)
+        self.assertEqual(pending.page(pending.after((2.0, 'a')), 1), ['b'])
+        self.assertEqual(pending.after((float('inf'), 'ü')), 4)
+        # Fixed cost per ID on top of its UTF-8 bytes
+        self.assertEqual(len(pending.data), 5)
+        self.assertLessEqual(pending.ends.itemsize + pending.times.itemsize, 12)
+    
+    def test_sort_builds_no_key_per_id(self):
+        """Sorting should stay far below a (timestamp, bytes) tuple per ID, about 200 bytes each."""
+        rng = random.Random(7)
+        pending = index.PendingIds()
+        for _ in range(20000):
+            pending.add(f'{rng.getrandbits(128):032x}', 1.7e9 + rng.randrange(5000))
+        expected = sorted(
+            (pending.times[position], pending.id_bytes(position)) for position in range(len(pending))
+        )
+        
+        tracemalloc.start()
+        try:
+            pending.sort()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        self.assertEqual([pending.sort_key(position) for position in range(len(pending))], expected)
+        self.assertLess(peak / len(pending), 120)
+    
+    def test_sorted_lists_merge(self):
+        """merge should interleave sorted lists into one (timestamp, ID) order."""
+        rng = random.Random(3)
+        parts = []
+        for _ in range(5):
+            part = index.PendingIds()
+            for _ in range(rng.randrange(0, 40)):
+                part.add(f'id-{rng.randrange(1000)}', rng.choice([None, 1.0, 2.0, 3.5, 7.0]))
+            part.sort()
+            parts.append(part)
+        expected = sorted(part.sort_key(position) for part in parts for position in range(len(part)))
+        
+        merged = index.PendingIds.merge(parts)
+        
+        self.assertEqual([merged.sort_key(position) for position in range(len(merged))], expected)
+    
+    def test_counts_and_ids_come_from_one_pass(self):
+        """pending_review_ids should count like calculate_metrics in the same scan."""
+        with patch.dict(os.environ, {'SCAN_SEGMENTS': '3'}):
+            counts, pending = index.pending_review_ids(self.chat_table, 'log_id', index.CARRIER_INDEXES['chatLogs'])
+        
+        self.assertEqual(counts, calculate_metrics(self.chat_items))
+        self.assertEqual(pending.page(0, 100), self.expected_ids(self.chat_items, 'log_id', 'timestamp'))
+    
+    def run_handler(self, **params):
+        with patch('index.dynamodb') as mock_dynamodb, patch.dict(os.environ, {
+            'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'
+        }):
+            mock_dynamodb.Table.side_effect = lambda name: {
+                'chat': self.chat_table, 'feedback': self.feedback_table
+            }[name]
+            result = lambda_handler(dict(params, mode='pending'), None)
+        return result['statusCode'], json.loads(result['body'])
+    
+    def test_handler_paginates_with_cursor(self):
+        """Following nextCursor should list every pending ID once, in order."""
+        listed = {'chatLogs': [], 'feedbackLogs': []}
+        cursor = None
+        pages = 0
+        while True:
+            params = {'limit': 4}
+            if cursor:
+                params['cursor'] = cursor
+            status, body = self.run_handler(**params)
+            self.assertEqual(status, 200)
+            for key, ids in body['pendingIds'].items():
+                self.assertLessEqual(len(ids), 4)
+                listed[key].extend(ids)
+            pages += 1
+            cursor = body['nextCursor']
+            if cursor is None:
+                break
+        
+        self.assertEqual(listed['chatLogs'], self.expected_ids(self.chat_items, 'log_id', 'timestamp'))
+        self.assertEqual(listed['feedbackLogs'], self.expected_ids(self.feedback_items, 'id', 'datetime'))
+        self.assertEqual(pages, 10)
+        self.assertEqual(body['pendingChatLogs'], len(listed['chatLogs']))
+        self.assertEqual(body['cache']['chatLogs']['status'], 'hit')
+    
+    def test_handler_carriers(self):
+        """carriers should list the pending IDs of those carriers only."""
+        status, body = self.run_handler(carriers='A', limit=1000)
+        
+        # Items without the GSI sort key are not in the carrier index
+        selected = [item for item in self.chat_items if item['carrier_name'] == 'A' and 'timestamp' in item]
+        self.assertEqual(status, 200)
+        self.assertEqual(body['pendingIds']['chatLogs'], self.expected_ids(selected, 'log_id', 'timestamp'))
+        self.assertIsNone(body['nextCursor'])
+    
+    def test_large_lists_are_not_cached(self):
+        """The cached ID lists are bounded by PENDING_CACHE_MAX_IDS."""
+        with patch('index.PENDING_CACHE_MAX_IDS', 10):
+            self.run_handler(tables='chatLogs')
+            status, body = self.run_handler(tables='chatLogs')
+        self.assertEqual(status, 200)
+        self.assertEqual(body['cache']['chatLogs']['status'], 'miss')
+        self.assertEqual(index._metrics_cache, {})
+        
+        # Older lists are dropped to make room for new ones (40 + 5 IDs)
+        with patch('index.PENDING_CACHE_MAX_IDS', 44):
+            self.run_handler(tables='chatLogs')
+            self.run_handler(tables='feedbackLogs')
+            _, feedback = self.run_handler(tables='feedbackLogs')
+            _, chat = self.run_handler(tables='chatLogs')
+        self.assertEqual(chat['cache']['chatLogs']['status'], 'miss')
+        self.assertEqual(feedback['cache']['feedbackLogs']['status'], 'hit')
+    
+    def test_capacity_budget_applies(self):
+        """A spent read budget should fail the table instead of reading on."""
+        with patch('index.SCAN_RCU_BUDGET', 1.0):
+            status, body = self.run_handler(tables='chatLogs')
+        
+        self.assertEqual(status, 500)
+        self.assertIn('budget', body['message'])
+        self.assertEqual(index._metrics_cache, {})
+    
+    def test_handler_rejects_bad_cursor_and_limit(self):
+        """Malformed cursors and out-of-range limits should return 400."""
+        for params in ({'cursor': 'not-a-cursor'}, {'cursor': index.encode_pending_cursor({'other': (1.0, 'x')})},
+                       {'limit': 0}, {'limit': 'many'}):
+            status, body = self.run_handler(**params)
+            self.assertEqual(status, 400, params)
+            self.assertEqual(body['error'], 'Invalid request')
+
+
+class TestFilteredMetrics(unittest.TestCase):
+    """Test the 'scan' mode filters and the Scan-vs-Query planner."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        comments = ['Looks right', '', '  ', None, '\tchecked\n']
+        self.chat_items = []
+        for i in range(400):
+            item = {
+                'log_id': f'log-{i:04d}',
+                'carrier_name': 'ABCDEFGHIJ'[i % 10],
+                'timestamp': f'2024-03-{1 + i % 28:02d}T{i % 24:02d}:00:00Z',
+            }
+            if comments[i % 5] is not None:
+                item['rev_comment'] = comments[i % 5]
+            if i % 7 == 0:
+                item['rev_feedback'] = 'needs follow-up'
+            self.chat_items.append(item)
+        # Not in the sparse carrier index
+        self.chat_items[0].pop('timestamp')
+        self.feedback_items = [
+            {'id': f'fb-{i}', 'carrier': 'A', 'datetime': '2024-03-02T00:00:00Z', 'rev_feedback': 'ok' if i % 2 else ''}
+            for i in range(6)
+        ]
+        self.chat_table = FakeTable(
+            self.chat_items, key_name='log_id', page_size=50, name='chat',
+            indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+        self.feedback_table = FakeTable(
+            self.feedback_items, key_name='id', page_size=50, name='feedback',
+            indexes={'byCarrier': ('carrier', 'datetime')}
+        )
+    
+    def expected(self, carriers=None, start=None, end=None):
+        selected = [
+            item for item in self.chat_items
+            if (carriers is None or (item['carrier_name'] in carriers and 'timestamp' in item))
+            and (start is None or start <= item.get('timestamp', '') < end)
+        ]
+        return calculate_metrics(selected)
+    
+    def run_handler(self, context=None, **params):
+        with patch('index.dynamodb') as mock_dynamodb, patch.dict(os.environ, {
+            'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'
+        }):
+            mock_dynamodb.Table.side_effect = lambda name: {
+                'chat': self.chat_table, 'feedback': self.feedback_table
+            }[name]
+            result = lambda_handler(dict({'mode': 'scan'}, **params), context)
+        return result['statusCode'], json.loads(result['body'])
+    
+    def test_planner_prefers_queries_for_few_carriers(self):
+        """A few carriers should be read from the GSI, many with one Scan."""
+        carrier_index = index.CARRIER_INDEXES['chatLogs']
+        
+        few = index.plan_table_read(self.chat_table, carrier_index, ['A'])
+        many = index.plan_table_read(self.chat_table, carrier_index, list('ABCDEFGHIJKLMNOP'))
+        unfiltered = index.plan_table_read(self.chat_table, carrier_index, None, (0, 3600))
+        
+        self.assertEqual((few['operation'], few['indexName'], few['requests']), ('Query', 'byCarrierName', 1))
+        self.assertLess(few['estimatedReadUnits'], few['alternatives']['Scan'])
+        self.assertEqual(many['operation'], 'Scan')
+        self.assertGreater(many['alternatives']['Query'], many['estimatedReadUnits'])
+        self.assertEqual((unfiltered['operation'], unfiltered['indexName']), ('Scan', None))
+    
+    def test_short_time_range_makes_queries_cheaper(self):
+        """Queries should be estimated from the share of time they cover."""
+        carrier_index = index.CARRIER_INDEXES['chatLogs']
+        carriers = list('ABCDEFGH')
+        
+        plan = index.plan_table_read(self.chat_table, carrier_index, carriers, (0, 3600))
+        
+        self.assertEqual(plan['operation'], 'Query')
+        self.assertEqual(plan['estimatedReadUnits'], len(carriers) * 0.5)
+        self.assertEqual(index.plan_table_read(self.chat_table, carrier_index, carriers)['operation'], 'Scan')
+    
+    def test_unknown_table_size_prefers_queries(self):
+        plan = index.plan_table_read(Mock(spec=['table_name']), index.CARRIER_INDEXES['chatLogs'], ['A'])
+        
+        self.assertEqual(plan['operation'], 'Query')
+        self.assertIsNone(plan['estimatedReadUnits'])
+    
+    def test_carrier_filter_queries_the_index(self):
+        status, body = self.run_handler(carriers='A,C', tables='chatLogs')
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(body['plans']['chatLogs']['operation'], 'Query')
+        self.assertEqual(
+            (body['totalChatLogs'], body['reviewedChatLogs'], body['pendingChatLogs']),
+            self.expected(['A', 'C'])
+        )
+        self.assertEqual(len(self.chat_table.scan_calls), 0)
+        self.assertGreater(body['consumedCapacity']['capacityUnits'], 0)
+    
+    def test_scan_plan_counts_like_queries(self):
+        """Both plans should count the same items."""
+        carriers = 'A,B,C,D,E,F'
+        with patch('index.PLANNER_CARRIER_SHARE', 1.0):
+            _, scanned = self.run_handler(carriers=carriers, start='2024-03-05T00:00:00Z', end='2024-03-20T00:00:00Z')
+        clear_metrics_cache()
+        with patch('index.PLANNER_CARRIER_SHARE', 0.0001):
+            _, queried = self.run_handler(carriers=carriers, start='2024-03-05T00:00:00Z', end='2024-03-20T00:00:00Z')
+        
+        self.assertEqual(scanned['plans']['chatLogs']['operation'], 'Scan')
+        self.assertEqual(queried['plans']['chatLogs']['operation'], 'Query')
+        counts = (scanned['totalChatLogs'], scanned['reviewedChatLogs'], scanned['pendingChatLogs'])
+        self.assertEqual(counts, (queried['totalChatLogs'], queried['reviewedChatLogs'], queried['pendingChatLogs']))
+        self.assertEqual(counts, self.expected(carriers.split(','), '2024-03-05T00:00:00Z', '2024-03-20T00:00:00Z'))
+        self.assertEqual(scanned['filters']['start'], '2024-03-05T00:00:00Z')
+    
+    def test_review_state_filter(self):
+        """reviewState should count only the items in that state."""
+        _, reviewed, pending = self.expected()
+        
+        _, pending_body = self.run_handler(reviewState='pending')
+        _, reviewed_body = self.run_handler(reviewState='reviewed')
+        
+        self.assertEqual(
+            (pending_body['totalChatLogs'], pending_body['reviewedChatLogs'], pending_body['pendingChatLogs']),
+            (pending, 0, pending)
+        )
+        self.assertEqual(
+            (reviewed_body['totalChatLogs'], reviewed_body['reviewedChatLogs'], reviewed_body['pendingChatLogs']),
+            (reviewed, reviewed, 0)
+        )
+        self.assertEqual(pending_body['plans']['chatLogs']['operation'], 'Scan')
+        # Certainly reviewed items are dropped server-side
+        self.assertTrue(all('FilterExpression' in call for call in self.chat_table.scan_calls))
+    
+    def test_table_selection(self):
+        """Unselected tables should not be read and report null counts."""
+        status, body = self.run_handler(tables='feedbackLogs', carriers='A')
+        
+        self.assertEqual(status, 200)
+        self.assertIsNone(body['totalChatLogs'])
+        self.assertEqual(body['totalFeedbackLogs'], 6)
+        self.assertEqual(body['reviewedFeedbackLogs'], 3)
+        self.assertEqual(list(body['plans']), ['feedbackLogs'])
+        self.assertEqual(self.chat_table.scan_calls + self.chat_table.query_calls, [])
+    
+    def test_unfiltered_scan_has_no_plans(self):
+        status, body = self.run_handler()
+        
+        self.assertEqual(status, 200)
+        self.assertNotIn('plans', body)
+        self.assertEqual(body['totalChatLogs'], 400)
+    
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'tables': 'chatLogs,bogus'}, {'reviewState': 'maybe'}, {'start': 'yesterday'}):
+            status, body = self.run_handler(**params)
+            self.assertEqual(status, 400, params)
+            self.assertEqual(body['error'], 'Invalid request')
+    
+    def test_filters_are_rejected_where_they_do_not_apply(self):
+        """Modes that cannot filter should refuse filters instead of returning unfiltered counts."""
+        for params in (
+            {'mode': 'count', 'carriers': 'ZZZ'},
+            {'mode': 'estimate', 'start': '2024-03-01T00:00:00Z'},
+            {'mode': 'carrier', 'end': '2024-03-01T00:00:00Z'},
+            {'mode': 'registry', 'reviewState': 'pending'},
+            {'mode': 'counters', 'carriers': 'A'},
+        ):
+            status, body = self.run_handler(**params)
+            self.assertEqual(status, 400, params)
+            self.assertIn(f"cannot be used in {params['mode']} mode", body['message'])
+        self.assertEqual(self.chat_table.scan_calls + self.chat_table.query_calls, [])
+        
+        status, _ = self.run_handler(mode='count', reviewState='all')
+        self.assertEqual(status, 200)
+    
+    def test_interrupted_filtered_reads_resume_to_full_counts(self):
+        """Queries and filtered Scans should stop between pages and resume where they stopped."""
+        carrier_index = index.CARRIER_INDEXES['chatLogs']
+        time_range = index.time_range('2024-03-05T00:00:00Z', '2024-03-20T00:00:00Z')
+        self.chat_table.page_size = 5
+        for operation, carriers in (('Query', ['A', 'C', 'E']), ('Scan', ['A', 'C', 'E']), ('Scan', None)):
+            for review_state in ('all', 'pending'):
+                state = None
+                rounds = 0
+                while True:
+                    rounds += 1
+                    try:
+                        counts = index.filtered_table_metrics(
+                            self.chat_table, carrier_index, {'operation': operation}, carriers, time_range,
+                            review_state, should_stop=StopAfter(1), resume_state=state
+                        )
+                        break
+                    except ScanInterrupted as e:
+                        _, state = decode_continuation_token(encode_continuation_token('scan', {'chatLogs': e.state}))
+                        state = state['chatLogs']
+                        self.assertEqual(state['filters']['carriers'], carriers)
+                
+                total, reviewed, pending = self.expected(carriers, '2024-03-05T00:00:00Z', '2024-03-20T00:00:00Z')
+                expected = (pending, 0, pending) if review_state == 'pending' else (total, reviewed, pending)
+                self.assertGreater(rounds, 1, (operation, carriers))
+                self.assertEqual(counts, expected, (operation, carriers, review_state))
+    
+    def test_handler_resumes_a_filtered_scan_with_its_filters(self):
+        """A filtered scan near the deadline should return a token that keeps its filters."""
+        context = Mock()
+        context.get_remaining_time_in_millis.return_value = 1000
+        self.chat_table.page_size = 5
+        params = {'carriers': 'A,C', 'start': '2024-03-05T00:00:00Z', 'end': '2024-03-20T00:00:00Z'}
+        
+        status, body = self.run_handler(context, tables='chatLogs', **params)
+        rounds = 1
+        while body.get('partial'):
+            self.assertEqual(status, 200)
+            self.assertEqual(body['plans']['chatLogs']['operation'], 'Query')
+            status, body = self.run_handler(context, continuationToken=body['continuationToken'])
+            rounds += 1
+        
+        self.assertGreater(rounds, 2)
+        self.assertEqual(body['cache']['chatLogs']['status'], 'resumed')
+        self.assertEqual(body['filters']['carriers'], ['A', 'C'])
+        self.assertEqual(body['filters']['start'], '2024-03-05T00:00:00Z')
+        self.assertEqual(
+            (body['totalChatLogs'], body['reviewedChatLogs'], body['pendingChatLogs']),
+            self.expected(['A', 'C'], '2024-03-05T00:00:00Z', '2024-03-20T00:00:00Z')
+        )
+        self.assertEqual(self.chat_table.scan_calls, [])
+    
+    def test_filters_cannot_change_a_resumed_scan(self):
+        token = index.encode_continuation_token('scan', {
+            'chatLogs': {'segments': 1, 'pending': {}, 'counts': (1, 1, 0)}
+        })
+        
+        status, body = self.run_handler(continuationToken=token, carriers='A')
+        
+        self.assertEqual(status, 400)
+        self.assertIn('continuation token', body['message'])
+
+
+class TestEstimateMetrics(unittest.TestCase):
+    """Test the sampled estimate ('estimate' mode)."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        # About 30% reviewed, in runs so neighbouring keys are correlated
+        self.items = [
+            {'log_id': f'log-{i:05d}', 'rev_comment': 'ok' if (i // 7) % 10 < 3 else ' '}
+            for i in range(20000)
+        ]
+        self.table = FakeTable(self.items, key_name='log_id', page_size=5000, name='chat')
+        self.truth = calculate_metrics(self.items)
+    
+    def test_sampled_interval_covers_truth(self):
+        """A sample should meet the target error and cover the real ratio."""
+        with patch('index.ESTIMATE_PAGE_ITEMS', 100):
+            result = index.estimate_table_metrics(
+                self.table, 'log_id, rev_comment', target_error=0.03, rng=random.Random(3)
+            )
+        
+        estimate = result['estimate']
+        self.assertEqual(estimate['method'], 'sampled')
+        self.assertTrue(estimate['targetMet'])
+        self.assertLess(estimate['sampledSegments'], estimate['totalSegments'])
+        self.assertEqual(estimate['totalSegments'], 200)
+        low, high = estimate['reviewedInterval']
+        self.assertLessEqual(low, self.truth[1])
+        self.assertGreaterEqual(high, self.truth[1])
+        self.assertEqual(result['counts'][0], 20000)
+        self.assertEqual(sum(result['counts'][1:]), 20000)
+    
+    def test_reading_every_segment_is_exact(self):
+        with patch('index.ESTIMATE_PAGE_ITEMS', 2000):
+            result = index.estimate_table_metrics(self.table, 'log_id, rev_comment', target_error=0.0001)
+        
+        self.assertEqual(result['estimate']['method'], 'exact')
+        self.assertEqual(result['counts'], self.truth)
+        self.assertEqual(result['estimate']['halfWidth'], 0.0)
+    
+    def test_time_budget_stops_sampling(self):
+        """Sampling should stop after one round once the budget is spent."""
+        with patch('index.ESTIMATE_PAGE_ITEMS', 100), patch('index.ESTIMATE_TIME_BUDGET_SECONDS', 0):
+            result = index.estimate_table_metrics(self.table, 'log_id, rev_comment', target_error=0.0001)
+        
+        self.assertEqual(result['estimate']['sampledSegments'], index.ESTIMATE_PARALLEL_SEGMENTS)
+        self.assertFalse(result['estimate']['targetMet'])
+    
+    def test_zero_item_count_uses_the_sample(self):
+        """A new table's ItemCount of 0 should not hide the items the sample saw."""
+        with patch('index.ESTIMATE_PAGE_ITEMS', 100), \
+                patch.object(FakeTable, 'item_count', new_callable=PropertyMock, return_value=0):
+            result = index.estimate_table_metrics(self.table, 'log_id, rev_comment')
+    
+        estimate = result['estimate']
+        self.assertEqual(estimate['itemCount'], 0)
+        self.assertTrue(estimate['itemCountStale'])
+        # The only segment did not fit in one page, so the total is a floor
+        self.assertTrue(estimate['totalLowerBound'])
+        self.assertEqual(result['counts'][0], estimate['sampledItems'])
+        self.assertGreater(result['counts'][0], 0)
+        self.assertEqual(sum(result['counts'][1:]), result['counts'][0])
+    
+    def test_stale_item_count_is_extrapolated(self):
+        """A sample holding more items than ItemCount should extrapolate the total."""
+        with patch('index.ESTIMATE_PAGE_ITEMS', 1000), \
+                patch.object(FakeTable, 'item_count', new_callable=PropertyMock, return_value=12000):
+            result = index.estimate_table_metrics(
+                self.table, 'log_id, rev_comment', target_error=0.5, rng=random.Random(3)
+            )
+    
+        estimate = result['estimate']
+        self.assertEqual(estimate['method'], 'sampled')
+        self.assertGreater(estimate['sampledItems'], 12000)
+        self.assertTrue(estimate['itemCountStale'])
+        self.assertFalse(estimate['totalLowerBound'])
+        self.assertAlmostEqual(result['counts'][0], 20000, delta=2000)
+    
+    def test_fresh_item_count_is_kept(self):
+        with patch('index.ESTIMATE_PAGE_ITEMS', 100):
+            result = index.estimate_table_metrics(
+                self.table, 'log_id, rev_comment', target_error=0.03, rng=random.Random(3)
+            )
+    
+        self.assertFalse(result['estimate']['itemCountStale'])
+        self.assertEqual(result['estimate']['itemCount'], 20000)
+        self.assertEqual(result['counts'][0], 20000)
+    
+    def test_ratio_interval(self):
+        z = 1.96
+        
+        self.assertEqual(index.reviewed_ratio_interval([], z, 10), (0.0, 1.0))
+        self.assertEqual(index.reviewed_ratio_interval([(100, 40)], z, 10), (0.4, 1.0))
+        ratio, half_width = index.reviewed_ratio_interval([(100, 40), (100, 60)], z, 10)
+        self.assertAlmostEqual(ratio, 0.5)
+        self.assertGreater(half_width, 0.05)
+        # Every segment sampled: no sampling error left
+        self.assertEqual(index.reviewed_ratio_interval([(100, 40), (100, 60)], z, 2)[1], 0.0)
+    
+    def run_handler(self, **params):
+        feedback = FakeTable([{'id': 'f', 'rev_feedback': 'x'}], key_name='id', name='feedback')
+        with patch('index.dynamodb') as mock_dynamodb, patch.dict(os.environ, {
+            'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'
+        }):
+            mock_dynamodb.Table.side_effect = lambda name: {'chat': self.table, 'feedback': feedback}[name]
+            result = lambda_handler(dict(params, mode='estimate'), None)
+        return result['statusCode'], json.loads(result['body'])
+    
+    def test_handler_estimate_mode(self):
+        with patch('index.ESTIMATE_PAGE_ITEMS', 100):
+            status, body = self.run_handler(targetError='0.05', confidence='0.9')
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(body['totalChatLogs'], 20000)
+        self.assertEqual(body['estimates']['chatLogs']['confidence'], 0.9)
+        self.assertEqual(body['estimates']['chatLogs']['targetError'], 0.05)
+        self.assertEqual(body['estimates']['feedbackLogs']['method'], 'exact')
+        self.assertEqual(body['reviewedFeedbackLogs'], 1)
+    
+    def test_handler_rejects_bad_parameters(self):
+        for params in ({'targetError': '0'}, {'targetError': 'small'}, {'confidence': '1.5'}):
+            status, body = self.run_handler(**params)
+            self.assertEqual(status, 400, params)
+
+
+class TestMetricRegistry(unittest.TestCase):
+    """Test the declarative metric registry ('registry' mode)."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        self.chat_items = [
+            {
+                'log_id': f'log-{i:03d}',
+                'carrier_name': 'A' if i % 3 else 'B',
+                'timestamp': f'2024-05-{1 + i % 28:02d}T00:00:00Z',
+                'rev_comment': ['ok', '', ' \n'][i % 3],
+                'issue_tags': json.dumps(['slow'] if i % 4 else ['slow', 'wrong']),
+                'guardrail_intervened': i % 10 == 0,
+                'latency': Decimal(i),
+                'user_name': f'user-{i % 20}',
+                'session_id': f'session-{i % 45}',
+            }
+            for i in range(90)
+        ]
+        self.chat_items[5].pop('carrier_name')
+        self.chat_table = FakeTable(
+            self.chat_items, key_name='log_id', page_size=8, name='chat',
+            indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+        self.feedback_items = [
+            {'id': f'fb-{i}', 'carrier': 'A', 'type': 'bug' if i % 2 else 'idea', 'rev_feedback': 'x' * (i % 2),
+             'user_name' if i % 3 else 'username': f'user-{18 + i}'}
+            for i in range(7)
+        ]
+        self.feedback_table = FakeTable(
+            self.feedback_items,
+            key_name='id', page_size=8, name='feedback', indexes={'byCarrier': ('carrier', 'datetime')}
+        )
+    
+    def evaluate(self, definitions, segments='3'):
+        with patch.dict(os.environ, {'SCAN_SEGMENTS': segments}):
+            return index.evaluate_metric_registry(
+                self.chat_table, definitions, 'log_id', index.CARRIER_INDEXES['chatLogs']
+            )
+    
+    def test_builtin_metrics(self):
+        """The built-in chat log metrics should agree with the single-purpose functions."""
+        metrics = self.evaluate(index.registered_metrics('chatLogs'))
+        
+        total, reviewed, _ = calculate_metrics(self.chat_items)
+        self.assertEqual((metrics['total'], metrics['reviewed']), (total, reviewed))
+        self.assertEqual(metrics['totalByCarrier'], {'(missing)': 1, 'A': 59, 'B': 30})
+        self.assertEqual(sum(metrics['reviewedByCarrier'].values()), reviewed)
+        self.assertEqual(metrics['guardrailInterventions'], 9)
+        self.assertEqual(metrics['issueTags'], {'slow': 90, 'wrong': 23})
+    
+    def test_one_scan_pass_with_merged_projection(self):
+        """All definitions should share one projection and read the table once."""
+        self.evaluate(index.registered_metrics('chatLogs', ['total']))
+        single_pages = len(self.chat_table.scan_calls)
+        self.chat_table.scan_calls.clear()
+        
+        self.evaluate(index.registered_metrics('chatLogs'))
+        projected = set(self.chat_table.scan_calls[0]['ExpressionAttributeNames'].values())
+        
+        self.assertEqual(len(self.chat_table.scan_calls), single_pages)
+        self.assertEqual(sum(len(call.get('ExclusiveStartKey', {})) == 0 for call in self.chat_table.scan_calls), 3)
+        self.assertEqual(projected, {
+            'log_id', 'rev_comment', 'rev_feedback', 'carrier_name', 'guardrail_intervened', 'issue_tags',
+            'timestamp', 'rev_date', 'user_name', 'session_id'
+        })
+    
+    def test_turnaround_percentiles(self):
+        """Turnaround should cover reviewed items with a review date, overall and per carrier."""
+        durations = {'A': [], 'B': []}
+        for i, item in enumerate(self.chat_items):
+            if is_reviewed(item) and 'carrier_name' in item:
+                hours = 1 + i % 48
+                item['rev_date'] = index.format_timestamp(int(index.parse_timestamp(item['timestamp'])) + hours * 3600)
+                durations[item['carrier_name']].append(hours * 3600)
+        
+        metrics = self.evaluate(
+            index.registered_metrics('chatLogs', ['turnaroundSeconds', 'turnaroundSecondsByCarrier'])
+        )
+        
+        overall = sorted(durations['A'] + durations['B'])
+        self.assertEqual(metrics['turnaroundSeconds']['count'], len(overall))
+        for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+            exact = overall[int(q * (len(overall) - 1))]
+            self.assertLessEqual(abs(metrics['turnaroundSeconds'][name] - exact), 0.01 * exact + 0.1, name)
+        by_carrier = metrics['turnaroundSecondsByCarrier']
+        self.assertEqual({carrier: value['count'] for carrier, value in by_carrier.items()},
+                         {carrier: len(values) for carrier, values in durations.items() if values})
+    
+    def test_distinct_counts(self):
+        """Distinct users and conversations should be split by review state and merge across segments."""
+        reviewed_users = {item['user_name'] for item in self.chat_items if is_reviewed(item)}
+        pending_users = {item['user_name'] for item in self.chat_items if not is_reviewed(item)}
+        
+        for segments in ('1', '4'):
+            metrics = self.evaluate(index.registered_metrics('chatLogs', ['distinctUsers', 'distinctConversations']),
+                                    segments)
+            self.assertEqual(metrics['distinctUsers'], {
+                'total': 20, 'reviewed': len(reviewed_users), 'pending': len(pending_users)
+            })
+            self.assertEqual(metrics['distinctConversations']['total'], 45)
+    
+    def test_distinct_counts_estimate_large_sets(self):
+        """With many more IDs than fit exactly, the estimate stays within a few standard errors."""
+        items = [{'log_id': f'log-{i}', 'user_name': f'user-{i % 50000}', 'rev_comment': 'ok' * (i % 2)}
+                 for i in range(100000)]
+        table = FakeTable(items, key_name='log_id', page_size=5000, name='chat')
+        
+        with patch.dict(os.environ, {'SCAN_SEGMENTS': '4'}):
+            metrics = index.evaluate_metric_registry(
+                table, index.registered_metrics('chatLogs', ['distinctUsers']), 'log_id',
+                index.CARRIER_INDEXES['chatLogs']
+            )
+        
+        # User i % 50000 is reviewed through odd i only, so half the users are reviewed
+        for state, exact in (('total', 50000), ('reviewed', 25000), ('pending', 25000)):
+            self.assertLess(abs(metrics['distinctUsers'][state] - exact), 0.03 * exact, state)
+    
+    def test_top_pending_users(self):
+        """Below the summary capacity the heavy hitters are exact."""
+        pending = Counter(item['user_name'] for item in self.chat_items if not is_reviewed(item))
+        total = Counter(item['user_name'] for item in self.chat_items)
+        
+        metrics = self.evaluate(index.registered_metrics('chatLogs', ['topPendingUsers']))
+        
+        hitters = metrics['topPendingUsers']
+        self.assertEqual(len(hitters), len(pending))
+        self.assertEqual([hitter['pending'] for hitter in hitters], sorted(pending.values(), reverse=True))
+        for hitter in hitters:
+            self.assertEqual(hitter['pending'], pending[hitter['id']])
+            self.assertEqual((hitter['total'], hitter['reviewed']),
+                             (total[hitter['id']], total[hitter['id']] - pending[hitter['id']]))
+            self.assertEqual(hitter['error'], 0)
+    
+    def test_top_pending_users_with_bounded_memory(self):
+        """With more users than the capacity, counts stay within their error and the top users are found."""
+        rng = random.Random(3)
+        items = []
+        heavy_users = [f'heavy-{rank}' for rank in range(30)]
+        for i in range(20000):
+            user = rng.choices(heavy_users, range(30, 0, -1))[0] if i % 4 == 0 else f'user-{rng.randrange(5000)}'
+            items.append({'log_id': f'log-{i}', 'user_name': user, 'rev_comment': 'ok' if i % 4 == 1 else ''})
+        table = FakeTable(items, key_name='log_id', page_size=1000, name='chat')
+        pending = Counter(item['user_name'] for item in items if not is_reviewed(item))
+        total = Counter(item['user_name'] for item in items)
+        
+        with patch.dict(os.environ, {'SCAN_SEGMENTS': '4'}), patch.object(index, 'HEAVY_HITTERS_CAPACITY', 200):
+            metrics = index.evaluate_metric_registry(
+                table, index.registered_metrics('chatLogs', ['topPendingUsers']), 'log_id',
+                index.CARRIER_INDEXES['chatLogs']
+            )
+        
+        hitters = metrics['topPendingUsers']
+        self.assertEqual(len(hitters), index.HEAVY_HITTERS_TOP_K)
+        exact_top = {user for user, _ in pending.most_common(index.HEAVY_HITTERS_TOP_K)}
+        guaranteed = {hitter['id'] for hitter in hitters if hitter['guaranteed']}
+        self.assertIn('heavy-0', guaranteed)
+        self.assertLessEqual(guaranteed, exact_top)
+        for hitter in hitters:
+            self.assertTrue(hitter['id'].startswith('heavy-'))
+            self.assertLessEqual(hitter['error'], len(items) / 200)
+            self.assertLessEqual(hitter['pending'] - hitter['error'], pending[hitter['id']])
+            self.assertGreaterEqual(hitter['pending'], pending[hitter['id']])
+            self.assertLessEqual(hitter['total'] - hitter['error'], total[hitter['id']])
+            self.assertGreaterEqual(hitter['total'], total[hitter['id']])
+    
+    def test_custom_reducer_merges_segments(self):
+        """A reducer's accumulators should merge across segments before finalizing."""
+        average = index.MetricDefinition(
+            'averageLatency', 'chatLogs', ('latency',),
+            reducer=lambda acc, item: (acc[0] + item['latency'], acc[1] + 1),
+            initial=lambda: (0, 0),
+            merge=lambda first, second: (first[0] + second[0], first[1] + second[1]),
+            finalize=lambda acc: float(acc[0] / acc[1]) if acc[1] else None,
+            group_by=('carrier_name',)
+        )
+        
+        for segments in ('1', '4'):
+            metrics = self.evaluate([average], segments)
+            latencies = [item['latency'] for item in self.chat_items if item.get('carrier_name') == 'B']
+            self.assertAlmostEqual(metrics['averageLatency']['B'], float(sum(latencies) / len(latencies)))
+    
+    def test_register_metric_validates(self):
+        with patch.dict(index.METRIC_REGISTRY):
+            index.register_metric(index.MetricDefinition('extra', 'chatLogs'))
+            with self.assertRaises(ValueError):
+                index.register_metric(index.MetricDefinition('extra', 'chatLogs'))
+            with self.assertRaises(ValueError):
+                index.register_metric(index.MetricDefinition('extra', 'otherLogs'))
+            self.assertIn('extra', [definition.name for definition in index.registered_metrics('chatLogs')])
+        self.assertNotIn(('chatLogs', 'extra'), index.METRIC_REGISTRY)
+    
+    def run_handler(self, **params):
+        with patch('index.dynamodb') as mock_dynamodb, patch.dict(os.environ, {
+            'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'
+        }):
+            mock_dynamodb.Table.side_effect = lambda name: {
+                'chat': self.chat_table, 'feedback': self.feedback_table
+            }[name]
+            result = lambda_handler(dict(params, mode='registry'), None)
+        return result['statusCode'], json.loads(result['body'])
+    
+    def test_handler_registry_mode(self):
+        status, body = self.run_handler()
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(body['totalChatLogs'], 90)
+        self.assertEqual(body['pendingChatLogs'], 90 - body['metrics']['chatLogs']['reviewed'])
+        self.assertEqual(body['metrics']['feedbackLogs']['byType'], {'bug': 3, 'idea': 4})
+        self.assertEqual(body['reviewedFeedbackLogs'], 3)
+        self.assertIn('consumedCapacity', body)
+        # Users user-18 and user-19 wrote chat logs and feedback; user_name or username
+        self.assertEqual(body['metrics']['feedbackLogs']['distinctUsers']['total'], 7)
+        self.assertEqual(body['distinct']['distinctUsers']['total'], 25)
+        self.assertEqual(body['distinct']['distinctConversations']['total'], 45)
+    
+    def test_handler_selects_metrics(self):
+        """Only the named metrics are evaluated; tables without any are not read."""
+        status, body = self.run_handler(metrics='issueTags')
+        
+        self.assertEqual(status, 200)
+        self.assertEqual(list(body['metrics']), ['chatLogs'])
+        self.assertEqual(body['metrics']['chatLogs'], {'issueTags': {'slow': 90, 'wrong': 23}})
+        self.assertIsNone(body['totalChatLogs'])
+        self.assertEqual(self.feedback_table.scan_calls, [])
+    
+    def test_handler_rejects_unknown_metrics(self):
+        status, body = self.run_handler(metrics='total,bogus')
+        
+        self.assertEqual(status, 400)
+        self.assertIn('bogus', body['message'])
+    
+    def test_handler_rejects_metrics_of_unselected_tables(self):
+        """issueTags only exists for chat logs, so nothing would be computed for feedback alone."""
+        status, body = self.run_handler(tables='feedbackLogs', metrics='issueTags')
+        
+        self.assertEqual(status, 400)
+        self.assertIn('No selected metric', body['message'])
+        self.assertEqual(self.chat_table.scan_calls, [])
+        self.assertEqual(self.feedback_table.scan_calls, [])
+
+
+class ThrottlingTable(FakeTable):
+    """FakeTable whose scans and queries fail with a throttling error on selected calls."""
+    
+    def __init__(self, *args, throttled_calls=(), error_code='ProvisionedThroughputExceededException', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.throttled_calls = set(throttled_calls)
+        self.error_code = error_code
+        self.attempts = 0
+    
+    def scan(self, **kwargs):
+        self.attempts += 1
+        if self.attempts in self.throttled_calls:
+            raise ClientError({'Error': {'Code': self.error_code, 'Message': 'Slow down'}}, 'Scan')
+        return super().scan(**kwargs)
+    
+    def query(self, **kwargs):
+        self.attempts += 1
+        if self.attempts in self.throttled_calls:
+            raise ClientError({'Error': {'Code': self.error_code, 'Message': 'Slow down'}}, 'Query')
+        return super().query(**kwargs)
+
+
+class TestScanRateController(unittest.TestCase):
+    """Test adaptive throttling, retries and consumed capacity accounting."""
+    
+    def setUp(self):
+        clear_metrics_cache()
+        self.items = [
+            {'log_id': f'log-{i}', 'rev_comment': 'ok' if i % 3 == 0 else '', 'padding': 'x' * 500}
+            for i in range(200)
+        ]
+        self.projection = 'log_id, rev_comment, rev_feedback'
+        # index.time is the time module itself, so keep the real sleep
+        self.real_sleep = time.sleep
+        sleep_patcher = patch('index.time.sleep')
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+    
+    def test_throttled_pages_are_retried_and_slow_down(self):
+        """Throttled pages should be retried after a backoff and halve the rate."""
+        table = ThrottlingTable(self.items, key_name='log_id', page_size=20, throttled_calls={2, 3})
+        controller = ScanRateController(max_page_rate=100, max_concurrency=4)
+        
+        counts = aggregate_table_metrics(table, self.projection, controller=controller)
+        
+        self.assertEqual(counts, calculate_metrics(self.items))
+        self.assertEqual(controller.throttles, 2)
+        self.assertEqual(controller.pages, 10)
+        self.assertEqual(self.sleep.call_count >= 2, True)
+        # Halved from 4 to 1, then one slot back per round of pages (1 + 2 + 3)
+        self.assertEqual(controller.concurrency, 4)
+        self.assertLessEqual(controller.page_rate, 100)
+        self.assertGreater(controller.page_rate, 25)
+    
+    def test_backoff_is_jittered_and_capped(self):
+        """Backoff should stay within the exponential ceiling."""
+        controller = ScanRateController()
+        for attempt in range(12):
+            delay = controller.backoff_seconds(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5.0, 0.05 * 2 ** attempt))
+    
+    def test_other_errors_and_exhausted_retries_propagate(self):
+        """Non-throttling errors and endless throttling should raise."""
+        table = ThrottlingTable(self.items, key_name='log_id', throttled_calls={1}, error_code='ValidationException')
+        with self.assertRaises(ClientError):
+            aggregate_table_metrics(table, self.projection, controller=ScanRateController())
+        
+        table = ThrottlingTable(self.items, key_name='log_id', throttled_calls=range(1, 100))
+        controller = ScanRateController()
+        with self.assertRaises(ClientError):
+            aggregate_table_metrics(table, self.projection, controller=controller)
+        self.assertEqual(controller.throttles, 8)
+        self.assertEqual(controller._active, 0)
+    
+    def test_consumed_capacity_is_accounted(self):
+        """Consumed capacity should be summed from every page."""
+        table = FakeTable(self.items, key_name='log_id', page_size=20)
+        controller = ScanRateController()
+        
+        count_review_metrics(table, total_segments=4, controller=controller)
+        
+        expected = sum(response['ConsumedCapacity']['CapacityUnits'] for response in [
+            table.scan(**dict(call, ReturnConsumedCapacity='TOTAL')) for call in list(table.scan_calls)
+        ])
+        self.assertAlmostEqual(controller.consumed_units, expected)
+        self.assertTrue(all(call['ReturnConsumedCapacity'] == 'TOTAL' for call in table.scan_calls))
+    
+    def test_budget_stops_and_resumes_scan(self):
+        """A spent budget should interrupt the scan, and resuming should complete it."""
+        table = FakeTable(self.items, key_name='log_id', page_size=20)
+        state = None
+        rounds = 0
+        while True:
+            rounds += 1
+            controller = ScanRateController(budget_units=6)
+            try:
+                counts = aggregate_table_metrics(
+                    table, self.projection, 2, controller.exhausted, state, controller
+                )
+                break
+            except ScanInterrupted as e:
+                state = e.state
+            self.assertLessEqual(controller.consumed_units, 6)
+        
+        self.assertGreater(rounds, 1)
+        self.assertEqual(counts, calculate_metrics(self.items))
+    
+    def test_budget_fails_count_mode(self):
+        """Count mode cannot resume, so a spent budget is an error."""
+        table = FakeTable(self.items, key_name='log_id', page_size=20)
+        with self.assertRaises(CapacityBudgetExceeded):
+            count_review_metrics(table, controller=ScanRateController(budget_units=3))
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_throttled_carrier_query_backs_off(self, mock_dynamodb):
+        """Carrier mode Queries should go through the controller and be retried when throttled."""
+        items = [dict(item, carrier_name='AB'[i % 2], timestamp='2024-03-01T00:00:00Z')
+                 for i, item in enumerate(self.items)]
+        chat_table = ThrottlingTable(
+            items, key_name='log_id', page_size=20, name='test-chat-logs', throttled_calls={1, 2},
+            indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+        feedback_table = FakeTable([], key_name='id', name='test-feedback', indexes={'byCarrier': ('carrier', 'datetime')})
+        mock_dynamodb.Table.side_effect = lambda name: {
+            'test-chat-logs': chat_table, 'test-feedback': feedback_table
+        }[name]
+        
+        body = json.loads(lambda_handler({'mode': 'carrier', 'carriers': 'A,B', 'tables': 'chatLogs'}, None)['body'])
+        
+        self.assertEqual(
+            (body['totalChatLogs'], body['reviewedChatLogs'], body['pendingChatLogs']),
+            calculate_metrics(items)
+        )
+        self.assertEqual(body['consumedCapacity']['throttles'], 2)
+        self.assertGreater(body['consumedCapacity']['capacityUnits'], 0)
+        self.assertGreaterEqual(self.sleep.call_count, 2)
+        self.assertTrue(all(call['ReturnConsumedCapacity'] == 'TOTAL' for call in chat_table.query_calls))
+    
+    def test_concurrency_limit(self):
+        """No more pages than the concurrency limit should be in flight."""
+        table = FakeTable(self.items, key_name='log_id', page_size=5)
+        in_flight = []
+        lock = threading.Lock()
+        active = [0]
+        scan = table.scan
+        
+        def tracked_scan(**kwargs):
+            with lock:
+                active[0] += 1
+                in_flight.append(active[0])
+            try:
+                self.real_sleep(0.002)
+                return scan(**kwargs)
+            finally:
+                with lock:
+                    active[0] -= 1
+        
+        table.scan = tracked_scan
+        self.sleep.side_effect = self.real_sleep
+        controller = ScanRateController(max_concurrency=2)
+        
+        aggregate_table_metrics(table, self.projection, 8, controller=controller)
+        
+        self.assertLessEqual(max(in_flight), 2)
+    
+    def test_interrupted_pacing_frees_the_slot(self):
+        """A failure while waiting for the start time should not leak the slot."""
+        table = FakeTable(self.items, key_name='log_id', page_size=20)
+        self.sleep.side_effect = KeyboardInterrupt
+        controller = ScanRateController(max_page_rate=1, max_concurrency=1)
+        
+        controller.request_page(table.scan)
+        with self.assertRaises(KeyboardInterrupt):
+            controller.request_page(table.scan)
+        
+        self.assertEqual(controller._active, 0)
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_handler_reports_capacity_and_stops_at_budget(self, mock_dynamodb):
+        """The handler should report consumed capacity and return a token when the budget is spent."""
+        chat_table = FakeTable(self.items, key_name='log_id', page_size=20, name='test-chat-logs')
+        feedback_table = FakeTable([{'id': 'f1'}], key_name='id', name='test-feedback')
+        mock_dynamodb.Table.side_effect = lambda name: {
+            'test-chat-logs': chat_table, 'test-feedback': feedback_table
+        }[name]
+        
+        body = json.loads(lambda_handler({}, None)['body'])
+        self.assertGreater(body['consumedCapacity']['capacityUnits'], 0)
+        self.assertIsNone(body['consumedCapacity']['budgetUnits'])
+        self.assertNotIn('partial', body)
+        
+        with patch('index.SCAN_RCU_BUDGET', 5.0):
+            body = json.loads(lambda_handler({'bypassCache': 'true'}, None)['body'])
+        self.assertTrue(body['partial'])
+        self.assertLessEqual(body['consumedCapacity']['capacityUnits'], 5.0)
+        self.assertEqual(body['consumedCapacity']['budgetUnits'], 5.0)
+
+
 class TestLambdaHandler(unittest.TestCase):
     """Test the lambda_handler function."""
     
+    def setUp(self):
+        clear_metrics_cache()
+    
     @patch('index.dynamodb')
     @patch.dict(os.environ, {
         'CHAT_LOGS_TABLE': 'test-chat-logs',
@@ -188,6 +2213,38 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertEqual(body['totalFeedbackLogs'], 3)
         self.assertEqual(body['reviewedFeedbackLogs'], 2)
         self.assertEqual(body['pendingFeedbackLogs'], 1)
+        self.assertNotIn('errors', body)
+        self.assertGreaterEqual(body['durationsMs']['chatLogs'], 0)
+        self.assertGreaterEqual(body['durationsMs']['feedbackLogs'], 0)
+    
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback'
+    })
+    def test_one_table_fails(self, mock_dynamodb):
+        """A failing table should not hide the other table's counts."""
+        mock_chat_table = Mock()
+        mock_chat_table.scan.return_value = {
+            'Items': [
+                {'log_id': '1', 'rev_comment': 'Reviewed', 'rev_feedback': ''},
+                {'log_id': '2', 'rev_comment': '', 'rev_feedback': ''},
+            ]
+        }
+        mock_feedback_table = Mock()
+        mock_feedback_table.scan.side_effect = Exception('Feedback table unavailable')
+        mock_dynamodb.Table.side_effect = [mock_chat_table, mock_feedback_table]
+        
+        result = lambda_handler({}, None)
+        
+        self.assertEqual(result['statusCode'], 200)
+        body = json.loads(result['body'])
+        self.assertEqual(body['totalChatLogs'], 2)
+        self.assertEqual(body['reviewedChatLogs'], 1)
+        self.assertIsNone(body['totalFeedbackLogs'])
+        self.assertEqual(body['errors'], {'feedbackLogs': 'Feedback table unavailable'})
+        self.assertNotIn('chatLogs', body['errors'])
+        self.assertEqual(set(body['durationsMs']), {'chatLogs', 'feedbackLogs'})
     
     @patch.dict(os.environ, {}, clear=True)
     def test_missing_environment_variables(self):
@@ -198,6 +2255,18 @@ class TestLambdaHandler(unittest.TestCase):
         body = json.loads(result['body'])
         self.assertEqual(body['error'], 'Configuration error')
     
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback', 'CONTINUATION_TOKEN_SECRET': ''})
+    def test_missing_token_secret(self, mock_dynamodb):
+        """Without a shared signing key the handler should refuse to run instead of signing per container."""
+        result = lambda_handler({}, None)
+        
+        self.assertEqual(result['statusCode'], 500)
+        body = json.loads(result['body'])
+        self.assertEqual(body['error'], 'Configuration error')
+        self.assertIn('CONTINUATION_TOKEN_SECRET', body['message'])
+        mock_dynamodb.Table.assert_not_called()
+    
     @patch('index.dynamodb')
     @patch.dict(os.environ, {
         'CHAT_LOGS_TABLE': 'test-chat-logs',
@@ -0,0 +1,202 @@
+"""
+Unit tests for the EMF instrumentation of the metrics Lambda.
+
+EMF lines are printed to stdout, so the tests capture stdout and parse the
+JSON the way CloudWatch Logs would.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from contextlib import redirect_stdout
+import io
+import json
+import sys
+import os
+import threading
+
+# Add the lambda directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+# Continuation tokens are signed with this key; the handler refuses to run without one
+os.environ.setdefault('CONTINUATION_TOKEN_SECRET', 'test-secret')
+
+import instrumentation
+from index import (
+    ClientTable, ScanRateController, _refresh_cached_result, aggregate_table_metrics, clear_metrics_cache,
+    filtered_table_metrics, lambda_handler
+)
+from fake_dynamodb import FakeTable
+
+
+def emf_lines(output):
+    """Parse the EMF documents from captured stdout."""
+    return [json.loads(line) for line in output.splitlines() if line.startswith('{"_aws"')]
+
+
+class TestMetricRecorder(unittest.TestCase):
+    """Test page recording and the EMF document."""
+
+    def setUp(self):
+        self.items = [{'log_id': f'log-{i}', 'rev_comment': 'ok' if i % 2 else ''} for i in range(120)]
+        self.table = FakeTable(self.items, key_name='log_id', page_size=25)
+        self.addCleanup(instrumentation.finish)
+
+    def test_scan_pages_are_recorded(self):
+        """Every page should add its latency, items, bytes and capacity."""
+        recorder = instrumentation.start({'Mode': 'scan'}, sample_rate=1)
+
+        aggregate_table_metrics(self.table, 'log_id, rev_comment', 2, controller=ScanRateController())
+
+        self.assertEqual(recorder.pages, len(self.table.scan_calls))
+        self.assertEqual(recorder.items, 120)
+        self.assertGreater(recorder.bytes, 0)
+        self.assertGreater(recorder.capacity_units, 0)
+        self.assertEqual(len(recorder.page_latencies), recorder.pages)
+        self.assertGreater(recorder.timers['ClassifyTime'], 0)
+
+    def test_emf_document(self):
+        """The document should declare every metric and carry the dimension values."""
+        recorder = instrumentation.start({'Mode': 'count'}, sample_rate=1)
+        recorder.record_page(0.02, {
+            'ScannedCount': 10,
+            'Count': 2,
+            'ConsumedCapacity': {'CapacityUnits': 1.5},
+            'ResponseMetadata': {'HTTPHeaders': {'content-length': '400'}},
+        })
+
+        document = recorder.to_emf({'statusCode': 200})
+
+        metadata = document['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(metadata['Namespace'], instrumentation.METRICS_NAMESPACE)
+        self.assertEqual(metadata['Dimensions'], [['Mode']])
+        for metric in metadata['Metrics']:
+            self.assertIn(metric['Name'], document)
+        self.assertEqual(document['Mode'], 'count')
+        self.assertEqual(document['statusCode'], 200)
+        self.assertEqual(document['Items'], 10)
+        self.assertEqual(document['Bytes'], 400)
+        self.assertEqual(document['PageLatency'], [20.0])
+        self.assertEqual(document['ConsumedCapacity'], 1.5)
+
+    def test_page_latency_values_are_capped(self):
+        """EMF allows at most 100 values per metric."""
+        recorder = instrumentation.start(sample_rate=1)
+        for _ in range(150):
+            recorder.record_page(0.001, {'Items': []})
+
+        self.assertEqual(recorder.pages, 150)
+        self.assertEqual(len(recorder.to_emf()['PageLatency']), instrumentation.MAX_METRIC_VALUES)
+
+    def test_deserialisation_is_timed(self):
+        """ClientTable should add its conversion time to DeserializeTime."""
+        client = Mock()
+        client.scan.return_value = {'Items': [{'log_id': {'S': 'a'}}] * 50}
+        recorder = instrumentation.start(sample_rate=1)
+
+        ClientTable('logs', client).scan()
+
+        self.assertGreater(recorder.timers['DeserializeTime'], 0)
+
+    def test_classify_time_excludes_requests(self):
+        """Filtered reads should time the classification of fetched pages, not the requests."""
+        items = [dict(item, carrier='A', datetime='2024-03-01T00:00:00Z') for item in self.items]
+        table = FakeTable(items, key_name='log_id', page_size=25, page_latency=0.02,
+                          indexes={'byCarrier': ('carrier', 'datetime')})
+        plan = {'operation': 'Query'}
+        recorder = instrumentation.start(sample_rate=1)
+
+        counts = filtered_table_metrics(table, ('byCarrier', 'carrier', 'datetime'), plan, ['A'])
+
+        self.assertEqual(counts, (120, 60, 60))
+        self.assertGreaterEqual(recorder.pages, 5)
+        self.assertLess(recorder.timers['ClassifyTime'], 0.02)
+
+    def test_background_refresh_records_nothing(self):
+        """A cache refresh thread should not record into the running invocation."""
+        recorder = instrumentation.start(sample_rate=1)
+        refresh = threading.Thread(target=_refresh_cached_result, args=(
+            ('refresh-test',),
+            lambda should_stop, controller: aggregate_table_metrics(self.table, 'log_id, rev_comment', 2, controller=controller)
+        ))
+
+        refresh.start()
+        refresh.join()
+
+        self.assertGreater(len(self.table.scan_calls), 0)
+        self.assertEqual(recorder.pages, 0)
+        self.assertEqual(recorder.timers['ClassifyTime'], 0)
+        self.assertIs(instrumentation.active(), recorder)
+        clear_metrics_cache()
+
+    def test_unsampled_invocations_record_nothing(self):
+        """Without a recorder the instrumented functions should run unchanged."""
+        self.assertIsNone(instrumentation.start(sample_rate=0))
+
+        counts = aggregate_table_metrics(self.table, 'log_id, rev_comment')
+
+        self.assertEqual(counts, (120, 60, 60))
+        self.assertIsNone(instrumentation.active())
+
+
+class TestHandlerInstrumentation(unittest.TestCase):
+    """Test the EMF line written by lambda_handler."""
+
+    def setUp(self):
+        clear_metrics_cache()
+
+    def run_handler(self, event):
+        chat_table = FakeTable([{'log_id': 'a', 'rev_comment': 'ok'}, {'log_id': 'b'}], key_name='log_id', name='chat')
+        feedback_table = FakeTable([{'id': 'f'}], key_name='id', name='feedback')
+        output = io.StringIO()
+        with patch('index.dynamodb') as mock_dynamodb, redirect_stdout(output):
+            mock_dynamodb.Table.side_effect = lambda name: {'chat': chat_table, 'feedback': feedback_table}[name]
+            result = lambda_handler(event, None)
+        return result, emf_lines(output.getvalue())
+
+    @patch('instrumentation.METRICS_SAMPLE_RATE', 1.0)
+    @patch.dict(os.environ, {'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'})
+    def test_sampled_invocation_emits_one_line(self):
+        """A sampled invocation should print one EMF line with the mode dimension."""
+        result, lines = self.run_handler({'mode': 'scan'})
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['Mode'], 'scan')
+        self.assertEqual(lines[0]['statusCode'], 200)
+        self.assertEqual(lines[0]['Items'], 3)
+        self.assertGreaterEqual(lines[0]['Pages'], 2)
+
+    @patch('instrumentation.METRICS_SAMPLE_RATE', 0.0)
+    @patch.dict(os.environ, {'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'})
+    def test_unsampled_invocation_emits_nothing(self):
+        """METRICS_SAMPLE_RATE=0 should disable the EMF output."""
+        result, lines = self.run_handler({'mode': 'scan'})
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(lines, [])
+
+    @patch('instrumentation.METRICS_SAMPLE_RATE', 0.01)
+    @patch('instrumentation.random.random', return_value=0.5)
+    @patch.dict(os.environ, {'CHAT_LOGS_TABLE': 'chat', 'FEEDBACK_TABLE': 'feedback'})
+    def test_cold_start_is_always_recorded(self, _):
+        """The first invocation of a container should emit ColdStart and InitTime."""
+        with patch('instrumentation._cold_start', True):
+            _, first = self.run_handler({'mode': 'scan'})
+            _, second = self.run_handler({'mode': 'scan'})
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(first[0]['ColdStart'], 1)
+        self.assertGreater(first[0]['InitTime'], 0)
+        self.assertEqual(second, [])
+
+    @patch('instrumentation.METRICS_SAMPLE_RATE', 1.0)
+    @patch.dict(os.environ, {}, clear=True)
+    def test_failed_invocation_still_emits(self):
+        """Errors should be logged as before and still produce the EMF line."""
+        result, lines = self.run_handler({})
+
+        self.assertEqual(result['statusCode'], 500)
+        self.assertEqual(lines[0]['statusCode'], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
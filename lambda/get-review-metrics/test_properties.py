@@ -10,12 +10,18 @@ across all valid inputs, ensuring correctness of the metrics calculation logic.
 import unittest
 import sys
 import os
+from decimal import Decimal
 from hypothesis import given, strategies as st, settings, HealthCheck
 
 # Add the lambda directory to the path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from index import is_reviewed, calculate_metrics
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from index import (
+    is_reviewed, is_reviewed_raw, count_reviewed, calculate_metrics, calculate_raw_metrics, count_review_metrics
+)
+from fake_dynamodb import FakeTable
+from sketches import DDSketch, SpaceSaving
 
 
 # Custom strategies for generating test data
@@ -63,6 +69,31 @@ def item_with_review_fields(draw):
     return item
 
 
+# Values that are hard to classify server-side: leading ASCII or Unicode
+# whitespace, non-ASCII first characters and non-string attribute types
+review_field_value = st.one_of(
+    st.just(''),
+    st.text(alphabet=' \t\n\r\x0b\x0c\x1c\x85\xa0\u2003\u3000', min_size=1, max_size=5),
+    st.text(min_size=0, max_size=20),
+    st.integers(min_value=-2, max_value=2).map(Decimal),
+    st.booleans(),
+    st.none(),
+)
+
+
+@st.composite
+def table_items(draw):
+    """Generate keyed items whose review fields may be absent or any review_field_value."""
+    items = []
+    for index in range(draw(st.integers(min_value=0, max_value=60))):
+        item = {'log_id': f'log-{index}'}
+        for field in ('rev_comment', 'rev_feedback'):
+            if draw(st.booleans()):
+                item[field] = draw(review_field_value)
+        items.append(item)
+    return items
+
+
 class TestMetricsCalculationProperties(unittest.TestCase):
     """
     Property-based tests for metrics calculation.
@@ -206,5 +237,128 @@ class TestMetricsCalculationProperties(unittest.TestCase):
         )
 
 
+class TestCountModeProperties(unittest.TestCase):
+    """
+    Property-based tests for the server-side count mode against FakeTable.
+    """
+    
+    @given(table_items(), st.integers(min_value=1, max_value=4))
+    @settings(max_examples=100, suppress_health_check=[HealthCheck.too_slow])
+    def test_count_mode_matches_calculate_metrics(self, items, total_segments):
+        """
+        Invariant property: count_review_metrics returns exactly the counts
+        calculate_metrics produces for the same items, for any segment count.
+        """
+        table = FakeTable(items, key_name='log_id', page_size=7)
+        
+        self.assertEqual(
+            count_review_metrics(table, total_segments=total_segments),
+            calculate_metrics(items)
+        )
+
+
+class MarkedText(str):
+    """str subclass, which count_reviewed must not take the native fast path for."""
+
+
+class TestBatchedClassificationProperties(unittest.TestCase):
+    """
+    Property-based tests for the batched classifier against is_reviewed.
+    """
+    
+    @given(table_items(), st.booleans())
+    @settings(max_examples=200)
+    def test_count_reviewed_matches_is_reviewed(self, items, mark_strings):
+        """
+        Invariant property: count_reviewed counts exactly the items is_reviewed
+        accepts, for native strings, str subclasses and other value types.
+        """
+        if mark_strings:
+            items = [
+                {field: MarkedText(value) if isinstance(value, str) else value for field, value in item.items()}
+                for item in items
+            ]
+        
+        self.assertEqual(count_reviewed(items), sum(map(is_reviewed, items)))
+        self.assertEqual(calculate_metrics(iter(items)), calculate_metrics(list(items)))
+
+
+class TestRawClassificationProperties(unittest.TestCase):
+    """
+    Property-based tests for classifying wire-format items (ClientTable.scan_raw).
+    """
+    
+    @given(table_items())
+    @settings(max_examples=200)
+    def test_raw_classification_matches_is_reviewed(self, items):
+        """
+        Invariant property: is_reviewed_raw on the serialized item agrees with
+        is_reviewed on the item the resource layer would have deserialized.
+        """
+        serializer, deserializer = TypeSerializer(), TypeDeserializer()
+        raw_items = [{field: serializer.serialize(value) for field, value in item.items()} for item in items]
+        native_items = [{field: deserializer.deserialize(value) for field, value in item.items()} for item in raw_items]
+        
+        for raw_item, native_item in zip(raw_items, native_items):
+            self.assertEqual(is_reviewed_raw(raw_item), is_reviewed(native_item), raw_item)
+        self.assertEqual(calculate_raw_metrics(raw_items), calculate_metrics(native_items))
+
+
+
+class TestQuantileSketchProperties(unittest.TestCase):
+    """
+    Property-based tests for the turnaround quantile sketch (DDSketch).
+    """
+    
+    @given(
+        st.lists(st.floats(min_value=0.001, max_value=1e8, allow_nan=False), min_size=1, max_size=300),
+        st.integers(min_value=1, max_value=5),
+        st.sampled_from([0.0, 0.25, 0.5, 0.9, 0.99, 1.0])
+    )
+    @settings(max_examples=200)
+    def test_quantiles_within_relative_accuracy(self, values, parts, q):
+        """
+        Error bound property: merged from any split, every quantile is within
+        the relative accuracy of the value at the same rank.
+        """
+        sketches = [DDSketch(0.01) for _ in range(parts)]
+        for position, value in enumerate(values):
+            sketches[position % parts].add(value)
+        sketch = sketches[0]
+        for other in sketches[1:]:
+            sketch.merge(DDSketch.from_dict(other.to_dict()))
+        
+        exact = sorted(values)[int(q * (len(values) - 1))]
+        self.assertEqual(sketch.count, len(values))
+        self.assertLessEqual(abs(sketch.quantile(q) - exact), 0.01 * exact * (1 + 1e-9))
+
+    
+    @given(
+        st.lists(st.integers(min_value=0, max_value=30), min_size=1, max_size=400),
+        st.integers(min_value=1, max_value=4),
+        st.integers(min_value=1, max_value=10)
+    )
+    @settings(max_examples=200)
+    def test_heavy_hitter_bounds_survive_merges(self, keys, parts, capacity):
+        """
+        Error bound property: after merging any split, every monitored count
+        is within its error above the exact count, and errors stay within
+        (items) / capacity.
+        """
+        summaries = [SpaceSaving(capacity) for _ in range(parts)]
+        for position, key in enumerate(keys):
+            summaries[position % parts].add(key)
+        summary = summaries[0]
+        for other in summaries[1:]:
+            summary.merge(other)
+        
+        for key, count in summary.counts.items():
+            self.assertLessEqual(count - summary.errors[key], keys.count(key))
+            self.assertGreaterEqual(count, keys.count(key))
+            self.assertLessEqual(summary.errors[key], len(keys) / capacity)
+        for key in set(keys) - set(summary.counts):
+            self.assertLessEqual(keys.count(key), summary.floor)
+
+
 if __name__ == '__main__':
     unittest.main()
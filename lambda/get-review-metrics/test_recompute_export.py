@@ -0,0 +1,126 @@
+"""
+Unit tests for the offline recompute over DynamoDB export files.
+
+Exports are written to a temporary directory in the DYNAMODB_JSON format,
+and the counts are compared with calculate_metrics and with the Lambda's
+filtered reads over a FakeTable holding the same items.
+"""
+
+import unittest
+from unittest.mock import patch
+from contextlib import redirect_stdout
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+
+# Add the lambda directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import index
+import recompute_export
+from index import CARRIER_INDEXES, calculate_metrics, clear_metrics_cache
+from fake_dynamodb import FakeTable
+from boto3.dynamodb.types import TypeSerializer
+
+
+def chat_items(count):
+    comments = ['Looks right', '', ' \n', None, 'ok']
+    items = []
+    for i in range(count):
+        item = {
+            'log_id': f'log-{i:05d}',
+            'carrier_name': 'ABC'[i % 3],
+            'timestamp': f'2024-04-{1 + i % 30:02d}T{i % 24:02d}:30:00.000Z',
+        }
+        if comments[i % 5] is not None:
+            item['rev_comment'] = comments[i % 5]
+        if i % 11 == 0:
+            item['rev_feedback'] = 'follow up'
+        items.append(item)
+    return items
+
+
+class TestRecomputeExport(unittest.TestCase):
+    """Test recompute over a multi-file export."""
+
+    def setUp(self):
+        self.items = chat_items(3000)
+        self.items[7].pop('timestamp')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        data = os.path.join(self.directory.name, 'AWSDynamoDB', '01234-abcd', 'data')
+        os.makedirs(data)
+        serialize = TypeSerializer().serialize
+        for part in range(4):
+            with gzip.open(os.path.join(data, f'part-{part}.json.gz'), 'wt', encoding='utf-8') as file:
+                for item in self.items[part::4]:
+                    file.write(json.dumps({'Item': {key: serialize(value) for key, value in item.items()}}) + '\n')
+        # Manifest files are not data files
+        with open(os.path.join(self.directory.name, 'manifest-summary.md5'), 'w') as file:
+            file.write('0' * 32)
+
+    def test_counts_match_calculate_metrics(self):
+        result = recompute_export.recompute([self.directory.name], 'chatLogs', processes=1)
+
+        self.assertEqual((result['total'], result['reviewed'], result['pending']), calculate_metrics(self.items))
+        self.assertEqual((result['files'], result['records'], result['invalidRecords']), (4, 3000, 0))
+
+    def test_process_pool_merges_worker_counters(self):
+        """A pool should give the same counts as counting in one process."""
+        single = recompute_export.recompute([self.directory.name], 'chatLogs', processes=1)
+        pooled = recompute_export.recompute([self.directory.name], 'chatLogs', processes=3)
+
+        self.assertEqual(pooled['processes'], 3)
+        for key in ('total', 'reviewed', 'pending', 'records'):
+            self.assertEqual(pooled[key], single[key], key)
+
+    def test_filters_match_the_lambda(self):
+        """Carrier, time and review state filters should count what the Lambda reads."""
+        clear_metrics_cache()
+        table = FakeTable(
+            self.items, key_name='log_id', name='chat', indexes={'byCarrierName': ('carrier_name', 'timestamp')}
+        )
+        filter_range = index.time_range('2024-04-05T00:00:00Z', '2024-04-20T12:30:00Z')
+        plan = index.plan_table_read(table, CARRIER_INDEXES['chatLogs'], ['A', 'C'], filter_range)
+
+        for review_state in ('all', 'pending'):
+            expected = index.filtered_table_metrics(
+                table, CARRIER_INDEXES['chatLogs'], plan, ['A', 'C'], filter_range, review_state
+            )
+            result = recompute_export.recompute(
+                [self.directory.name], 'chatLogs', ['A', 'C'], filter_range, review_state, processes=1
+            )
+            self.assertEqual((result['total'], result['reviewed'], result['pending']), expected, review_state)
+
+    def test_invalid_lines_are_counted_and_skipped(self):
+        path = os.path.join(self.directory.name, 'broken.json')
+        with open(path, 'w') as file:
+            file.write('{"Item": {"log_id": {"S": "x"}, "rev_comment": {"S": "ok"}}}\n\n{"Item": \n{"other": 1}\n')
+
+        result = recompute_export.recompute([path], 'chatLogs', processes=1)
+
+        self.assertEqual((result['total'], result['reviewed']), (1, 1))
+        self.assertEqual(result['invalidRecords'], 2)
+
+    def test_command_line(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = recompute_export.main([
+                self.directory.name, '--table', 'chatLogs', '--carriers', 'B', '--processes', '1'
+            ])
+
+        result = json.loads(output.getvalue())
+        selected = [item for item in self.items if item['carrier_name'] == 'B' and 'timestamp' in item]
+        self.assertEqual(status, 0)
+        self.assertEqual((result['total'], result['reviewed'], result['pending']), calculate_metrics(selected))
+
+    def test_command_line_rejects_bad_time(self):
+        with patch('sys.stderr', io.StringIO()), self.assertRaises(SystemExit):
+            recompute_export.main([self.directory.name, '--table', 'chatLogs', '--start', 'yesterday'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Unit tests for the mergeable streaming sketches.
+
+Estimates are checked against exact values computed over the same data.
+"""
+
+import unittest
+import json
+from collections import Counter
+import math
+import random
+import sys
+import os
+
+# Add the lambda directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sketches import DDSketch, HyperLogLog, SpaceSaving
+
+
+class TestDDSketch(unittest.TestCase):
+    """Test the quantile sketch."""
+
+    def setUp(self):
+        rng = random.Random(5)
+        # Turnaround-like durations: minutes to weeks, heavy tailed
+        self.values = [rng.lognormvariate(9, 1.5) for _ in range(20000)]
+
+    def exact(self, q):
+        return sorted(self.values)[int(q * (len(self.values) - 1))]
+
+    def test_quantiles_within_relative_accuracy(self):
+        sketch = DDSketch(0.01)
+        for value in self.values:
+            sketch.add(value)
+
+        for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+            self.assertLessEqual(abs(sketch.quantile(q) - self.exact(q)), 0.01 * self.exact(q), q)
+        self.assertLess(len(sketch.buckets), 1000)
+
+    def test_merged_segments_equal_one_sketch(self):
+        """Merging per-segment sketches should give the same buckets as one pass."""
+        whole = DDSketch()
+        parts = [DDSketch() for _ in range(4)]
+        for position, value in enumerate(self.values):
+            whole.add(value)
+            parts[position % 4].add(value)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+
+    def test_state_round_trips_through_json(self):
+        sketch = DDSketch()
+        for value in self.values[:500]:
+            sketch.add(value)
+
+        restored = DDSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+        self.assertEqual(restored.to_dict(), sketch.to_dict())
+        self.assertEqual(restored.quantile(0.9), sketch.quantile(0.9))
+
+    def test_memory_is_bounded(self):
+        """Beyond max_buckets the lowest buckets collapse; high quantiles keep their accuracy."""
+        sketch = DDSketch(0.01, max_buckets=64)
+        for exponent in range(-300, 300):
+            sketch.add(math.exp(exponent / 10))
+
+        self.assertEqual(len(sketch.buckets), 64)
+        self.assertEqual(sketch.count, 600)
+        self.assertAlmostEqual(sketch.quantile(0.99), math.exp(293 / 10), delta=0.01 * math.exp(293 / 10))
+
+    def test_zero_and_negative_values(self):
+        """Reviews stamped before the log (clock skew) count as zero."""
+        sketch = DDSketch()
+        for value in (-5.0, 0.0, 10.0, 20.0):
+            sketch.add(value)
+
+        self.assertEqual(sketch.quantile(0.0), 0.0)
+        self.assertEqual(sketch.quantile(0.25), 0.0)
+        self.assertAlmostEqual(sketch.quantile(1.0), 20.0, delta=0.2)
+
+    def test_empty_and_invalid(self):
+        self.assertIsNone(DDSketch().quantile(0.5))
+        with self.assertRaises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
+        with self.assertRaises(ValueError):
+            DDSketch.from_dict({'relativeAccuracy': 0.01})
+        with self.assertRaises(ValueError):
+            DDSketch(1.5)
+
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """Test the distinct value counter."""
+
+    def test_estimates_within_standard_error(self):
+        """At 0.81% standard error, estimates should stay within 3%, also near 2.5 * m values."""
+        for count in (0, 1, 100, 5000, 40000, 200000):
+            counter = HyperLogLog(14)
+            for i in range(count):
+                counter.add(f'user-{i}')
+                counter.add(f'user-{i}')
+
+            self.assertLessEqual(abs(counter.count() - count), max(1, 0.03 * count), count)
+
+    def test_merge_is_the_union(self):
+        """Merged segment counters should equal a counter over all values."""
+        whole = HyperLogLog(12)
+        parts = [HyperLogLog(12) for _ in range(3)]
+        for i in range(30000):
+            value = f'session-{i % 20000}'
+            whole.add(value)
+            parts[i % 3].add(value)
+        merged = parts[0].copy().merge(parts[1]).merge(parts[2])
+
+        self.assertEqual(merged.registers, whole.registers)
+        self.assertNotEqual(parts[0].registers, whole.registers)
+        with self.assertRaises(ValueError):
+            merged.merge(HyperLogLog(14))
+
+    def test_state_round_trips_through_json(self):
+        """Restored registers keep counting: a later run adds only new values."""
+        counter = HyperLogLog(10)
+        for i in range(1000):
+            counter.add(i)
+
+        restored = HyperLogLog.from_dict(json.loads(json.dumps(counter.to_dict())))
+        self.assertEqual(restored.registers, counter.registers)
+        for i in range(1000, 1500):
+            restored.add(i)
+
+        self.assertAlmostEqual(restored.count(), 1500, delta=0.1 * 1500)
+
+    def test_invalid_state(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog.from_dict({'precision': 10, 'registers': 'not base64!'})
+        with self.assertRaises(ValueError):
+            HyperLogLog.from_dict({'precision': 10, 'registers': HyperLogLog(11).to_dict()['registers']})
+        with self.assertRaises(ValueError):
+            HyperLogLog(3)
+
+
+
+class TestSpaceSaving(unittest.TestCase):
+    """Test the heavy hitter counter."""
+
+    def setUp(self):
+        rng = random.Random(11)
+        # A few heavy users over a long tail of occasional ones
+        self.keys = [
+            f'user-{int(rng.paretovariate(1.2))}' if rng.random() < 0.6 else f'user-tail-{rng.randrange(50000)}'
+            for _ in range(100000)
+        ]
+        self.exact = Counter(self.keys)
+
+    def assert_bounds(self, summary):
+        for key, count in summary.counts.items():
+            self.assertLessEqual(count - summary.errors[key], self.exact[key], key)
+            self.assertGreaterEqual(count, self.exact[key], key)
+            self.assertLessEqual(summary.errors[key], len(self.keys) / summary.capacity)
+
+    def test_top_keys_with_error_bounds(self):
+        summary = SpaceSaving(200)
+        for key in self.keys:
+            summary.add(key)
+
+        self.assert_bounds(summary)
+        self.assertEqual(len(summary.counts), 200)
+        # Every key above (items) / capacity is monitored
+        self.assertLessEqual({key for key, count in self.exact.items() if count > len(self.keys) / 200},
+                             set(summary.counts))
+        self.assertEqual([key for key, _, _ in summary.top(10)], [key for key, _ in self.exact.most_common(10)])
+        self.assertEqual(summary.estimate('user-never'), (summary.floor, summary.floor))
+
+    def test_merged_segments_keep_the_bounds(self):
+        parts = [SpaceSaving(200) for _ in range(4)]
+        for position, key in enumerate(self.keys):
+            parts[position % 4].add(key)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+
+        self.assert_bounds(merged)
+        self.assertEqual({key for key, _, _ in merged.top(10)}, {key for key, _ in self.exact.most_common(10)})
+        with self.assertRaises(ValueError):
+            merged.merge(SpaceSaving(100))
+
+    def test_state_round_trips_through_json(self):
+        summary = SpaceSaving(50)
+        for key in self.keys[:5000]:
+            summary.add(key)
+
+        restored = SpaceSaving.from_dict(json.loads(json.dumps(summary.to_dict())))
+        self.assertEqual((restored.counts, restored.errors), (summary.counts, summary.errors))
+        # A restored summary keeps evicting correctly
+        for key in self.keys[5000:10000]:
+            restored.add(key)
+            summary.add(key)
+        self.assertEqual(restored.top(10), summary.top(10))
+
+    def test_invalid_state(self):
+        with self.assertRaises(ValueError):
+            SpaceSaving.from_dict({'capacity': 2, 'keys': ['a', 'b', 'c'], 'counts': [1, 1, 1], 'errors': [0, 0, 0]})
+        with self.assertRaises(ValueError):
+            SpaceSaving.from_dict({'capacity': 2, 'keys': ['a'], 'counts': [1, 2], 'errors': [0]})
+        with self.assertRaises(ValueError):
+            SpaceSaving(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
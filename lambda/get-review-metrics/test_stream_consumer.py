@@ -0,0 +1,226 @@
+"""
+Unit tests for the review counter stream consumer.
+
+The METRICS_TABLE is replaced by an in-memory client that implements the
+GetItem, PutItem and TransactWriteItems calls made by stream_consumer.
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+import json
+import sys
+import os
+
+# Add the lambda directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import stream_consumer
+from stream_consumer import apply_record, lambda_handler, seed_counters, table_name_from_arn
+from index import clear_metrics_cache, lambda_handler as metrics_handler
+
+
+STREAM_ARN = (
+    'arn:aws:dynamodb:us-east-1:123456789012:'
+    'table/chat-logs-review-dev-UnityAIAssistantLogs/stream/2024-01-01T00:00:00.000'
+)
+TABLE_NAME = 'chat-logs-review-dev-UnityAIAssistantLogs'
+
+
+class TransactionCanceledException(Exception):
+    pass
+
+
+class FakeMetricsClient:
+    """In-memory METRICS_TABLE speaking the low-level client wire format."""
+
+    class exceptions:
+        TransactionCanceledException = TransactionCanceledException
+
+    def __init__(self):
+        self.items = {}
+
+    def get_item(self, TableName, Key, ConsistentRead=False):
+        item = self.items.get(Key['metric_key']['S'])
+        return {'Item': dict(item)} if item else {}
+
+    def put_item(self, TableName, Item):
+        self.items[Item['metric_key']['S']] = dict(Item)
+
+    def transact_write_items(self, TransactItems):
+        # Check every condition before writing anything
+        for entry in TransactItems:
+            put = entry.get('Put')
+            if not put:
+                continue
+            current = self.items.get(put['Item']['metric_key']['S'])
+            expected = put.get('ExpressionAttributeValues', {}).get(':expected_seq')
+            if expected is None and current is not None:
+                raise TransactionCanceledException('ConditionalCheckFailed')
+            if expected is not None and (current is None or current['seq'] != expected):
+                raise TransactionCanceledException('ConditionalCheckFailed')
+
+        for entry in TransactItems:
+            if 'Put' in entry:
+                self.put_item(entry['Put']['TableName'], entry['Put']['Item'])
+            else:
+                update = entry['Update']
+                key = update['Key']['metric_key']['S']
+                counter = self.items.setdefault(key, {'metric_key': {'S': key}})
+                for name, placeholder in (('total', ':total'), ('reviewed', ':reviewed')):
+                    current = int(counter.get(name, {'N': '0'})['N'])
+                    delta = int(update['ExpressionAttributeValues'][placeholder]['N'])
+                    counter[name] = {'N': str(current + delta)}
+
+    def counters(self, table_name=TABLE_NAME):
+        item = self.items.get(table_name, {})
+        return int(item.get('total', {'N': '0'})['N']), int(item.get('reviewed', {'N': '0'})['N'])
+
+
+def image(log_id, rev_comment='', rev_feedback=''):
+    return {
+        'log_id': {'S': log_id},
+        'rev_comment': {'S': rev_comment},
+        'rev_feedback': {'S': rev_feedback},
+    }
+
+
+def record(event_name, sequence, log_id, old=None, new=None):
+    change = {
+        'Keys': {'log_id': {'S': log_id}},
+        'SequenceNumber': str(sequence),
+    }
+    if old is not None:
+        change['OldImage'] = old
+    if new is not None:
+        change['NewImage'] = new
+    return {'eventName': event_name, 'eventSourceARN': STREAM_ARN, 'dynamodb': change}
+
+
+class TestStreamConsumer(unittest.TestCase):
+    """Test counter maintenance from stream records."""
+
+    def setUp(self):
+        self.client = FakeMetricsClient()
+        patcher = patch.object(stream_consumer, 'dynamodb_client', self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        seed_counters('metrics', TABLE_NAME, 0, 0)
+
+    def apply(self, *records):
+        return [apply_record(r, 'metrics') for r in records]
+
+    def test_table_name_from_arn(self):
+        """The table name should be taken from the stream ARN."""
+        self.assertEqual(table_name_from_arn(STREAM_ARN), TABLE_NAME)
+
+    def test_insert_review_and_delete(self):
+        """Inserts, pending->reviewed, reviewed->pending and deletes should move the counters."""
+        self.apply(
+            record('INSERT', 100, 'a', new=image('a')),
+            record('INSERT', 101, 'b', new=image('b', rev_comment='Done')),
+        )
+        self.assertEqual(self.client.counters(), (2, 1))
+
+        self.apply(record('MODIFY', 102, 'a', old=image('a'), new=image('a', rev_feedback='ok')))
+        self.assertEqual(self.client.counters(), (2, 2))
+
+        self.apply(record('MODIFY', 103, 'b', old=image('b', rev_comment='Done'), new=image('b', rev_comment='  ')))
+        self.assertEqual(self.client.counters(), (2, 1))
+
+        self.apply(record('REMOVE', 104, 'a', old=image('a', rev_feedback='ok')))
+        self.assertEqual(self.client.counters(), (1, 0))
+
+    def test_duplicate_records_are_skipped(self):
+        """A redelivered record should only be counted once."""
+        insert = record('INSERT', 200, 'a', new=image('a', rev_comment='Done'))
+
+        self.assertEqual(self.apply(insert, insert), [True, False])
+        self.assertEqual(self.client.counters(), (1, 1))
+
+    def test_replayed_older_records_are_skipped(self):
+        """Records older than the last applied one should not change the counters."""
+        insert = record('INSERT', 300, 'a', new=image('a'))
+        review = record('MODIFY', 301, 'a', old=image('a'), new=image('a', rev_comment='Done'))
+        remove = record('REMOVE', 302, 'a', old=image('a', rev_comment='Done'))
+
+        self.apply(insert, review, remove)
+        self.assertEqual(self.client.counters(), (0, 0))
+
+        # A retried batch replays the insert and review after the delete
+        self.assertEqual(self.apply(insert, review), [False, False])
+        self.assertEqual(self.client.counters(), (0, 0))
+
+    def test_sequence_numbers_compare_numerically(self):
+        """A longer sequence number is newer even if it sorts lower as a string."""
+        self.apply(record('INSERT', 99, 'a', new=image('a')))
+        self.apply(record('MODIFY', 100, 'a', old=image('a'), new=image('a', rev_comment='Done')))
+
+        self.assertEqual(self.client.counters(), (1, 1))
+
+    def test_metadata_only_change_keeps_counters(self):
+        """Modifying other attributes should not move the counters."""
+        self.apply(record('INSERT', 400, 'a', new=image('a', rev_comment='Done')))
+        self.apply(record('MODIFY', 401, 'a', old=image('a', rev_comment='Done'), new=image('a', rev_comment='Done!')))
+
+        self.assertEqual(self.client.counters(), (1, 1))
+
+    @patch.dict(os.environ, {'METRICS_TABLE': 'metrics'})
+    def test_handler_reports_first_failure(self):
+        """The handler should stop at the first failing record and report it."""
+        good = record('INSERT', 500, 'a', new=image('a'))
+        bad = record('INSERT', 501, 'b', new=image('b'))
+        later = record('INSERT', 502, 'c', new=image('c'))
+        bad['eventSourceARN'] = 'not-an-arn'
+
+        result = lambda_handler({'Records': [good, bad, later]}, None)
+
+        self.assertEqual(result, {'batchItemFailures': [{'itemIdentifier': '501'}]})
+        self.assertEqual(self.client.counters(), (1, 0))
+
+
+class TestCountersMode(unittest.TestCase):
+    """Test GetReviewMetrics reading the stream-maintained counters."""
+
+    def setUp(self):
+        clear_metrics_cache()
+
+    @patch('index.dynamodb')
+    @patch.dict(os.environ, {
+        'CHAT_LOGS_TABLE': 'test-chat-logs',
+        'FEEDBACK_TABLE': 'test-feedback',
+        'METRICS_TABLE': 'metrics'
+    })
+    def test_counters_mode_reads_items(self, mock_dynamodb):
+        """mode=counters should answer from the counter items without scanning."""
+        tables = {}
+
+        def make_table(name):
+            return tables.setdefault(name, Mock(table_name=name))
+
+        mock_dynamodb.Table.side_effect = make_table
+        counters = {
+            'test-chat-logs': {'metric_key': 'test-chat-logs', 'total': 10, 'reviewed': 4},
+            'test-feedback': {'metric_key': 'test-feedback', 'total': 3, 'reviewed': 3},
+        }
+        make_table('metrics').get_item.side_effect = (
+            lambda Key: {'Item': counters[Key['metric_key']]}
+        )
+
+        result = metrics_handler({'mode': 'counters'}, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        body = json.loads(result['body'])
+        self.assertEqual(
+            (body['totalChatLogs'], body['reviewedChatLogs'], body['pendingChatLogs']),
+            (10, 4, 6)
+        )
+        self.assertEqual(
+            (body['totalFeedbackLogs'], body['reviewedFeedbackLogs'], body['pendingFeedbackLogs']),
+            (3, 3, 0)
+        )
+        tables['test-chat-logs'].scan.assert_not_called()
+        tables['test-feedback'].scan.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
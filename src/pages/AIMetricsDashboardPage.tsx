@@ -9,107 +9,55 @@ import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContaine
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Separator } from '@/components/ui/separator';
-import { listAIEvaluationJobs, type AIEvaluationJobEntry } from '../services/DynamoDBService';
+import {
+  getAIEvaluationSummary,
+  listAIEvaluationJobs,
+  type AIEvaluationJobEntry,
+  type AIEvaluationSummary,
+} from '../services/DynamoDBService';
 import { ErrorDisplay } from '../components/ErrorDisplay';
 import { classifyError } from '../utils';
 
+const SCORE_BIN_RANGES = [
+  '0.0-0.1',
+  '0.1-0.2',
+  '0.2-0.3',
+  '0.3-0.4',
+  '0.4-0.5',
+  '0.5-0.6',
+  '0.6-0.7',
+  '0.7-0.8',
+  '0.8-0.9',
+  '0.9-1.0',
+];
+
 /**
- * Calculate score distribution for a specific metric
+ * Score distribution for a specific metric, from the server-side summary
  */
-function calculateScoreDistribution(jobs: AIEvaluationJobEntry[], metricName: string) {
-  const bins = [
-    { range: '0.0-0.1', min: 0, max: 0.1, count: 0 },
-    { range: '0.1-0.2', min: 0.1, max: 0.2, count: 0 },
-    { range: '0.2-0.3', min: 0.2, max: 0.3, count: 0 },
-    { range: '0.3-0.4', min: 0.3, max: 0.4, count: 0 },
-    { range: '0.4-0.5', min: 0.4, max: 0.5, count: 0 },
-    { range: '0.5-0.6', min: 0.5, max: 0.6, count: 0 },
-    { range: '0.6-0.7', min: 0.6, max: 0.7, count: 0 },
-    { range: '0.7-0.8', min: 0.7, max: 0.8, count: 0 },
-    { range: '0.8-0.9', min: 0.8, max: 0.9, count: 0 },
-    { range: '0.9-1.0', min: 0.9, max: 1.0, count: 0 },
-  ];
-
-  jobs.forEach((job) => {
-    job.results?.forEach((result) => {
-      if (result.metricName === metricName && result.result !== undefined) {
-        const score = result.result;
-        const bin = bins.find((b) => score >= b.min && score <= b.max);
-        if (bin) bin.count++;
-      }
-    });
-  });
-
-  return bins;
+function scoreDistribution(summary: AIEvaluationSummary | null, metricName: string) {
+  const distribution = summary?.metrics[metricName]?.distribution;
+  return SCORE_BIN_RANGES.map((range, index) => ({ range, count: distribution?.[index] ?? 0 }));
 }
 
 /**
- * Calculate metrics from evaluation jobs
+ * Metric averages from the server-side summary
+ *
+ * jobAverage divides each metric's score sum by the number of jobs, as the
+ * dashboard did when it averaged the jobs in the browser.
  */
-function calculateMetrics(jobs: AIEvaluationJobEntry[]) {
-  if (jobs.length === 0) {
-    return {
-      totalConversations: 0,
-      pendingReviews: 0,
-      correctness: 0,
-      helpfulness: 0,
-      faithfulness: 0,
-      harmfulness: 0,
-      stereotyping: 0,
-      logicalCoherence: 0,
-      completeness: 0,
-    };
-  }
-
-  let correctnessSum = 0;
-  let helpfulnessSum = 0;
-  let faithfulnessSum = 0;
-  let harmfulnessSum = 0;
-  let stereotypingSum = 0;
-  let logicalCoherenceSum = 0;
-  let completenessSum = 0;
-
-  jobs.forEach((job) => {
-    job.results?.forEach((result) => {
-      const score = result.result || 0;
-      switch (result.metricName) {
-        case 'Builtin.Correctness':
-          correctnessSum += score;
-          break;
-        case 'Builtin.Helpfulness':
-          helpfulnessSum += score;
-          break;
-        case 'Builtin.Faithfulness':
-          faithfulnessSum += score;
-          break;
-        case 'Builtin.Harmfulness':
-          harmfulnessSum += score;
-          break;
-        case 'Builtin.Stereotyping':
-          stereotypingSum += score;
-          break;
-        case 'Builtin.LogicalCoherence':
-          logicalCoherenceSum += score;
-          break;
-        case 'Builtin.Completeness':
-          completenessSum += score;
-          break;
-      }
-    });
-  });
-
-  const count = jobs.length;
+function summaryMetrics(summary: AIEvaluationSummary | null) {
+  const average = (metricName: string) => summary?.metrics[metricName]?.jobAverage ?? 0;
 
   return {
-    totalConversations: count,
+    totalConversations: summary?.totalJobs ?? 0,
     pendingReviews: 0,
-    correctness: correctnessSum / count,
-    helpfulness: helpfulnessSum / count,
-    faithfulness: faithfulnessSum / count,
-    harmfulness: harmfulnessSum / count,
-    stereotyping: stereotypingSum / count,
-    logicalCoherence: logicalCoherenceSum / count,
-    completeness: completenessSum / count,
+    correctness: average('Builtin.Correctness'),
+    helpfulness: average('Builtin.Helpfulness'),
+    faithfulness: average('Builtin.Faithfulness'),
+    harmfulness: average('Builtin.Harmfulness'),
+    stereotyping: average('Builtin.Stereotyping'),
+    logicalCoherence: average('Builtin.LogicalCoherence'),
+    completeness: average('Builtin.Completeness'),
   };
 }
 
@@ -140,15 +88,29 @@ const MetricCard: React.FC<MetricCardProps> = ({ label, value, icon }) => (
  * AI Metrics Dashboard Page Component
  */
 const AIMetricsDashboardPage: React.FC = () => {
-  const [jobs, setJobs] = useState<AIEvaluationJobEntry[]>([]);
+  const [summary, setSummary] = useState<AIEvaluationSummary | null>(null);
+  const [jobs, setJobs] = useState<AIEvaluationJobEntry[] | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<Error | null>(null);
   const [selectedMetric, setSelectedMetric] = useState<string | null>(null);
   const [selectedJobs, setSelectedJobs] = useState<AIEvaluationJobEntry[]>([]);
 
-  const handleSeeConversations = (metricName: string) => {
+  // The summary covers the cards and charts; the jobs themselves are only
+  // downloaded when a conversation list is opened
+  const handleSeeConversations = async (metricName: string) => {
     setSelectedMetric(metricName);
-    setSelectedJobs(jobs);
+    try {
+      let loadedJobs = jobs;
+      if (loadedJobs === null) {
+        loadedJobs = (await listAIEvaluationJobs(1000)).items;
+        setJobs(loadedJobs);
+      }
+      setSelectedJobs(loadedJobs);
+    } catch (err) {
+      const errorMessage = err instanceof Error ? err.message : 'Failed to fetch AI evaluation jobs';
+      setSelectedMetric(null);
+      setError(new Error(errorMessage));
+    }
   };
 
   const handleCloseModal = () => {
@@ -161,8 +123,7 @@ const AIMetricsDashboardPage: React.FC = () => {
       try {
         setLoading(true);
         setError(null);
-        const result = await listAIEvaluationJobs(1000);
-        setJobs(result.items);
+        setSummary(await getAIEvaluationSummary());
       } catch (err) {
         const errorMessage = err instanceof Error ? err.message : 'Failed to fetch AI metrics';
         setError(new Error(errorMessage));
@@ -174,7 +135,7 @@ const AIMetricsDashboardPage: React.FC = () => {
     fetchData();
   }, []);
 
-  const metrics = calculateMetrics(jobs);
+  const metrics = summaryMetrics(summary);
 
   if (loading) {
     return (
@@ -286,7 +247,7 @@ const AIMetricsDashboardPage: React.FC = () => {
           </CardHeader>
           <CardContent>
             <ResponsiveContainer width="100%" height={300}>
-              <BarChart data={calculateScoreDistribution(jobs, 'Builtin.Helpfulness')}>
+              <BarChart data={scoreDistribution(summary, 'Builtin.Helpfulness')}>
                 <CartesianGrid strokeDasharray="3 3" />
                 <XAxis dataKey="range" />
                 <YAxis
@@ -320,7 +281,7 @@ const AIMetricsDashboardPage: React.FC = () => {
           </CardHeader>
           <CardContent>
             <ResponsiveContainer width="100%" height={300}>
-              <BarChart data={calculateScoreDistribution(jobs, 'Builtin.Correctness')}>
+              <BarChart data={scoreDistribution(summary, 'Builtin.Correctness')}>
                 <CartesianGrid strokeDasharray="3 3" />
                 <XAxis dataKey="range" />
                 <YAxis
@@ -355,7 +316,7 @@ const AIMetricsDashboardPage: React.FC = () => {
           </CardHeader>
           <CardContent>
             <ResponsiveContainer width="100%" height={300}>
-              <BarChart data={calculateScoreDistribution(jobs, 'Builtin.Faithfulness')}>
+              <BarChart data={scoreDistribution(summary, 'Builtin.Faithfulness')}>
                 <CartesianGrid strokeDasharray="3 3" />
                 <XAxis dataKey="range" />
                 <YAxis
@@ -390,7 +351,7 @@ const AIMetricsDashboardPage: React.FC = () => {
           </CardHeader>
           <CardContent>
             <ResponsiveContainer width="100%" height={300}>
-              <BarChart data={calculateScoreDistribution(jobs, 'Builtin.Harmfulness')}>
+              <BarChart data={scoreDistribution(summary, 'Builtin.Harmfulness')}>
                 <CartesianGrid strokeDasharray="3 3" />
                 <XAxis dataKey="range" />
                 <YAxis
@@ -424,7 +385,7 @@ const AIMetricsDashboardPage: React.FC = () => {
           </CardHeader>
           <CardContent>
             <ResponsiveContainer width="100%" height={300}>
-              <BarChart data={calculateScoreDistribution(jobs, 'Builtin.Stereotyping')}>
+              <BarChart data={scoreDistribution(summary, 'Builtin.Stereotyping')}>
                 <CartesianGrid strokeDasharray="3 3" />
                 <XAxis dataKey="range" />
                 <YAxis
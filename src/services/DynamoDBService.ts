@@ -6,6 +6,9 @@
 // API endpoint for Lambda function
 const API_ENDPOINT = import.meta.env.VITE_DYNAMODB_API_ENDPOINT;
 
+// Function URL of the evaluation metric summary Lambda (eval_metrics.py)
+const EVAL_METRICS_ENDPOINT = import.meta.env.VITE_EVAL_METRICS_API_ENDPOINT;
+
 /**
  * Call Lambda API for DynamoDB operations
  */
@@ -209,4 +212,56 @@ export async function listAIEvaluationJobs(limit: number = 100): Promise<{
     console.error('Error listing AI evaluation jobs:', error);
     throw new Error(`Failed to list AI evaluation jobs: ${error?.message || 'Unknown error'}`);
   }
-}
\ No newline at end of file
+}
+
+/**
+ * Server-side summary of one evaluation metric
+ */
+export interface AIEvaluationMetricSummary {
+  count: number;
+  average: number | null;
+  jobAverage: number | null;
+  currentAverage: number | null;
+  previousAverage: number | null;
+  change: number | null;
+  distribution: number[];
+}
+
+/**
+ * Evaluation job summary returned by the eval metrics Lambda
+ */
+export interface AIEvaluationSummary {
+  totalJobs: number;
+  period: {
+    days: number;
+    currentStart: string;
+    end: string;
+  };
+  metrics: Record<string, AIEvaluationMetricSummary>;
+  durationMs: number;
+}
+
+/**
+ * Get the per-metric averages, period change and score distribution of all
+ * evaluation jobs, computed by the eval metrics Lambda
+ */
+export async function getAIEvaluationSummary(periodDays: number = 7): Promise<AIEvaluationSummary> {
+  if (!EVAL_METRICS_ENDPOINT) {
+    throw new Error('Evaluation metrics endpoint not configured. Please deploy the stack and set VITE_EVAL_METRICS_API_ENDPOINT in .env file');
+  }
+
+  try {
+    const url = new URL(EVAL_METRICS_ENDPOINT);
+    url.searchParams.set('periodDays', String(periodDays));
+    const response = await fetch(url.toString());
+
+    if (!response.ok) {
+      throw new Error(`API request failed: ${response.status} ${response.statusText}`);
+    }
+
+    return await response.json();
+  } catch (error: any) {
+    console.error('Error getting AI evaluation summary:', error);
+    throw new Error(`Failed to get AI evaluation summary: ${error?.message || 'Unknown error'}`);
+  }
+}